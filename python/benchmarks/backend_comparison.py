@@ -0,0 +1,73 @@
+"""Compares the dict and SQLite library backends on a synthetic catalog.
+
+Run from the python/ directory:
+
+    python3 -m benchmarks.backend_comparison [number_of_videos]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks import synthetic_catalog
+from src.sqlite_library import SqliteVideoLibrary
+from src.video_library import VideoLibrary
+
+_QUERIES = 200
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def _run_queries(library, count):
+    rng = random.Random(1)
+    timings = {}
+    ids = [synthetic_catalog.video_id(rng.randrange(count))
+           for _ in range(_QUERIES)]
+    terms = synthetic_catalog.search_terms(_QUERIES, seed=1)
+    tags = synthetic_catalog.search_tags(_QUERIES, seed=1)
+    for name, function, arguments in [
+            ("get_video", library.get_video, ids),
+            ("search_videos", library.search_videos, terms),
+            ("search_videos_tag", library.search_videos_tag, tags)]:
+        start = time.perf_counter()
+        for argument in arguments:
+            function(argument)
+        timings[name] = (time.perf_counter() - start) / len(arguments)
+    return timings
+
+
+def main(count=100_000):
+    with tempfile.TemporaryDirectory() as directory:
+        videos_path = os.path.join(directory, "videos.txt")
+        db_path = os.path.join(directory, "videos.db")
+        synthetic_catalog.write_catalog(videos_path, count)
+
+        dict_library, dict_load = _timed(
+            lambda: VideoLibrary(videos_path, cache=False, query_cache_size=0))
+        sqlite_library, sqlite_build = _timed(
+            SqliteVideoLibrary, db_path, videos_path)
+        sqlite_library.close()
+        sqlite_library, sqlite_open = _timed(
+            SqliteVideoLibrary, db_path, videos_path)
+
+        print(f"{count} videos")
+        print(f"{'':20}{'dict':>12}{'sqlite':>12}")
+        print(f"{'load':20}{dict_load * 1e3:10.1f}ms"
+              f"{sqlite_open * 1e3:10.1f}ms"
+              f"  (first build {sqlite_build * 1e3:.1f}ms)")
+        dict_timings = _run_queries(dict_library, count)
+        sqlite_timings = _run_queries(sqlite_library, count)
+        for name, elapsed in dict_timings.items():
+            print(f"{name:20}{elapsed * 1e6:10.1f}us"
+                  f"{sqlite_timings[name] * 1e6:10.1f}us")
+        sqlite_library.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,312 @@
+"""Times every player command and catalog loading on synthetic catalogs.
+
+For every catalog size, a synthetic catalog is generated (see
+benchmarks.synthetic_catalog) and loaded in a fresh process, a share of its
+videos is flagged and a playlist is filled, then every command is run many
+times. The report gives the throughput and the p50/p99 latency of every
+command, the load times and the peak RSS of the process, and can be saved
+as JSON to compare commits. Run from the python/ directory:
+
+    python3 -m benchmarks.command_suite --sizes 1000,100000 --output new.json
+    python3 -m benchmarks.command_suite --sizes 1000,100000 --baseline new.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None
+
+from benchmarks import synthetic_catalog
+from src.command_parser import CommandParser
+from src.output_sink import OutputSink
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+# Share of the videos listed in the FLAG/ALLOW_VIDEOS_FROM_FILE files.
+BULK_RATIO = 0.01
+
+
+class _NullSink(OutputSink):
+    """A sink discarding the output, so printing is not measured."""
+
+    def write(self, line: str):
+        pass
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[int(fraction * (len(sorted_values) - 1))]
+
+
+def _peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _command_plan(count, args, directory, player):
+    """Returns the (label, runs) of every benchmarked command.
+
+    runs is a list of (setup, command) pairs: setup, which may be None, is
+    called untimed before the command so that every command starts from
+    a meaningful state.
+    """
+    iterations = args.iterations
+    slow_iterations = max(1, iterations // 50)
+    ids = [synthetic_catalog.video_id(i * 7919 % count)
+           for i in range(iterations)]
+    terms = synthetic_catalog.search_terms(iterations, args.seed)
+    tags = synthetic_catalog.search_tags(iterations, args.seed)
+    playlist = player.playlist
+    library = player.video_library
+
+    def play(video_id):
+        return lambda: player.play_video(video_id)
+
+    def play_and_pause(video_id):
+        return lambda: (player.play_video(video_id), player.pause_video())
+
+    def create(name, size=0):
+        def setup():
+            playlist.create_playlist(name)
+            for video_id in ids[:size]:
+                playlist.add_to_playlist(name, video_id)
+        return setup
+
+    def flag(video_id):
+        def setup():
+            if video_id not in library.flagged:
+                library.flag_video(video_id)
+        return setup
+
+    def allow(video_id):
+        def setup():
+            if video_id in library.flagged:
+                library.unflag_video(video_id)
+        return setup
+
+    bulk_ids = synthetic_catalog.sample_video_ids(count, BULK_RATIO,
+                                                  args.seed + 1)
+    bulk_file = os.path.join(directory, "flag_ids.txt")
+    with open(bulk_file, "w") as id_file:
+        id_file.write("\n".join(bulk_ids))
+
+    def allow_bulk():
+        library.unflag_videos(bulk_ids)
+
+    def flag_bulk():
+        library.flag_videos((video_id, "") for video_id in bulk_ids)
+
+    return [
+        ("NUMBER_OF_VIDEOS", [(None, ["NUMBER_OF_VIDEOS"])] * iterations),
+        ("SHOW_ALL_VIDEOS", [(None, ["SHOW_ALL_VIDEOS"])] * slow_iterations),
+        ("SHOW_ALL_VIDEOS <page>",
+         [(None, ["SHOW_ALL_VIDEOS", "100", str(i * 7919 % count)])
+          for i in range(iterations)]),
+        ("PLAY", [(None, ["PLAY", video_id]) for video_id in ids]),
+        ("PLAY_RANDOM", [(None, ["PLAY_RANDOM"])] * iterations),
+        ("STOP", [(play(video_id), ["STOP"]) for video_id in ids]),
+        ("PAUSE", [(play(video_id), ["PAUSE"]) for video_id in ids]),
+        ("CONTINUE", [(play_and_pause(video_id), ["CONTINUE"])
+                      for video_id in ids]),
+        ("SHOW_PLAYING", [(None, ["SHOW_PLAYING"])] * iterations),
+        ("CREATE_PLAYLIST", [(None, ["CREATE_PLAYLIST", "list{}".format(i)])
+                             for i in range(iterations)]),
+        ("ADD_TO_PLAYLIST", [(None, ["ADD_TO_PLAYLIST", "bench", video_id])
+                             for video_id in ids]),
+        ("SHOW_PLAYLIST", [(None, ["SHOW_PLAYLIST", "bench"])]
+         * slow_iterations),
+        ("REMOVE_FROM_PLAYLIST",
+         [(None, ["REMOVE_FROM_PLAYLIST", "bench", video_id])
+          for video_id in ids]),
+        ("CLEAR_PLAYLIST", [(create("clear", args.playlist_size),
+                             ["CLEAR_PLAYLIST", "clear"])]
+         * slow_iterations),
+        ("DELETE_PLAYLIST", [(create("delete"), ["DELETE_PLAYLIST", "delete"])]
+         * iterations),
+        ("SHOW_ALL_PLAYLISTS", [(None, ["SHOW_ALL_PLAYLISTS"])] * iterations),
+        ("SEARCH_VIDEOS", [(None, ["SEARCH_VIDEOS", term]) for term in terms]),
+        ("SEARCH_VIDEOS <page>", [(None, ["SEARCH_VIDEOS", term, "20"])
+                                  for term in terms]),
+        ("SEARCH_VIDEOS_FUZZY", [(None, ["SEARCH_VIDEOS_FUZZY", term + "z"])
+                                 for term in terms]),
+        ("SEARCH_VIDEOS_WITH_TAG", [(None, ["SEARCH_VIDEOS_WITH_TAG", tag])
+                                    for tag in tags]),
+        ("PLAY_RESULT", [(lambda: player.search_videos_tag(tags[0], "20"),
+                          ["PLAY_RESULT", "1"])] * iterations),
+        ("FLAG_VIDEO", [(allow(video_id), ["FLAG_VIDEO", video_id, "spam"])
+                        for video_id in ids]),
+        ("ALLOW_VIDEO", [(flag(video_id), ["ALLOW_VIDEO", video_id])
+                         for video_id in ids]),
+        ("FLAG_VIDEOS_FROM_FILE",
+         [(allow_bulk, ["FLAG_VIDEOS_FROM_FILE", bulk_file])]
+         * slow_iterations),
+        ("ALLOW_VIDEOS_FROM_FILE",
+         [(flag_bulk, ["ALLOW_VIDEOS_FROM_FILE", bulk_file])]
+         * slow_iterations),
+    ]
+
+
+def _time_load(load):
+    start = time.perf_counter()
+    result = load()
+    return result, time.perf_counter() - start
+
+
+def benchmark_size(count, args):
+    """Runs the whole suite on one catalog size and returns its results."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "videos.txt")
+        _, generate = _time_load(
+            lambda: synthetic_catalog.write_catalog(path, count, args.seed))
+        _, lazy_load = _time_load(lambda: VideoLibrary(path, lazy=True,
+                                                       cache=False))
+        library, text_load = _time_load(lambda: VideoLibrary(path,
+                                                             cache=False))
+        library.flag_videos(
+            (video_id, "")
+            for video_id in synthetic_catalog.sample_video_ids(
+                count, args.flagged_ratio, args.seed))
+        player = VideoPlayer(library, output=_NullSink(), result_handles=True)
+        parser = CommandParser(player)
+        playlist = player.playlist
+        playlist.create_playlist("bench")
+        for video_id in synthetic_catalog.sample_video_ids(
+                count, min(1.0, args.playlist_size / count), args.seed + 2):
+            playlist.add_to_playlist("bench", video_id)
+
+        commands = {}
+        for label, runs in _command_plan(count, args, directory, player):
+            latencies = []
+            for setup, command in runs:
+                if setup is not None:
+                    setup()
+                start = time.perf_counter()
+                parser.execute_command(command)
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            total = sum(latencies)
+            commands[label] = {
+                "runs": len(latencies),
+                "ops_per_sec": len(latencies) / total if total else None,
+                "p50_us": _percentile(latencies, 0.50) * 1e6,
+                "p99_us": _percentile(latencies, 0.99) * 1e6,
+            }
+    return {
+        "videos": count,
+        "generate_seconds": generate,
+        "load_seconds": {"text": text_load, "lazy": lazy_load},
+        "peak_rss_bytes": _peak_rss_bytes(),
+        "query_cache": library.query_cache.stats,
+        "commands": commands,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _run_in_subprocess(count, args):
+    # A fresh process per size, so that the peak RSS is the one of that
+    # size alone.
+    command = [sys.executable, "-m", "benchmarks.command_suite",
+               "--single", str(count), "--iterations", str(args.iterations),
+               "--flagged-ratio", str(args.flagged_ratio),
+               "--playlist-size", str(args.playlist_size),
+               "--seed", str(args.seed)]
+    output = subprocess.run(command, capture_output=True, text=True,
+                            check=True).stdout
+    return json.loads(output)
+
+
+def _print_report(report, baseline=None):
+    baseline_sizes = {} if baseline is None else {
+        result["videos"]: result for result in baseline["results"]}
+    for result in report["results"]:
+        rss = result["peak_rss_bytes"]
+        print("{} videos: load {:.3f}s (lazy {:.3f}s), peak RSS {}".format(
+            result["videos"], result["load_seconds"]["text"],
+            result["load_seconds"]["lazy"],
+            "n/a" if rss is None else "{:.1f} MiB".format(rss / 2 ** 20)))
+        before = baseline_sizes.get(result["videos"], {}).get("commands", {})
+        print("  {:26}{:>12}{:>12}{:>12}{}".format(
+            "command", "ops/s", "p50 us", "p99 us",
+            "  p50 vs baseline" if before else ""))
+        for label, timing in result["commands"].items():
+            change = ""
+            if label in before and before[label]["p50_us"]:
+                change = "  {:+.0f}%".format(
+                    100 * (timing["p50_us"] / before[label]["p50_us"] - 1))
+            print("  {:26}{:12.0f}{:12.1f}{:12.1f}{}".format(
+                label, timing["ops_per_sec"] or 0, timing["p50_us"],
+                timing["p99_us"], change))
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument(
+        "--sizes", default="1000,10000,100000",
+        help="comma-separated catalog sizes (default: %(default)s)")
+    arg_parser.add_argument(
+        "--iterations", type=int, default=500,
+        help="runs of each fast command per size (default: %(default)s)")
+    arg_parser.add_argument(
+        "--flagged-ratio", type=float, default=0.01,
+        help="share of the videos flagged before timing (default: "
+             "%(default)s)")
+    arg_parser.add_argument(
+        "--playlist-size", type=int, default=1000,
+        help="number of videos in the benchmarked playlists (default: "
+             "%(default)s)")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--output", metavar="FILE",
+                            help="save the results as JSON")
+    arg_parser.add_argument("--baseline", metavar="FILE",
+                            help="compare with results saved by --output")
+    arg_parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = arg_parser.parse_args(argv)
+
+    if args.single is not None:
+        json.dump(benchmark_size(args.single, args), sys.stdout)
+        return
+
+    report = {
+        "commit": _git_commit(),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"iterations": args.iterations,
+                     "flagged_ratio": args.flagged_ratio,
+                     "playlist_size": args.playlist_size, "seed": args.seed},
+        "results": [_run_in_subprocess(int(size), args)
+                    for size in args.sizes.split(",")],
+    }
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    _print_report(report, baseline)
+    if args.output is not None:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Reports the memory used per video by the catalog representation.
+
+Run from the python/ directory:
+
+    python3 -m benchmarks.memory_footprint [number_of_videos]
+"""
+
+import random
+import sys
+import tracemalloc
+
+from src.video import Video
+from src.catalog_parser import parse_tags
+
+
+class _DictVideo:
+    """The Video layout before __slots__, kept here as the baseline."""
+
+    def __init__(self, video_title, video_id, video_tags):
+        self._title = video_title
+        self._video_id = video_id
+        self._tags = tuple(video_tags)
+
+
+_TAGS = ["#animal", "#cat", "#dog", "#music", "#google", "#career", "#news",
+         "#sport", "#gaming", "#comedy"]
+
+
+def _rows(count):
+    rng = random.Random(0)
+    for i in range(count):
+        tags = rng.sample(_TAGS, rng.randint(0, 3))
+        # Build the fields the way the CSV reader does: fresh strings.
+        yield (f"Video number {i}", f"video_{i}_id",
+               " , ".join(tags))
+
+
+def _measure(build, count):
+    rows = list(_rows(count))
+    tracemalloc.start()
+    catalog = build(rows)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del catalog
+    return size / count
+
+
+def _build_baseline(rows):
+    return {url: _DictVideo(title, url,
+                            [tag.strip() for tag in tags.split(",")]
+                            if tags else [])
+            for title, url, tags in rows}
+
+
+def _build_compact(rows):
+    tag_cache = {}
+    return {sys.intern(url): Video(title, sys.intern(url),
+                                   parse_tags(tags, tag_cache))
+            for title, url, tags in rows}
+
+
+def main(count=100_000):
+    baseline = _measure(_build_baseline, count)
+    compact = _measure(_build_compact, count)
+    print(f"{count} videos")
+    print(f"baseline: {baseline:.1f} bytes/video")
+    print(f"compact:  {compact:.1f} bytes/video")
+    print(f"saved:    {baseline - compact:.1f} bytes/video "
+          f"({100 * (baseline - compact) / baseline:.0f}%)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,77 @@
+"""A local load-test client for the command server.
+
+Opens many idle connections plus a few active clients that send commands
+as fast as the server answers them, and reports throughput and latency.
+Start the server first, then run from the python/ directory:
+
+    python3 -m src.server --port 8765
+    python3 -m benchmarks.server_load --port 8765 --idle 2000 --clients 50
+"""
+
+import argparse
+import asyncio
+import time
+
+from src.server import PROMPT
+
+_PROMPT = PROMPT.encode()
+_COMMANDS = ("NUMBER_OF_VIDEOS", "PLAY_RANDOM", "SHOW_PLAYING",
+             "SEARCH_VIDEOS_WITH_TAG #animal", "no", "STOP")
+
+
+async def _connect(args):
+    if args.unix:
+        return await asyncio.open_unix_connection(args.unix)
+    return await asyncio.open_connection(args.host, args.port)
+
+
+async def _client(args, latencies):
+    reader, writer = await _connect(args)
+    await reader.readuntil(_PROMPT)
+    for i in range(args.commands):
+        start = time.perf_counter()
+        writer.write(_COMMANDS[i % len(_COMMANDS)].encode() + b"\n")
+        await reader.readuntil(_PROMPT)
+        latencies.append(time.perf_counter() - start)
+    writer.write(b"EXIT\n")
+    writer.close()
+
+
+async def _run(args):
+    idle = []
+    for _ in range(args.idle):
+        reader, writer = await _connect(args)
+        await reader.readuntil(_PROMPT)
+        idle.append(writer)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(args, latencies)
+                           for _ in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    for writer in idle:
+        writer.close()
+
+    latencies.sort()
+    print(f"{args.idle} idle connections, {args.clients} active clients")
+    print(f"{len(latencies)} commands in {elapsed:.3f}s "
+          f"({len(latencies) / elapsed:.0f} commands/sec)")
+    print(f"latency p50 {latencies[len(latencies) // 2] * 1000:.3f}ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.3f}ms")
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--unix", metavar="PATH")
+    arg_parser.add_argument("--idle", type=int, default=1000,
+                            help="number of idle connections to hold open")
+    arg_parser.add_argument("--clients", type=int, default=20,
+                            help="number of clients sending commands")
+    arg_parser.add_argument("--commands", type=int, default=1000,
+                            help="number of commands sent by each client")
+    asyncio.run(_run(arg_parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Generates deterministic synthetic catalogs for the benchmarks.
+
+The same size and seed always give the same file. Titles are built from a
+small vocabulary, so searches match realistic numbers of videos, and tags
+follow a Zipf distribution: a few tags are on most videos, most tags on
+few. Run from the python/ directory:
+
+    python3 -m benchmarks.synthetic_catalog 1000000 videos-1m.txt
+"""
+
+import argparse
+import itertools
+import random
+
+WORDS = ("amazing", "funny", "cats", "dogs", "life", "google", "music",
+         "video", "news", "best", "worst", "daily", "live", "show", "guide",
+         "review", "tutorial", "highlights", "recipe", "travel", "vlog",
+         "game", "trailer", "interview", "podcast", "football", "science",
+         "history", "space", "ocean", "mountain", "city", "kitchen", "garden",
+         "coding", "python", "career", "morning", "night", "weekend")
+
+# The number of distinct tags, and the Zipf exponent of their frequencies.
+TAG_COUNT = 500
+TAG_SKEW = 1.1
+
+# Relative frequencies of videos with 0, 1, 2, ... tags.
+TAGS_PER_VIDEO_WEIGHTS = (10, 30, 30, 18, 8, 4)
+
+TAGS = tuple("#tag{}".format(rank) for rank in range(TAG_COUNT))
+_TAG_CUM_WEIGHTS = tuple(itertools.accumulate(
+    1 / (rank + 1) ** TAG_SKEW for rank in range(TAG_COUNT)))
+
+
+def video_id(index):
+    """Returns the id of the index-th synthetic video."""
+    return "video_{}_id".format(index)
+
+
+def iter_rows(count, seed=0):
+    """Yields the (title, video_id, tags) of 'count' synthetic videos."""
+    rng = random.Random(seed)
+    tag_counts = range(len(TAGS_PER_VIDEO_WEIGHTS))
+    for index in range(count):
+        title = " ".join(rng.sample(WORDS, rng.randint(2, 5))).title()
+        tag_count = rng.choices(tag_counts, TAGS_PER_VIDEO_WEIGHTS)[0]
+        # Duplicates are dropped, so popular tags are not repeated.
+        tags = dict.fromkeys(rng.choices(TAGS, cum_weights=_TAG_CUM_WEIGHTS,
+                                         k=tag_count))
+        yield "{} {}".format(title, index), video_id(index), tuple(tags)
+
+
+def write_catalog(path, count, seed=0):
+    """Writes a videos.txt file of 'count' synthetic videos."""
+    with open(path, "w") as video_file:
+        for title, url, tags in iter_rows(count, seed):
+            video_file.write("{} | {} | {}\n".format(title, url,
+                                                     ",".join(tags)))
+
+
+def sample_video_ids(count, ratio, seed=0):
+    """Returns the ids of a random 'ratio' of the 'count' videos, such as
+    the videos to flag."""
+    rng = random.Random(seed)
+    return [video_id(index)
+            for index in rng.sample(range(count), int(count * ratio))]
+
+
+def search_terms(count, seed=0):
+    """Returns 'count' search terms, skewed towards a few popular words."""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+    return [rng.choices(WORDS, weights)[0][:rng.randint(3, 6)]
+            for _ in range(count)]
+
+
+def search_tags(count, seed=0):
+    """Returns 'count' tags to search for, as frequent as on videos."""
+    rng = random.Random(seed)
+    return rng.choices(TAGS, cum_weights=_TAG_CUM_WEIGHTS, k=count)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("count", type=int, help="number of videos")
+    arg_parser.add_argument("path", help="the catalog file to write")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args(argv)
+    write_catalog(args.path, args.count, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Helpers to parse the pipe-delimited videos.txt catalog."""
+
+from .video import Video
+import csv
+import sys
+
+
+# Helper Wrapper around CSV reader to strip whitespace from around
+# each item.
+def _csv_reader_with_strip(reader):
+    yield from ((item.strip() for item in line) for line in reader)
+
+
+def parse_tags(tags, cache):
+    """Parses the tags field of a catalog line.
+
+    Tags are interned and equal tag tuples are shared through 'cache', as
+    most videos reuse a few tag sets.
+    """
+    if not tags:
+        return ()
+    parsed = tuple(sys.intern(tag.strip()) for tag in tags.split(","))
+    return cache.setdefault(parsed, parsed)
+
+
+def read_videos(lines, tag_cache=None):
+    """Yields a Video for every catalog line in 'lines'.
+
+    Args:
+        lines: An iterable of text lines, such as an open videos.txt file.
+        tag_cache: Optional dictionary used to share tag tuples between
+            calls.
+    """
+    if tag_cache is None:
+        tag_cache = {}
+    reader = _csv_reader_with_strip(csv.reader(lines, delimiter="|"))
+    for video_info in reader:
+        title, url, tags = video_info
+        url = sys.intern(url)
+        yield Video(title, url, parse_tags(tags, tag_cache))
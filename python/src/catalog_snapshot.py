@@ -0,0 +1,235 @@
+"""A precompiled binary snapshot of the video catalog.
+
+The snapshot holds a string table, the videos in file order, the title
+order and the tag and title n-gram postings, so loading it skips both CSV
+parsing and index building. Compile one with:
+
+    python3 -m src.catalog_snapshot [videos.txt] [snapshot]
+"""
+
+from array import array
+from pathlib import Path
+import hashlib
+import os
+import struct
+import sys
+
+from .video import Video
+from .video_index import TagIndex, TitleIndex
+
+# Bump whenever the layout below changes; older snapshots are then rebuilt.
+SNAPSHOT_VERSION = 2
+
+_MAGIC = b"YTCS"
+# Magic, version, source size, source mtime in ns, source SHA-256.
+_HEADER = struct.Struct("<4sIQQ32s")
+_LENGTH = struct.Struct("<Q")
+
+
+class SnapshotError(Exception):
+    """A class used to represent a missing, stale or unreadable snapshot."""
+    pass
+
+
+def default_snapshot_path(source_path):
+    """Returns the snapshot path used for a catalog file by default."""
+    return Path(str(source_path) + ".snap")
+
+
+def _source_hash(source_path):
+    digest = hashlib.sha256()
+    with open(source_path, "rb") as source:
+        for block in iter(lambda: source.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+class _StringTable:
+    """Assigns every distinct string of the snapshot a small integer id."""
+
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def __call__(self, string):
+        string_id = self.ids.get(string)
+        if string_id is None:
+            if "\0" in string:
+                raise SnapshotError("Cannot store a string containing NUL.")
+            string_id = self.ids[string] = len(self.strings)
+            self.strings.append(string)
+        return string_id
+
+
+def _postings_arrays(postings, key_id, to_index):
+    keys, offsets, values = array("I"), array("I", [0]), array("I")
+    for key, posting in postings:
+        keys.append(key_id(key))
+        values.extend(to_index(item) for item in posting)
+        offsets.append(len(values))
+    return keys, offsets, values
+
+
+def write_snapshot(videos, title_order, tag_index, title_index,
+                   source_path, snapshot_path=None):
+    """Writes the snapshot of a loaded catalog.
+
+    Args:
+        videos: The video_id -> Video dictionary, in file order.
+        title_order: The title keys of all videos, sorted.
+        tag_index: The TagIndex of the catalog.
+        title_index: The TitleIndex of the catalog.
+        source_path: The videos.txt the catalog was loaded from.
+        snapshot_path: Where to write the snapshot, next to the source by
+            default. The file is replaced atomically.
+    """
+    if snapshot_path is None:
+        snapshot_path = default_snapshot_path(source_path)
+    stat = os.stat(source_path)
+    strings = _StringTable()
+    positions = {video_id: i for i, video_id in enumerate(videos)}
+    titles, ids = array("I"), array("I")
+    tag_offsets, tags = array("I", [0]), array("I")
+    for video in videos.values():
+        titles.append(strings(video.title))
+        ids.append(strings(video.video_id))
+        tags.extend(strings(tag) for tag in video.tags)
+        tag_offsets.append(len(tags))
+    order = array("I", (positions[key[2]] for key in title_order))
+    sections = [titles, ids, tag_offsets, tags, order]
+    sections.extend(_postings_arrays(
+        tag_index.items(), strings, lambda key: positions[key[2]]))
+    # Title postings are stored sorted so snapshots are reproducible.
+    sections.extend(_postings_arrays(
+        sorted(title_index.items()), strings, positions.__getitem__))
+    blob = "\0".join(strings.strings).encode()
+
+    tmp_path = Path(str(snapshot_path) + ".tmp")
+    with open(tmp_path, "wb") as snapshot:
+        snapshot.write(_HEADER.pack(_MAGIC, SNAPSHOT_VERSION, stat.st_size,
+                                    stat.st_mtime_ns,
+                                    _source_hash(source_path)))
+        snapshot.write(_LENGTH.pack(len(blob)))
+        snapshot.write(blob)
+        for section in sections:
+            if sys.byteorder == "big":
+                section.byteswap()
+            snapshot.write(_LENGTH.pack(len(section)))
+            section.tofile(snapshot)
+    os.replace(tmp_path, snapshot_path)
+
+
+class _Reader:
+    """Reads the sections of a snapshot in order."""
+
+    def __init__(self, data, offset):
+        self._data = data
+        self._offset = offset
+
+    def _length(self):
+        (length,) = _LENGTH.unpack_from(self._data, self._offset)
+        self._offset += _LENGTH.size
+        return length
+
+    def _advance(self, size):
+        # Slicing past the end would quietly return fewer bytes.
+        start = self._offset
+        if start + size > len(self._data):
+            raise ValueError("Section runs past the end of the snapshot")
+        self._offset += size
+        return start
+
+    def blob(self):
+        start = self._advance(self._length())
+        return self._data[start:self._offset]
+
+    def array(self):
+        section = array("I")
+        start = self._advance(self._length() * section.itemsize)
+        section.frombytes(self._data[start:self._offset])
+        if sys.byteorder == "big":
+            section.byteswap()
+        return section
+
+    def at_end(self):
+        return self._offset == len(self._data)
+
+
+def read_snapshot(source_path, snapshot_path=None):
+    """Loads the snapshot of a catalog file.
+
+    Returns:
+        A (videos, title_order, tag_index, title_index) tuple, as taken by
+        write_snapshot.
+
+    Raises:
+        SnapshotError: If the snapshot is missing, was written by another
+            version, or no longer matches the source file.
+    """
+    if snapshot_path is None:
+        snapshot_path = default_snapshot_path(source_path)
+    try:
+        with open(snapshot_path, "rb") as snapshot:
+            data = snapshot.read()
+        stat = os.stat(source_path)
+    except OSError as e:
+        raise SnapshotError(str(e)) from e
+    if len(data) < _HEADER.size:
+        raise SnapshotError("Snapshot is truncated.")
+    magic, version, size, mtime_ns, source_hash = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != SNAPSHOT_VERSION:
+        raise SnapshotError("Snapshot has an unsupported format.")
+    # A matching size and mtime is trusted; otherwise fall back to comparing
+    # contents, so touching the source does not force a rebuild.
+    if size != stat.st_size or (mtime_ns != stat.st_mtime_ns
+                                and source_hash != _source_hash(source_path)):
+        raise SnapshotError("Snapshot is stale.")
+
+    try:
+        reader = _Reader(data, _HEADER.size)
+        strings = reader.blob().decode().split("\0")
+        (titles, ids, tag_offsets, tags, order,
+         tag_keys, tag_posting_offsets, tag_postings,
+         gram_keys, gram_posting_offsets, gram_postings) = (
+            reader.array() for _ in range(11))
+        if not reader.at_end():
+            raise ValueError("Trailing bytes after the last section")
+    except (struct.error, ValueError) as e:
+        raise SnapshotError("Snapshot is corrupt.") from e
+
+    video_ids = [sys.intern(strings[i]) for i in ids]
+    tag_cache = {}
+    videos = {}
+    for position, video_id in enumerate(video_ids):
+        video_tags = tuple(
+            tags[tag_offsets[position]:tag_offsets[position + 1]])
+        video_tags = tag_cache.get(video_tags) or tag_cache.setdefault(
+            video_tags, tuple(sys.intern(strings[i]) for i in video_tags))
+        videos[video_id] = Video(strings[titles[position]], video_id,
+                                 video_tags)
+    keys = [(strings[titles[position]], position, video_ids[position])
+            for position in range(len(video_ids))]
+    title_order = [keys[position] for position in order]
+    tag_index = TagIndex({
+        sys.intern(strings[tag]): [
+            keys[position] for position in tag_postings[
+                tag_posting_offsets[i]:tag_posting_offsets[i + 1]]]
+        for i, tag in enumerate(tag_keys)})
+    title_index = TitleIndex.from_packed(
+        {strings[gram]: (gram_posting_offsets[i], gram_posting_offsets[i + 1])
+         for i, gram in enumerate(gram_keys)},
+        gram_postings, video_ids)
+    return videos, title_order, tag_index, title_index
+
+
+def main(argv):
+    source_path = (Path(argv[1]) if len(argv) > 1
+                   else Path(__file__).parent / "videos.txt")
+    snapshot_path = Path(argv[2]) if len(argv) > 2 else None
+    # Imported here as the catalog itself imports this module.
+    from .video_catalog import VideoCatalog
+    VideoCatalog(source_path).write_snapshot(snapshot_path)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -1,7 +1,7 @@
 """A command parser class."""
 
-import textwrap
-from typing import Sequence
+import time
+from typing import Callable, NamedTuple, Optional, Sequence, Tuple
 
 
 class CommandException(Exception):
@@ -9,155 +9,257 @@ class CommandException(Exception):
     pass
 
 
+class Command(NamedTuple):
+    """A registered command.
+
+    handler is called with the command arguments, whose count must be one of
+    arities; otherwise a CommandException with usage_error is raised. A
+    command whose arities is None takes no arguments and ignores any extra
+    words. help_text is the command's line in the HELP output.
+    """
+    handler: Callable
+    arities: Optional[Tuple[int, ...]]
+    usage_error: Optional[str]
+    help_text: str
+
+
+# The built-in commands, in HELP order, as (name, player method, arities,
+# usage error, help text).
+_PLAYER_COMMANDS = (
+    ("NUMBER_OF_VIDEOS", "number_of_videos", None, None,
+     "NUMBER_OF_VIDEOS - Shows how many videos are in the library."),
+    ("SHOW_ALL_VIDEOS", "show_all_videos", (0, 1, 2),
+     "Please enter SHOW_ALL_VIDEOS command followed by an optional limit and "
+     "offset.",
+     "SHOW_ALL_VIDEOS <limit> <offset> - Lists all videos from the library, "
+     "or the given page of them when a limit and optional offset are given."),
+    ("PLAY", "play_video", (1,),
+     "Please enter PLAY command followed by video_id.",
+     "PLAY <video_id> - Plays specified video."),
+    ("PLAY_RESULT", "play_result", (1, 2),
+     "Please enter PLAY_RESULT command followed by an optional result handle "
+     "and the number of the video.",
+     "PLAY_RESULT <result_handle> <number> - Plays a video from the results "
+     "of an earlier search, the latest one if no handle is given."),
+    ("PLAY_RANDOM", "play_random_video", None, None,
+     "PLAY_RANDOM - Plays a random video from the library."),
+    ("STOP", "stop_video", None, None,
+     "STOP - Stop the current video."),
+    ("PAUSE", "pause_video", None, None,
+     "PAUSE - Pause the current video."),
+    ("CONTINUE", "continue_video", None, None,
+     "CONTINUE - Resume the current paused video."),
+    ("SHOW_PLAYING", "show_playing", None, None,
+     "SHOW_PLAYING - Displays the title, url and paused status of the video "
+     "that is currently playing (or paused)."),
+    ("CREATE_PLAYLIST", "create_playlist", (1,),
+     "Please enter CREATE_PLAYLIST command followed by a playlist name.",
+     "CREATE_PLAYLIST <playlist_name> - Creates a new (empty) playlist with "
+     "the provided name."),
+    ("ADD_TO_PLAYLIST", "add_to_playlist", (2,),
+     "Please enter ADD_TO_PLAYLIST command followed by a playlist name and "
+     "video_id to add.",
+     "ADD_TO_PLAYLIST <playlist_name> <video_id> - Adds the requested video "
+     "to the playlist."),
+    ("REMOVE_FROM_PLAYLIST", "remove_from_playlist", (2,),
+     "Please enter REMOVE_FROM_PLAYLIST command followed by a playlist name "
+     "and video_id to remove.",
+     "REMOVE_FROM_PLAYLIST <playlist_name> <video_id> - Removes the "
+     "specified video from the specified playlist"),
+    ("CLEAR_PLAYLIST", "clear_playlist", (1,),
+     "Please enter CLEAR_PLAYLIST command followed by a playlist name.",
+     "CLEAR_PLAYLIST <playlist_name> - Removes all the videos from the "
+     "playlist."),
+    ("DELETE_PLAYLIST", "delete_playlist", (1,),
+     "Please enter DELETE_PLAYLIST command followed by a playlist name.",
+     "DELETE_PLAYLIST <playlist_name> - Deletes the playlist."),
+    ("SHOW_PLAYLIST", "show_playlist", (1,),
+     "Please enter SHOW_PLAYLIST command followed by a playlist name.",
+     "SHOW_PLAYLIST <playlist_name> - List all the videos in this playlist."),
+    ("SHOW_ALL_PLAYLISTS", "show_all_playlists", None, None,
+     "SHOW_ALL_PLAYLISTS - Display all the available playlists."),
+    ("SEARCH_VIDEOS", "search_videos", (1, 2, 3),
+     "Please enter SEARCH_VIDEOS command followed by a search term and an "
+     "optional limit and offset.",
+     "SEARCH_VIDEOS <search_term> <limit> <offset> - Display all the videos "
+     "whose titles contain the search_term, or the given page of them."),
+    ("SEARCH_VIDEOS_FUZZY", "search_videos_fuzzy", (1,),
+     "Please enter SEARCH_VIDEOS_FUZZY command followed by a search term.",
+     "SEARCH_VIDEOS_FUZZY <search_term> - Display the videos whose titles "
+     "are closest to the search_term, tolerating typos."),
+    ("SEARCH_VIDEOS_WITH_TAG", "search_videos_tag", (1, 2, 3),
+     "Please enter SEARCH_VIDEOS_WITH_TAG command followed by a video tag and "
+     "an optional limit and offset.",
+     "SEARCH_VIDEOS_WITH_TAG <tag_name> <limit> <offset> -Display all videos "
+     "whose tags contains the provided tag, or the given page of them."),
+    ("FLAG_VIDEO", "flag_video", (1, 2),
+     "Please enter FLAG_VIDEO command followed by a video_id and an optional "
+     "flag reason.",
+     "FLAG_VIDEO <video_id> <flag_reason> - Mark a video as flagged."),
+    ("ALLOW_VIDEO", "allow_video", (1,),
+     "Please enter ALLOW_VIDEO command followed by a video_id.",
+     "ALLOW_VIDEO <video_id> - Removes a flag from a video."),
+    ("FLAG_VIDEOS_FROM_FILE", "flag_videos_from_file", (1, 2),
+     "Please enter FLAG_VIDEOS_FROM_FILE command followed by a file path and "
+     "an optional flag reason.",
+     "FLAG_VIDEOS_FROM_FILE <file_path> <flag_reason> - Mark every video "
+     "listed in the file as flagged."),
+    ("ALLOW_VIDEOS_FROM_FILE", "allow_videos_from_file", (1,),
+     "Please enter ALLOW_VIDEOS_FROM_FILE command followed by a file path.",
+     "ALLOW_VIDEOS_FROM_FILE <file_path> - Removes the flags from every "
+     "video listed in the file."),
+)
+
+# The built-in commands reading a file named by the user.
+_FILE_COMMANDS = frozenset(("FLAG_VIDEOS_FROM_FILE", "ALLOW_VIDEOS_FROM_FILE"))
+
+
 class CommandParser:
     """A class used to parse and execute a user Command."""
 
-    def __init__(self, video_player):
+    # The name statistics are recorded under for unknown commands, so that
+    # mistyped commands cannot grow the statistics without bound.
+    UNKNOWN_COMMAND = "UNKNOWN"
+
+    def __init__(self, video_player, output=None, stats=None,
+                 allow_file_commands=True):
+        """The CommandParser class is initialized.
+
+        Args:
+            video_player: The VideoPlayer executing the commands.
+            output: The OutputSink messages are written to, the player's
+                if not given.
+            stats: The CommandStats every command execution is recorded
+                in, None to turn instrumentation off.
+            allow_file_commands: Whether commands may name files to read
+                or write. Turn off when the commands come from untrusted
+                clients, such as the server's.
+        """
         self._player = video_player
+        self._output = video_player.output if output is None else output
+        self._stats = stats
+        # Command name -> Command, resolved with a single lookup per command.
+        self._commands = {}
+        for name, method, arities, usage_error, help_text in _PLAYER_COMMANDS:
+            if not allow_file_commands and name in _FILE_COMMANDS:
+                continue
+            self.register_command(name, getattr(video_player, method),
+                                  arities, usage_error, help_text)
+        if allow_file_commands:
+            self.register_command(
+                "STATS", self._show_stats, (0, 1),
+                "Please enter STATS command followed by an optional file "
+                "path.",
+                "STATS <file_path> - Displays the count, errors and latency "
+                "of every command, or exports them to the file in the "
+                "Prometheus text format.")
+        else:
+            self.register_command(
+                "STATS", self._show_stats, (0,),
+                "Please enter STATS command without arguments.",
+                "STATS - Displays the count, errors and latency of every "
+                "command.")
+        self.register_command("HELP", self._get_help, None, None,
+                              "HELP - Displays help.")
+
+    @property
+    def stats(self):
+        """Returns the CommandStats commands are recorded in, or None."""
+        return self._stats
+
+    @property
+    def output(self):
+        """Returns the OutputSink command output is written to."""
+        return self._output
+
+    def register_command(self, name, handler, arities, usage_error,
+                         help_text):
+        """Registers a command, replacing any command with the same name.
+
+        Args:
+            name: The command name, matched case insensitively.
+            handler: Called with the command arguments.
+            arities: The allowed numbers of arguments, or None for a command
+                taking no arguments and ignoring extra words.
+            usage_error: The CommandException message for any other number
+                of arguments.
+            help_text: The line describing the command in HELP.
+        """
+        self._commands[name.upper()] = Command(
+            handler, None if arities is None else tuple(arities),
+            usage_error, help_text)
 
     def execute_command(self, command: Sequence[str]):
         """Executes the user command. Expects the command to be upper case.
            Raises CommandException if a command cannot be parsed.
+           The output of the command is flushed once it has finished.
+           With statistics on, its duration is recorded; it counts as an
+           error if it raised or is not a known command.
         """
+        stats = self._stats
+        if stats is None:
+            try:
+                self._execute_command(command)
+            finally:
+                self._output.flush()
+            return
+
+        start = time.perf_counter_ns()
+        error = True
+        try:
+            error = not self._execute_command(command)
+        finally:
+            self._output.flush()
+            name = command[0].upper() if command else ""
+            stats.record(name if name in self._commands
+                         else self.UNKNOWN_COMMAND,
+                         time.perf_counter_ns() - start, error)
+
+    def _execute_command(self, command: Sequence[str]) -> bool:
+        # Returns whether the command is a known one.
         if not command:
             raise CommandException(
                 "Please enter a valid command, "
                 "type HELP for a list of available commands.")
 
-        if command[0].upper() == "NUMBER_OF_VIDEOS":
-            self._player.number_of_videos()
-
-        elif command[0].upper() == "SHOW_ALL_VIDEOS":
-            self._player.show_all_videos()
-
-        elif command[0].upper() == "PLAY":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter PLAY command followed by video_id.")
-            self._player.play_video(command[1])
-
-        elif command[0].upper() == "PLAY_RANDOM":
-            self._player.play_random_video()
-
-        elif command[0].upper() == "STOP":
-            self._player.stop_video()
-
-        elif command[0].upper() == "PAUSE":
-            self._player.pause_video()
-
-        elif command[0].upper() == "CONTINUE":
-            self._player.continue_video()
-
-        elif command[0].upper() == "SHOW_PLAYING":
-            self._player.show_playing()
-
-        elif command[0].upper() == "CREATE_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter CREATE_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.create_playlist(command[1])
-
-        elif command[0].upper() == "ADD_TO_PLAYLIST":
-            if len(command) != 3:
-                raise CommandException(
-                    "Please enter ADD_TO_PLAYLIST command followed by a "
-                    "playlist name and video_id to add.")
-            self._player.add_to_playlist(command[1], command[2])
-
-        elif command[0].upper() == "REMOVE_FROM_PLAYLIST":
-            if len(command) != 3:
-                raise CommandException(
-                    "Please enter REMOVE_FROM_PLAYLIST command followed by a "
-                    "playlist name and video_id to remove.")
-            self._player.remove_from_playlist(command[1], command[2])
-
-        elif command[0].upper() == "CLEAR_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter CLEAR_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.clear_playlist(command[1])
-
-        elif command[0].upper() == "DELETE_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter DELETE_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.delete_playlist(command[1])
-
-        elif command[0].upper() == "SHOW_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter SHOW_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.show_playlist(command[1])
-
-        elif command[0].upper() == "SHOW_ALL_PLAYLISTS":
-            self._player.show_all_playlists()
-
-        elif command[0].upper() == "SEARCH_VIDEOS":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter SEARCH_VIDEOS command followed by a "
-                    "search term.")
-            self._player.search_videos(command[1])
-
-        elif command[0].upper() == "SEARCH_VIDEOS_WITH_TAG":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter SEARCH_VIDEOS_WITH_TAG command followed by a "
-                    "video tag.")
-            self._player.search_videos_tag(command[1])
-
-        elif command[0].upper() == "FLAG_VIDEO":
-            if len(command) == 3:
-                self._player.flag_video(command[1], command[2])
-            elif len(command) == 2:
-                self._player.flag_video(command[1])
-            else:
-                raise CommandException(
-                    "Please enter FLAG_VIDEO command followed by a "
-                    "video_id and an optional flag reason.")
-
-        elif command[0].upper() == "ALLOW_VIDEO":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter ALLOW_VIDEO command followed by a "
-                    "video_id.")
-            self._player.allow_video(command[1])
-
-        elif command[0].upper() == "HELP":
-            self._get_help()
-        else:
-            print(
+        spec = self._commands.get(command[0].upper())
+        if spec is None:
+            self._output.write(
                 "Please enter a valid command, type HELP for a list of "
                 "available commands.")
+            return False
+        if spec.arities is None:
+            spec.handler()
+        elif len(command) - 1 in spec.arities:
+            spec.handler(*command[1:])
+        else:
+            raise CommandException(spec.usage_error)
+        return True
+
+    def _show_stats(self, file_path=None):
+        """Displays the command statistics, or exports them to a file."""
+        if self._stats is None:
+            self._output.write("Command statistics are disabled.")
+        elif file_path is not None:
+            try:
+                self._stats.write_prometheus(file_path)
+            except OSError:
+                self._output.write(
+                    "Cannot export command statistics: File could not be "
+                    "written")
+            else:
+                self._output.write(
+                    "Exported command statistics to " + file_path)
+        else:
+            self._output.write("Command statistics:")
+            for line in self._stats.format_lines():
+                self._output.write(line)
 
     def _get_help(self):
         """Displays all available commands to the user."""
-        help_text = textwrap.dedent("""
-        Available commands:
-            NUMBER_OF_VIDEOS - Shows how many videos are in the library.
-            SHOW_ALL_VIDEOS - Lists all videos from the library.
-            PLAY <video_id> - Plays specified video.
-            PLAY_RANDOM - Plays a random video from the library.
-            STOP - Stop the current video.
-            PAUSE - Pause the current video.
-            CONTINUE - Resume the current paused video.
-            SHOW_PLAYING - Displays the title, url and paused status of the video that is currently playing (or paused).
-            CREATE_PLAYLIST <playlist_name> - Creates a new (empty) playlist with the provided name.
-            ADD_TO_PLAYLIST <playlist_name> <video_id> - Adds the requested video to the playlist.
-            REMOVE_FROM_PLAYLIST <playlist_name> <video_id> - Removes the specified video from the specified playlist
-            CLEAR_PLAYLIST <playlist_name> - Removes all the videos from the playlist.
-            DELETE_PLAYLIST <playlist_name> - Deletes the playlist.
-            SHOW_PLAYLIST <playlist_name> - List all the videos in this playlist.
-            SHOW_ALL_PLAYLISTS - Display all the available playlists.
-            SEARCH_VIDEOS <search_term> - Display all the videos whose titles contain the search_term.
-            SEARCH_VIDEOS_WITH_TAG <tag_name> -Display all videos whose tags contains the provided tag.
-            FLAG_VIDEO <video_id> <flag_reason> - Mark a video as flagged.
-            ALLOW_VIDEO <video_id> - Removes a flag from a video.
-            HELP - Displays help.
-            EXIT - Terminates the program execution.
-        """)
-        print(help_text)
+        lines = ["", "Available commands:"]
+        lines.extend("    " + spec.help_text
+                     for spec in self._commands.values())
+        lines.append("    EXIT - Terminates the program execution.")
+        lines.append("")
+        self._output.write("\n".join(lines))
@@ -0,0 +1,176 @@
+"""Per-command counters and latency histograms."""
+
+import os
+
+# Histograms keep 2 ** _SUB_BUCKET_BITS buckets per power of two, so a
+# recorded latency is known to within 1 / 2 ** _SUB_BUCKET_BITS (12.5%).
+_SUB_BUCKET_BITS = 3
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS
+# Enough buckets for latencies of up to 2 ** 63 nanoseconds.
+_BUCKET_COUNT = (64 - _SUB_BUCKET_BITS) * _SUB_BUCKETS
+
+_METRIC = "youtube_command"
+
+
+def _label(name):
+    return 'command="{}"'.format(
+        name.replace("\\", "\\\\").replace('"', '\\"'))
+
+
+def _bucket_index(nanoseconds):
+    # Values below 2 * _SUB_BUCKETS have a bucket each; above, a value
+    # falls in one of the _SUB_BUCKETS buckets of its power of two.
+    shift = nanoseconds.bit_length() - _SUB_BUCKET_BITS - 1
+    if shift <= 0:
+        return nanoseconds
+    return shift * _SUB_BUCKETS + (nanoseconds >> shift)
+
+
+def _bucket_upper_bound(index):
+    # The largest value stored in a bucket, in nanoseconds.
+    if index < 2 * _SUB_BUCKETS:
+        return index
+    shift = index // _SUB_BUCKETS - 1
+    return ((index - shift * _SUB_BUCKETS + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """A class used to represent a log-bucketed latency histogram.
+
+    Like an HDR histogram, buckets are logarithmic with a fixed number of
+    linear sub-buckets, so recording is O(1) and the relative error of a
+    percentile is bounded whatever the latency.
+    """
+
+    def __init__(self):
+        """The LatencyHistogram class is initialized."""
+        self._counts = [0] * _BUCKET_COUNT
+        self._sum = 0
+        self._max = 0
+
+    @property
+    def count(self) -> int:
+        """Returns the number of recorded latencies."""
+        # Counted from the buckets, to keep record() as cheap as possible.
+        return sum(self._counts)
+
+    @property
+    def sum_seconds(self) -> float:
+        """Returns the sum of the recorded latencies."""
+        return self._sum / 1e9
+
+    @property
+    def max_seconds(self) -> float:
+        """Returns the largest recorded latency."""
+        return self._max / 1e9
+
+    def record(self, nanoseconds: int):
+        """Records a latency given in nanoseconds."""
+        self._counts[_bucket_index(nanoseconds)] += 1
+        self._sum += nanoseconds
+        if nanoseconds > self._max:
+            self._max = nanoseconds
+
+    def percentile(self, fraction: float) -> float:
+        """Returns the latency in seconds below which 'fraction' of the
+        recorded latencies fall, rounded up to its bucket."""
+        count = self.count
+        if not count:
+            return 0.0
+        rank = max(1, round(fraction * count))
+        seen = 0
+        for index, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(_bucket_upper_bound(index), self._max) / 1e9
+        return self._max / 1e9
+
+    def buckets(self):
+        """Yields (upper bound in seconds, cumulative count) for every
+        non-empty bucket, in increasing order."""
+        seen = 0
+        for index, count in enumerate(self._counts):
+            if count:
+                seen += count
+                yield _bucket_upper_bound(index) / 1e9, seen
+
+
+class CommandStats:
+    """A class used to represent the counters of the executed commands.
+
+    For every command name, keeps the number of executions, the number of
+    them that failed, and a LatencyHistogram of their durations.
+    """
+
+    def __init__(self):
+        """The CommandStats class is initialized."""
+        # Command name -> LatencyHistogram, and -> number of errors.
+        self._histograms = {}
+        self._errors = {}
+
+    def record(self, name: str, nanoseconds: int, error: bool = False):
+        """Records one execution of a command.
+
+        Args:
+            name: The command name.
+            nanoseconds: How long the command took.
+            error: Whether the command failed.
+        """
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = LatencyHistogram()
+        histogram.record(nanoseconds)
+        if error:
+            self._errors[name] = self._errors.get(name, 0) + 1
+
+    def commands(self):
+        """Yields (name, count, errors, LatencyHistogram) by command name."""
+        for name in sorted(self._histograms):
+            histogram = self._histograms[name]
+            yield (name, histogram.count, self._errors.get(name, 0),
+                   histogram)
+
+    def format_lines(self):
+        """Returns the lines displaying the statistics to the user."""
+        lines = []
+        for name, count, errors, histogram in self.commands():
+            lines.append(
+                "    {}: {} calls, {} errors, p50 {:.1f}us, p99 {:.1f}us, "
+                "max {:.1f}us".format(
+                    name, count, errors, histogram.percentile(0.5) * 1e6,
+                    histogram.percentile(0.99) * 1e6,
+                    histogram.max_seconds * 1e6))
+        return lines
+
+    def prometheus_text(self) -> str:
+        """Returns the statistics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP {}_duration_seconds Latency of player commands.".format(
+                _METRIC),
+            "# TYPE {}_duration_seconds histogram".format(_METRIC)]
+        for name, count, errors, histogram in self.commands():
+            label = _label(name)
+            for bound, seen in histogram.buckets():
+                lines.append('{}_duration_seconds_bucket{{{},le="{:.9g}"}} {}'
+                             .format(_METRIC, label, bound, seen))
+            lines.append('{}_duration_seconds_bucket{{{},le="+Inf"}} {}'
+                         .format(_METRIC, label, count))
+            lines.append("{}_duration_seconds_sum{{{}}} {:.9g}".format(
+                _METRIC, label, histogram.sum_seconds))
+            lines.append("{}_duration_seconds_count{{{}}} {}".format(
+                _METRIC, label, count))
+        lines.append("# HELP {}_errors_total Failed player commands.".format(
+            _METRIC))
+        lines.append("# TYPE {}_errors_total counter".format(_METRIC))
+        for name, count, errors, histogram in self.commands():
+            lines.append("{}_errors_total{{{}}} {}".format(
+                _METRIC, _label(name), errors))
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Writes prometheus_text() to a file, replacing it atomically so
+        a collector never reads a partial file."""
+        tmp_path = str(path) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as stats_file:
+            stats_file.write(self.prometheus_text())
+        os.replace(tmp_path, path)
@@ -0,0 +1,152 @@
+"""A flag store class."""
+
+import random
+
+
+class FlagStore:
+    """A class used to represent the moderation state of a catalog.
+
+    Keeps the flagged videos with their reasons, and a dense array of the
+    unflagged video ids with the position of each id in it, so videos can be
+    picked at random and flagged in O(1).
+    """
+
+    def __init__(self, video_ids=(), is_video=None):
+        """The FlagStore class is initialized.
+
+        Args:
+            video_ids: The ids of every video of the catalog.
+            is_video: Returns whether an id is in the catalog, so that
+                unflagging a video no longer in it, such as one flagged by
+                a replayed journal, does not make it playable. Every id is
+                taken to be in the catalog if not given.
+        """
+        self._is_video = is_video
+        self._flagged = {}
+        self._playable = list(video_ids)
+        # The position map is built on the first flag, most sessions never
+        # need it.
+        self._playable_positions = None
+        self._journal = None
+        # Bumped on every change to the flags, see generation.
+        self._generation = 0
+
+    def set_journal(self, journal):
+        """Sets the StateJournal flag changes are recorded to, None for none."""
+        self._journal = journal
+
+    @property
+    def generation(self) -> int:
+        """Returns a counter bumped whenever the flags change."""
+        return self._generation
+
+    @property
+    def flagged(self) -> dict:
+        """Returns dictionary of flagged video_ids."""
+        return self._flagged
+
+    def flag_video(self, video_id, reason=""):
+        """Add flagged status to video id with optional reason"""
+        self._flagged[video_id] = reason
+        self._generation += 1
+        self._remove_playable(video_id)
+        if self._journal is not None:
+            self._journal.record("flags", "flag_video", video_id, reason)
+
+    def unflag_video(self, video_id):
+        """Remove flagged status to video id"""
+        self._flagged.pop(video_id)
+        self._generation += 1
+        if self._is_video is None or self._is_video(video_id):
+            self._add_playable(video_id)
+        if self._journal is not None:
+            self._journal.record("flags", "unflag_video", video_id)
+
+    def flag_videos(self, reasons):
+        """Flags many videos at once, updating the playable videos once.
+
+        Args:
+            reasons: The (video_id, reason) pairs of the videos to flag.
+        """
+        reasons = dict(reasons)
+        if not reasons:
+            return
+        self._flagged.update(reasons)
+        self._generation += 1
+        if len(reasons) * 8 < len(self._playable):
+            for video_id in reasons:
+                self._remove_playable(video_id)
+        else:
+            self._playable = [video_id for video_id in self._playable
+                              if video_id not in reasons]
+            self._playable_positions = None
+        if self._journal is not None:
+            self._journal.record("flags", "flag_videos", list(reasons.items()))
+
+    def unflag_videos(self, video_ids):
+        """Removes the flags of many videos at once.
+
+        Args:
+            video_ids: The ids of the videos to unflag; ids that are not
+                flagged are ignored.
+        """
+        unflagged = []
+        for video_id in video_ids:
+            if video_id in self._flagged:
+                del self._flagged[video_id]
+                unflagged.append(video_id)
+        if not unflagged:
+            return
+        self._generation += 1
+        playable = (unflagged if self._is_video is None
+                    else [video_id for video_id in unflagged
+                          if self._is_video(video_id)])
+        if self._playable_positions is None:
+            # Flagged videos are never playable, so no id is added twice.
+            self._playable.extend(playable)
+        else:
+            for video_id in playable:
+                self._add_playable(video_id)
+        if self._journal is not None:
+            self._journal.record("flags", "unflag_videos", unflagged)
+
+    def add_video(self, video_id):
+        """Makes a video added to the catalog playable unless flagged."""
+        if video_id not in self._flagged:
+            self._add_playable(video_id)
+
+    def remove_video(self, video_id):
+        """Forgets a video removed from the catalog, and any flag on it."""
+        if self._flagged.pop(video_id, None) is not None:
+            self._generation += 1
+        self._remove_playable(video_id)
+
+    def _playable_position_map(self):
+        if self._playable_positions is None:
+            self._playable_positions = {
+                video_id: position
+                for position, video_id in enumerate(self._playable)}
+        return self._playable_positions
+
+    def _add_playable(self, video_id):
+        positions = self._playable_position_map()
+        if video_id not in positions:
+            positions[video_id] = len(self._playable)
+            self._playable.append(video_id)
+
+    def _remove_playable(self, video_id):
+        # Swap the last id into the removed slot so removal is O(1).
+        positions = self._playable_position_map()
+        position = positions.pop(video_id, None)
+        if position is None:
+            return
+        last = self._playable.pop()
+        if last != video_id:
+            self._playable[position] = last
+            positions[last] = position
+
+    def random_video_id(self):
+        """Returns the id of a random unflagged video, or None if none."""
+        if not self._playable:
+            return None
+        return random.choice(self._playable)
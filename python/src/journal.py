@@ -0,0 +1,274 @@
+"""A write-ahead journal persisting playlists and flags."""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+# How often journal records are forced to disk.
+FSYNC_ALWAYS = "always"  # every record is written and fsynced on its own
+FSYNC_BATCH = "batch"    # records are written and fsynced per group commit
+FSYNC_NEVER = "never"    # records are written per group commit, never fsynced
+FSYNC_MODES = (FSYNC_ALWAYS, FSYNC_BATCH, FSYNC_NEVER)
+
+_SNAPSHOT_NAME = "snapshot.json"
+_SEGMENT_PATTERN = "journal-{:08d}.log"
+
+
+def _fsync_directory(directory):
+    # Makes renames and new files in 'directory' durable, where supported.
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class StateJournal:
+    """A class used to represent the journal of a Playlist and a FlagStore.
+
+    Every change made to the attached playlists and flags is appended to a
+    journal segment. Records are buffered and written together (group
+    commit) when the buffer is full, every 'group_interval' seconds, and on
+    flush() and close(). Once a segment holds 'compact_every' records a new
+    one is started, and a background thread writes a snapshot of the state
+    and deletes the segments it covers. Opening the journal replays the
+    snapshot and the remaining segments, so startup never replays more than
+    about 'compact_every' records.
+    """
+
+    def __init__(self, directory, fsync=FSYNC_BATCH, group_size=64,
+                 group_interval=0.05, compact_every=10000):
+        """The StateJournal class is initialized.
+
+        Args:
+            directory: The directory holding the snapshot and the journal
+                segments, created if needed.
+            fsync: One of FSYNC_MODES.
+            group_size: The number of records buffered before they are
+                written.
+            group_interval: The longest time in seconds a record stays
+                buffered; 0 or None to only write on a full buffer and on
+                flush().
+            compact_every: The number of records after which the journal
+                is compacted into a snapshot.
+        """
+        if fsync not in FSYNC_MODES:
+            raise ValueError("fsync must be one of {}".format(
+                ", ".join(FSYNC_MODES)))
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._fsync = fsync
+        self._group_size = 1 if fsync == FSYNC_ALWAYS else group_size
+        self._compact_every = compact_every
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._targets = {}
+        self._segment = None
+        self._segment_file = None
+        self._segment_records = 0
+        self._compaction = None
+        self._closed = threading.Event()
+        self._flusher = None
+        if group_interval and fsync != FSYNC_ALWAYS:
+            self._flusher = threading.Thread(
+                target=self._flush_periodically, args=(group_interval,),
+                daemon=True)
+
+    def attach(self, playlist, flags):
+        """Restores the saved state into 'playlist' and 'flags' and starts
+        journaling their changes.
+
+        Args:
+            playlist: An empty Playlist.
+            flags: A FlagStore without flags, or None to only journal the
+                playlists.
+        """
+        self._targets = {"playlist": playlist}
+        if flags is not None:
+            self._targets["flags"] = flags
+        covered = self._load_snapshot(playlist, flags)
+        segments = [segment for segment in self._segments()
+                    if segment > covered]
+        replayed = 0
+        records = 0
+        for segment in segments:
+            records = self._replay(segment)
+            replayed += records
+        # Keep appending to the last segment, so restarts do not pile up
+        # small segments.
+        self._open_segment(segments[-1] if segments else covered + 1)
+        self._segment_records = records
+        for target in self._targets.values():
+            target.set_journal(self)
+        if replayed >= self._compact_every:
+            self.compact()
+        if self._flusher is not None:
+            self._flusher.start()
+
+    def record(self, target, operation, *args):
+        """Appends a change to the journal.
+
+        Args:
+            target: "playlist" or "flags".
+            operation: The name of the method of the target that made the
+                change, called again with 'args' when replaying.
+        """
+        line = json.dumps([target, operation, args],
+                          separators=(",", ":")) + "\n"
+        with self._lock:
+            self._buffer.append(line)
+            self._segment_records += 1
+            if len(self._buffer) >= self._group_size:
+                self._write_buffer()
+            if self._segment_records >= self._compact_every:
+                self._start_compaction()
+
+    def flush(self):
+        """Writes every buffered record to the journal."""
+        with self._lock:
+            self._write_buffer()
+
+    def compact(self):
+        """Snapshots the state now and waits for the snapshot to be saved."""
+        with self._lock:
+            self._write_buffer()
+            self._start_compaction()
+        self._wait_for_compaction()
+
+    def close(self):
+        """Writes the buffered records and stops journaling."""
+        self._closed.set()
+        if self._flusher is not None and self._flusher.is_alive():
+            self._flusher.join()
+        with self._lock:
+            self._write_buffer()
+            if self._segment_file is not None:
+                self._segment_file.close()
+                self._segment_file = None
+        self._wait_for_compaction()
+        for target in self._targets.values():
+            target.set_journal(None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _flush_periodically(self, interval):
+        while not self._closed.wait(interval):
+            self.flush()
+
+    def _write_buffer(self):
+        # Group commit: one write, and at most one fsync, for all buffered
+        # records. Called with the lock held.
+        if not self._buffer or self._segment_file is None:
+            return
+        self._segment_file.write("".join(self._buffer))
+        self._buffer.clear()
+        self._segment_file.flush()
+        if self._fsync != FSYNC_NEVER:
+            os.fsync(self._segment_file.fileno())
+
+    def _segment_path(self, segment):
+        return self._directory / _SEGMENT_PATTERN.format(segment)
+
+    def _segments(self):
+        segments = []
+        for path in self._directory.glob("journal-*.log"):
+            try:
+                segments.append(int(path.stem.split("-")[1]))
+            except (IndexError, ValueError):
+                continue
+        return sorted(segments)
+
+    def _open_segment(self, segment):
+        self._segment = segment
+        self._segment_file = open(self._segment_path(segment), "a",
+                                  encoding="utf-8")
+        self._segment_records = 0
+        _fsync_directory(self._directory)
+
+    def _replay(self, segment):
+        """Replays a segment, returning the number of records in it."""
+        count = 0
+        with open(self._segment_path(segment), "rb+") as journal:
+            for line in journal:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("Unterminated record")
+                    target, operation, args = json.loads(line)
+                except ValueError:
+                    # A record torn by a crash can only be the last one;
+                    # cut it off so new records are appended after the
+                    # last complete one.
+                    journal.seek(-len(line), os.SEEK_CUR)
+                    journal.truncate()
+                    break
+                if target in self._targets:
+                    getattr(self._targets[target], operation)(*args)
+                count += 1
+        return count
+
+    def _load_snapshot(self, playlist, flags):
+        """Restores the snapshot, returning the last segment it covers."""
+        try:
+            with open(self._directory / _SNAPSHOT_NAME,
+                      encoding="utf-8") as snapshot:
+                state = json.load(snapshot)
+        except FileNotFoundError:
+            return 0
+        for playlist_name, videos in state["playlists"]:
+            playlist.create_playlist(playlist_name)
+            for video_id in videos:
+                playlist.add_to_playlist(playlist_name, video_id)
+        if flags is not None:
+            for video_id, reason in state["flags"]:
+                flags.flag_video(video_id, reason)
+        return state["segment"]
+
+    def _start_compaction(self):
+        # Called with the lock held: the state is copied and a new segment
+        # started synchronously, the snapshot is written in the background.
+        # Buffered records are already in the copied state, so they must
+        # land in the segment the snapshot covers, not in the new one.
+        self._write_buffer()
+        self._wait_for_compaction()
+        playlists = self._targets["playlist"].playlists
+        state = {
+            "segment": self._segment,
+            "playlists": [[playlist["name"], list(playlist["videos"])]
+                          for playlist in playlists.values()],
+            "flags": (list(self._targets["flags"].flagged.items())
+                      if "flags" in self._targets else []),
+        }
+        self._segment_file.close()
+        self._open_segment(self._segment + 1)
+        self._compaction = threading.Thread(
+            target=self._write_snapshot, args=(state,), daemon=True)
+        self._compaction.start()
+
+    def _wait_for_compaction(self):
+        if self._compaction is not None:
+            self._compaction.join()
+            self._compaction = None
+
+    def _write_snapshot(self, state):
+        path = self._directory / _SNAPSHOT_NAME
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as snapshot:
+            json.dump(state, snapshot, separators=(",", ":"))
+            snapshot.flush()
+            if self._fsync != FSYNC_NEVER:
+                os.fsync(snapshot.fileno())
+        os.replace(tmp_path, path)
+        _fsync_directory(self._directory)
+        for segment in self._segments():
+            if segment <= state["segment"]:
+                self._segment_path(segment).unlink()
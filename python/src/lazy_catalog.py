@@ -0,0 +1,110 @@
+"""A memory-mapped, lazily decoded video catalog."""
+
+from collections.abc import MutableMapping
+from .catalog_parser import read_videos
+import mmap
+
+# Number of bytes of the catalog split into lines at a time while scanning.
+_SCAN_BLOCK_SIZE = 1 << 22
+
+
+class LazyVideoMap(MutableMapping):
+    """A class used to represent a lazily decoded video_id -> Video mapping.
+
+    Opening the map only scans videos.txt for the id of every line and keeps
+    its byte range. The title and tags of a line are decoded the first time
+    its video is looked up, so only touched videos take heap memory.
+    """
+
+    def __init__(self, path):
+        """The LazyVideoMap class is initialized."""
+        self._file = open(path, "rb")
+        size = self._file.seek(0, 2)
+        # mmap refuses empty files, and an empty catalog needs no mapping.
+        self._data = (mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                      if size else b"")
+        # video_id -> byte offset of its line, None for videos that were
+        # added after loading and only live in the cache.
+        self._offsets = {}
+        self._cache = {}
+        self._tag_cache = {}
+        self._scan()
+
+    def _scan(self):
+        # Split fixed-size blocks of the map in C instead of walking it line
+        # by line; only the current block is copied onto the heap.
+        data = self._data
+        offsets = self._offsets
+        size = len(data)
+        start = 0
+        while start < size:
+            stop = start + _SCAN_BLOCK_SIZE
+            if stop >= size:
+                stop = size
+            else:
+                newline = data.rfind(b"\n", start, stop)
+                if newline == -1:
+                    newline = data.find(b"\n", stop)
+                stop = size if newline == -1 else newline + 1
+            position = start
+            for line in data[start:stop].split(b"\n"):
+                fields = line.split(b"|")
+                if len(fields) == 3 and b'"' not in line:
+                    offsets[fields[1].decode().strip()] = position
+                elif line or position < stop:
+                    # Quoted fields or malformed lines go through the CSV
+                    # parser, which raises on malformed lines like the eager
+                    # loader does.
+                    offsets[self._decode(position).video_id] = position
+                position += len(line) + 1
+            start = stop
+
+    def _decode(self, start):
+        end = self._data.find(b"\n", start)
+        if end == -1:
+            end = len(self._data)
+        line = self._data[start:end].decode()
+        for video in read_videos([line], self._tag_cache):
+            return video
+        raise ValueError("Invalid catalog line: {!r}".format(line))
+
+    def copy(self):
+        """Returns an independent map sharing this map's memory map."""
+        videos = LazyVideoMap.__new__(LazyVideoMap)
+        videos._file = self._file
+        videos._data = self._data
+        videos._offsets = dict(self._offsets)
+        videos._cache = dict(self._cache)
+        videos._tag_cache = self._tag_cache
+        return videos
+
+    def close(self):
+        """Releases the memory map and the underlying file."""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __getitem__(self, video_id):
+        video = self._cache.get(video_id)
+        if video is None:
+            video = self._cache[video_id] = self._decode(
+                self._offsets[video_id])
+        return video
+
+    def __setitem__(self, video_id, video):
+        if video_id not in self._offsets:
+            self._offsets[video_id] = None
+        self._cache[video_id] = video
+
+    def __delitem__(self, video_id):
+        del self._offsets[video_id]
+        self._cache.pop(video_id, None)
+
+    def __contains__(self, video_id):
+        return video_id in self._offsets
+
+    def __iter__(self):
+        return iter(self._offsets)
+
+    def __len__(self):
+        return len(self._offsets)
@@ -0,0 +1,91 @@
+"""Output sinks the video player writes its messages to."""
+
+import abc
+import sys
+
+
+class OutputSink(abc.ABC):
+    """A class used to represent where command output is written.
+
+    write() is called once per output line; flush() is called once a
+    command has finished, so buffering sinks can write a whole command's
+    output at once.
+    """
+
+    @abc.abstractmethod
+    def write(self, line: str):
+        """Writes a line of output."""
+
+    def flush(self):
+        """Pushes any buffered output to its destination."""
+        pass
+
+
+class PrintSink(OutputSink):
+    """A sink printing every line to stdout as soon as it is written."""
+
+    def write(self, line: str):
+        print(line)
+
+
+class StreamSink(OutputSink):
+    """A sink buffering lines and writing them to a text stream on flush.
+
+    Args:
+        stream: The text stream to write to, sys.stdout if not given. The
+            stream is looked up on every flush when not given, so it follows
+            redirections of sys.stdout.
+    """
+
+    def __init__(self, stream=None):
+        self._stream = stream
+        self._lines = []
+
+    def write(self, line: str):
+        self._lines.append(line)
+
+    def flush(self):
+        if not self._lines:
+            return
+        stream = sys.stdout if self._stream is None else self._stream
+        self._lines.append("")
+        stream.write("\n".join(self._lines))
+        stream.flush()
+        self._lines.clear()
+
+
+class MemorySink(OutputSink):
+    """A sink keeping every line in memory, for capturing a session."""
+
+    def __init__(self):
+        self.lines = []
+
+    def write(self, line: str):
+        self.lines.append(line)
+
+    def getvalue(self) -> str:
+        """Returns all the output written so far as a single string."""
+        return "".join(line + "\n" for line in self.lines)
+
+    def clear(self):
+        """Forgets all the output written so far."""
+        self.lines.clear()
+
+
+class SocketSink(OutputSink):
+    """A sink buffering lines and sending them over a socket on flush."""
+
+    def __init__(self, sock, encoding="utf-8"):
+        self._socket = sock
+        self._encoding = encoding
+        self._lines = []
+
+    def write(self, line: str):
+        self._lines.append(line)
+
+    def flush(self):
+        if not self._lines:
+            return
+        self._lines.append("")
+        self._socket.sendall("\n".join(self._lines).encode(self._encoding))
+        self._lines.clear()
@@ -0,0 +1,78 @@
+"""Parallel parsing of large videos.txt catalogs."""
+
+from concurrent.futures import ProcessPoolExecutor
+import io
+import locale
+import os
+import sys
+
+from .catalog_parser import read_videos
+from .video import Video
+
+# Catalogs smaller than this are parsed in the calling process, as starting
+# a process pool costs more than parsing them.
+MIN_PARALLEL_SIZE = 8 << 20
+
+
+def _chunk_bounds(path, chunk_size):
+    """Returns (start, end) byte ranges of 'path' split at line boundaries."""
+    bounds = []
+    size = os.path.getsize(path)
+    with open(path, "rb") as video_file:
+        start = 0
+        while start < size:
+            video_file.seek(min(start + chunk_size, size))
+            # Move the cut to the end of the line it falls into.
+            video_file.readline()
+            end = min(video_file.tell(), size)
+            bounds.append((start, end))
+            start = end
+    return bounds
+
+
+def _parse_chunk(path, start, end, encoding):
+    with open(path, "rb") as video_file:
+        video_file.seek(start)
+        text = video_file.read(end - start).decode(encoding)
+    # Split lines like a file opened in text mode does: str.splitlines()
+    # also splits on form feeds and other separators a title may contain.
+    lines = io.StringIO(text, newline=None)
+    # Plain tuples pickle much faster than Video objects.
+    return [(video.title, video.video_id, video.tags)
+            for video in read_videos(lines)]
+
+
+def read_videos_parallel(path, workers=None, chunk_size=None):
+    """Parses a catalog file into a video_id -> Video dictionary.
+
+    The file is split at line boundaries and the chunks are parsed in a
+    process pool. The chunks are merged in file order, so duplicate ids,
+    whitespace and empty tags are handled exactly like read_videos does.
+    Quoted fields spanning several lines are not supported.
+
+    Args:
+        path: The catalog file.
+        workers: The number of worker processes, os.cpu_count() by default.
+        chunk_size: The approximate size in bytes of each chunk, by default
+            the file split into four chunks per worker.
+    """
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(path)
+    if chunk_size is None:
+        chunk_size = max(1, -(-size // (workers * 4)))
+    encoding = locale.getpreferredencoding(False)
+    bounds = _chunk_bounds(path, chunk_size)
+    videos = {}
+    tag_cache = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_parse_chunk, path, start, end, encoding)
+                   for start, end in bounds]
+        for future in futures:
+            for title, video_id, tags in future.result():
+                # Interning and tag sharing are per process, redo them here.
+                video_id = sys.intern(video_id)
+                shared_tags = tag_cache.get(tags)
+                if shared_tags is None:
+                    shared_tags = tag_cache[tags] = tuple(map(sys.intern, tags))
+                videos[video_id] = Video(title, video_id, shared_tags)
+    return videos
@@ -0,0 +1,92 @@
+"""A query result cache class."""
+
+from collections import OrderedDict
+
+# The default number of queries kept by a QueryCache.
+DEFAULT_CAPACITY = 256
+
+# Results longer than this are not cached: they would crowd out many
+# small results, and are dominated by the cost of printing them anyway.
+MAX_RESULT_SIZE = 10000
+
+
+class QueryCache:
+    """A class used to represent a bounded LRU cache of query results.
+
+    Every entry is stored with the generation of the data it was computed
+    from. A lookup with a different generation is a miss and drops the
+    entry, so bumping the generation invalidates the whole cache in O(1).
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY,
+                 max_result_size=MAX_RESULT_SIZE):
+        """The QueryCache class is initialized.
+
+        Args:
+            capacity: The largest number of cached queries, 0 to disable
+                the cache.
+            max_result_size: The longest result that is cached.
+        """
+        self._capacity = capacity
+        self._max_result_size = max_result_size
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def capacity(self) -> int:
+        """Returns the largest number of cached queries, 0 if disabled."""
+        return self._capacity
+
+    @property
+    def max_result_size(self) -> int:
+        """Returns the length of the longest result that is cached."""
+        return self._max_result_size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, generation):
+        """Returns the cached result of a query, None if there is none.
+
+        Args:
+            key: The normalized query.
+            generation: The current generation of the queried data.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] == generation:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            del self._entries[key]
+        self._misses += 1
+        return None
+
+    def put(self, key, generation, result):
+        """Caches the result of a query, evicting the least recently used.
+
+        Args:
+            key: The normalized query.
+            generation: The generation of the data the result comes from.
+            result: The result, which must not be modified afterwards.
+        """
+        if self._capacity <= 0 or len(result) > self._max_result_size:
+            return
+        self._entries[key] = (generation, result)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def clear(self):
+        """Drops every cached result, keeping the counters."""
+        self._entries.clear()
+
+    @property
+    def stats(self) -> dict:
+        """Returns the hits, misses, evictions, size and capacity."""
+        return {"hits": self._hits, "misses": self._misses,
+                "evictions": self._evictions, "size": len(self._entries),
+                "capacity": self._capacity}
@@ -1,21 +1,154 @@
 """A youtube terminal simulator."""
+from .command_stats import CommandStats
+from .journal import FSYNC_BATCH, FSYNC_MODES, StateJournal
+from .output_sink import StreamSink
+from .video_library import BACKENDS, open_video_library
 from .video_player import VideoPlayer
 from .command_parser import CommandException
 from .command_parser import CommandParser
+import argparse
+import contextlib
+import functools
+import sys
+import time
 
 
-if __name__ == "__main__":
+def run_interactive(parser, before_command=None):
+    """Reads commands from the user until EXIT.
+
+    'before_command', if given, is called before each command is executed.
+    """
     print("""Hello and welcome to YouTube, what would you like to do?
     Enter HELP for list of available commands or EXIT to terminate.""")
-    video_player = VideoPlayer()
-    parser = CommandParser(video_player)
     while True:
         command = input("YT> ")
         if command.upper() == "EXIT":
             break
+        if before_command is not None:
+            before_command()
         try:
             parser.execute_command(command.split())
         except CommandException as e:
             print(e)
     print("YouTube has now terminated its execution. "
           "Thank you and goodbye!")
+
+
+def run_batch(parser, lines, before_command=None):
+    """Executes commands streamed from 'lines' until EXIT or the end.
+
+    Answers to search prompts are read from the same stream, so a script
+    holds exactly what a user would type. 'before_command', if given, is
+    called before each command is executed. Returns the number of commands
+    executed.
+    """
+    count = 0
+    for line in lines:
+        command = line.rstrip("\r\n")
+        if command.upper() == "EXIT":
+            break
+        if before_command is not None:
+            before_command()
+        try:
+            parser.execute_command(command.split())
+        except CommandException as e:
+            parser.output.write(str(e))
+            parser.output.flush()
+        count += 1
+    return count
+
+
+def _reload_catalog(video_library):
+    # Reports reloads on stderr so that batch output stays comparable. A
+    # file that cannot be read or parsed leaves the catalog as it was.
+    try:
+        diff = video_library.reload_if_changed()
+    except (OSError, ValueError) as e:
+        print("Cannot reload videos: {}".format(e), file=sys.stderr)
+        return
+    if diff:
+        print("Reloaded videos: {} added, {} removed, {} changed".format(
+            len(diff.added), len(diff.removed), len(diff.changed)),
+            file=sys.stderr)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "--batch", metavar="FILE", nargs="?", const="-",
+        help="run the commands in FILE (or stdin if omitted or '-') without "
+             "prompts and print a throughput summary to stderr")
+    arg_parser.add_argument(
+        "--state-dir", metavar="DIR",
+        help="persist playlists and flags in DIR across runs")
+    arg_parser.add_argument(
+        "--fsync", choices=FSYNC_MODES, default=FSYNC_BATCH,
+        help="when journal writes are forced to disk (default: %(default)s)")
+    arg_parser.add_argument(
+        "--backend", choices=BACKENDS,
+        help="the video library backend (default: $YOUTUBE_LIBRARY_BACKEND "
+             "or dict)")
+    arg_parser.add_argument(
+        "--db", metavar="PATH",
+        help="the database of the sqlite backend (default: videos.txt.db)")
+    arg_parser.add_argument(
+        "--result-handles", action="store_true",
+        help="never prompt after a search; play results with PLAY_RESULT")
+    arg_parser.add_argument(
+        "--watch", action="store_true",
+        help="apply changes to videos.txt before the next command instead of "
+             "requiring a restart (dict backend only)")
+    arg_parser.add_argument(
+        "--no-stats", action="store_true",
+        help="do not record command counts and latencies (see STATS)")
+    arg_parser.add_argument(
+        "--stats-file", metavar="FILE",
+        help="write the command statistics to FILE in the Prometheus text "
+             "format on exit")
+    args = arg_parser.parse_args(argv)
+
+    with contextlib.ExitStack() as stack:
+        video_library = open_video_library(args.backend, db_path=args.db)
+        if args.batch is None:
+            video_player = VideoPlayer(video_library,
+                                       result_handles=args.result_handles)
+        else:
+            lines = sys.stdin if args.batch == "-" else open(args.batch)
+            lines = iter(stack.enter_context(lines))
+            video_player = VideoPlayer(
+                video_library,
+                read_answer=lambda: next(lines, "").rstrip("\r\n"),
+                output=StreamSink(), result_handles=args.result_handles)
+        if args.state_dir is not None:
+            journal = stack.enter_context(
+                StateJournal(args.state_dir, fsync=args.fsync))
+            # The sqlite backend keeps its flags in its database already.
+            journal.attach(video_player.playlist,
+                           getattr(video_library, "flag_store", None))
+            video_player.remove_missing_videos()
+
+        before_command = None
+        if args.watch:
+            if not hasattr(video_library, "reload_if_changed"):
+                arg_parser.error("--watch requires the dict backend")
+            video_library.subscribe(video_player.catalog_changed)
+            before_command = functools.partial(_reload_catalog, video_library)
+
+        stats = None if args.no_stats else CommandStats()
+        if stats is not None and args.stats_file is not None:
+            stack.callback(stats.write_prometheus, args.stats_file)
+        parser = CommandParser(video_player, stats=stats)
+
+        if args.batch is None:
+            run_interactive(parser, before_command)
+            return
+        start = time.perf_counter()
+        count = run_batch(parser, lines, before_command)
+        elapsed = time.perf_counter() - start
+    sys.stdout.flush()
+    print("{} commands in {:.3f}s ({:.0f} commands/sec)".format(
+        count, elapsed, count / elapsed if elapsed else 0.0),
+        file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""A network server exposing the YouTube command protocol.
+
+Every connection gets its own player session (playback state and
+playlists) on top of one shared VideoLibrary, so the catalog is loaded
+once for all clients. The protocol is the one of the REPL: the client
+sends one command per line, and the server answers with the command's
+output followed by the "YT> " prompt. Run with:
+
+    python3 -m src.server --port 8765
+    python3 -m src.server --unix /tmp/youtube.sock
+"""
+
+import argparse
+import asyncio
+import sys
+
+from .command_parser import CommandException, CommandParser
+from .command_stats import CommandStats
+from .output_sink import OutputSink
+from .video_library import VideoLibrary
+from .video_player import VideoPlayer
+
+PROMPT = "YT> "
+WELCOME = ("Hello and welcome to YouTube, what would you like to do?\n"
+           "    Enter HELP for list of available commands or EXIT to "
+           "terminate.")
+GOODBYE = "YouTube has now terminated its execution. Thank you and goodbye!"
+INVALID_COMMAND = ("Please enter a valid command, type HELP for a list of "
+                   "available commands.")
+
+
+async def _read_line(reader):
+    """Reads one line from 'reader'.
+
+    Returns:
+        The line, b"" at the end of the stream, or None if the line was
+        longer than the reader's limit, in which case it is skipped.
+    """
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError:
+        pass
+    # The overrunning data is still buffered; drop it a buffer at a time
+    # until the end of the line.
+    while True:
+        try:
+            await reader.readuntil(b"\n")
+            return None
+        except asyncio.LimitOverrunError as e:
+            await reader.readexactly(e.consumed)
+        except asyncio.IncompleteReadError:
+            return b""
+
+
+class WriterSink(OutputSink):
+    """A sink buffering lines and writing them to an asyncio stream."""
+
+    def __init__(self, writer, encoding="utf-8"):
+        self._writer = writer
+        self._encoding = encoding
+        self._lines = []
+
+    def write(self, line: str):
+        self._lines.append(line)
+
+    def flush(self):
+        if not self._lines:
+            return
+        self._lines.append("")
+        self._writer.write("\n".join(self._lines).encode(self._encoding))
+        self._lines.clear()
+
+
+class Session:
+    """A class used to represent the state of one client connection."""
+
+    def __init__(self, video_library, output, result_handles=False,
+                 stats=None):
+        """The Session class is initialized.
+
+        Args:
+            video_library: The VideoLibrary shared by all sessions.
+            output: The OutputSink of the connection.
+            result_handles: If True, searches print a result handle for
+                PLAY_RESULT instead of waiting for an answer on the next
+                line, see VideoPlayer.
+            stats: The CommandStats the session's commands are recorded in,
+                None for no statistics.
+        """
+        self._output = output
+        self._video_library = video_library
+        self._player = VideoPlayer(video_library, output=output,
+                                   defer_answers=True,
+                                   result_handles=result_handles)
+        if hasattr(video_library, "subscribe"):
+            video_library.subscribe(self._player.catalog_changed)
+        # Clients must not make the server read or write its files.
+        self._parser = CommandParser(self._player, stats=stats,
+                                     allow_file_commands=False)
+
+    def close(self):
+        """Stops following catalog reloads once the client is gone."""
+        if hasattr(self._video_library, "unsubscribe"):
+            self._video_library.unsubscribe(self._player.catalog_changed)
+
+    def handle_line(self, line: str) -> bool:
+        """Executes one line sent by the client.
+
+        Returns:
+            False once the client asked to EXIT, True otherwise.
+        """
+        if self._player.awaiting_answer:
+            self._player.answer_selection(line)
+        elif line.upper() == "EXIT":
+            self._output.write(GOODBYE)
+            return False
+        else:
+            try:
+                self._parser.execute_command(line.split())
+            except CommandException as e:
+                self._output.write(str(e))
+        return True
+
+
+class CommandServer:
+    """A class used to serve player sessions over TCP or Unix sockets."""
+
+    def __init__(self, video_library=None, result_handles=False,
+                 stats=None):
+        """The CommandServer class is initialized.
+
+        Args:
+            video_library: The VideoLibrary shared by all sessions, the
+                default catalog if not given.
+            result_handles: Whether sessions play search results with
+                PLAY_RESULT instead of answering a prompt, see Session.
+            stats: The CommandStats shared by all sessions, None for no
+                statistics.
+        """
+        self._video_library = (VideoLibrary() if video_library is None
+                               else video_library)
+        self._result_handles = result_handles
+        self._stats = stats
+        self._sessions = 0
+
+    @property
+    def sessions(self) -> int:
+        """Returns the number of connected sessions."""
+        return self._sessions
+
+    async def handle_connection(self, reader, writer):
+        """Runs a session for one client until EXIT or disconnection."""
+        output = WriterSink(writer)
+        session = Session(self._video_library, output, self._result_handles,
+                          self._stats)
+        self._sessions += 1
+        try:
+            output.write(WELCOME)
+            output.flush()
+            writer.write(PROMPT.encode())
+            while True:
+                data = await _read_line(reader)
+                if data == b"":
+                    break
+                if data is None:
+                    output.write(INVALID_COMMAND)
+                    keep_open = True
+                else:
+                    keep_open = session.handle_line(
+                        data.decode("utf-8", "replace").rstrip("\r\n"))
+                output.flush()
+                if not keep_open:
+                    break
+                writer.write(PROMPT.encode())
+                await writer.drain()
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._sessions -= 1
+            session.close()
+            writer.close()
+
+    async def watch_catalog(self, interval=1.0):
+        """Applies changes to the catalog file every 'interval' seconds,
+        until cancelled. Sessions are notified of every reload; a file that
+        cannot be read or parsed is reported on stderr and the catalog is
+        left as it was."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self._video_library.reload_if_changed()
+            except (OSError, ValueError) as e:
+                print("Cannot reload videos: {}".format(e), file=sys.stderr)
+
+    async def start(self, host=None, port=None, unix_path=None):
+        """Starts listening and returns the asyncio server."""
+        if unix_path is not None:
+            return await asyncio.start_unix_server(self.handle_connection,
+                                                   path=unix_path)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def _serve(args):
+    server = CommandServer(VideoLibrary(args.videos, snapshot=args.snapshot),
+                           args.result_handles,
+                           None if args.no_stats else CommandStats())
+    listener = await server.start(args.host, args.port, args.unix)
+    # Kept referenced for as long as the server runs.
+    watcher = (asyncio.ensure_future(server.watch_catalog(args.watch))
+               if args.watch else None)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--unix", metavar="PATH",
+                            help="listen on a Unix socket instead of TCP")
+    arg_parser.add_argument("--videos", metavar="PATH",
+                            help="the catalog file to serve")
+    arg_parser.add_argument("--snapshot", action="store_true",
+                            help="load the catalog from its binary snapshot")
+    arg_parser.add_argument("--result-handles", action="store_true",
+                            help="never prompt after a search; clients play "
+                                 "results with PLAY_RESULT")
+    arg_parser.add_argument("--watch", metavar="SECONDS", type=float,
+                            help="check the catalog file for changes every "
+                                 "SECONDS and apply them")
+    arg_parser.add_argument("--no-stats", action="store_true",
+                            help="do not record command counts and latencies")
+    args = arg_parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
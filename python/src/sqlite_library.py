@@ -0,0 +1,436 @@
+"""A video library backed by a SQLite database."""
+
+from collections.abc import Mapping
+from pathlib import Path
+import json
+import os
+import random
+import sqlite3
+
+from .catalog_parser import read_videos
+from .video import Video
+from .video_index import (FUZZY_RESULTS, ResultPage, padded_words,
+                          rank_similar, select_page, word_ngrams)
+
+# Bump whenever the schema below changes; older databases are rebuilt.
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value) WITHOUT ROWID;
+CREATE TABLE videos (
+    position INTEGER PRIMARY KEY,
+    video_id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    tags TEXT NOT NULL
+);
+CREATE INDEX videos_by_title ON videos (title, position);
+CREATE TABLE video_tags (
+    tag TEXT NOT NULL,
+    title TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (tag, title, position)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE video_titles USING fts5(
+    title, content='videos', content_rowid='position', tokenize='trigram');
+CREATE VIRTUAL TABLE video_words USING fts5(
+    words, content='', tokenize='trigram');
+"""
+# Kept when the catalog tables are rebuilt, so flags persist between runs.
+_FLAGS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS flags (video_id TEXT PRIMARY KEY,
+                                  reason TEXT NOT NULL) WITHOUT ROWID;
+"""
+
+_VIDEO_COLUMNS = "videos.title, videos.video_id, videos.tags"
+_NOT_FLAGGED = "videos.video_id NOT IN (SELECT video_id FROM flags)"
+
+
+def _video(row):
+    title, video_id, tags = row
+    return Video(title, video_id, json.loads(tags))
+
+
+class _FlaggedView(Mapping):
+    """A read-only video_id -> reason view of the flags table."""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __getitem__(self, video_id):
+        row = self._connection.execute(
+            "SELECT reason FROM flags WHERE video_id = ?",
+            (video_id,)).fetchone()
+        if row is None:
+            raise KeyError(video_id)
+        return row[0]
+
+    def __contains__(self, video_id):
+        return self._connection.execute(
+            "SELECT 1 FROM flags WHERE video_id = ?",
+            (video_id,)).fetchone() is not None
+
+    def __iter__(self):
+        for (video_id,) in self._connection.execute(
+                "SELECT video_id FROM flags"):
+            yield video_id
+
+    def __len__(self):
+        return self._connection.execute(
+            "SELECT COUNT(*) FROM flags").fetchone()[0]
+
+
+class SqliteVideoLibrary:
+    """A class used to represent a Video Library stored in SQLite.
+
+    The catalog, its tags and the flags live in a database file with an
+    index for every lookup the player makes, so memory use does not grow
+    with the catalog. The database is built from videos.txt on first use,
+    and rebuilt when the text file changes. Flags are stored in the
+    database and therefore persist between runs.
+    """
+
+    def __init__(self, db_path, videos_path=None):
+        """The SqliteVideoLibrary class is initialized.
+
+        Args:
+            db_path: The database file, created if needed.
+            videos_path: The catalog file the database is built from,
+                videos.txt next to this module by default.
+        """
+        if videos_path is None:
+            videos_path = Path(__file__).parent / "videos.txt"
+        self._videos_path = videos_path
+        self._connection = sqlite3.connect(db_path)
+        self._flagged = _FlaggedView(self._connection)
+        if not self._is_current():
+            self._rebuild()
+
+    def close(self):
+        """Closes the database."""
+        self._connection.close()
+
+    def _source_stamp(self):
+        stat = os.stat(self._videos_path)
+        return "{}:{}:{}".format(SCHEMA_VERSION, stat.st_mtime_ns,
+                                 stat.st_size)
+
+    def _is_current(self):
+        try:
+            row = self._connection.execute(
+                "SELECT value FROM meta WHERE key = 'source'").fetchone()
+        except sqlite3.DatabaseError:
+            return False
+        return row is not None and row[0] == self._source_stamp()
+
+    def _rebuild(self):
+        connection = self._connection
+        with connection:
+            for (name,) in connection.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' "
+                    "AND name NOT LIKE 'sqlite_%' AND name NOT LIKE "
+                    "'video_titles_%' AND name NOT LIKE 'video_words_%' "
+                    "AND name != 'flags'").fetchall():
+                connection.execute('DROP TABLE IF EXISTS "{}"'.format(name))
+            connection.executescript(_SCHEMA + _FLAGS_SCHEMA)
+            with open(self._videos_path) as video_file:
+                for video in read_videos(video_file):
+                    # Duplicate ids keep their first position and their
+                    # last value, like the dictionary backend.
+                    row = connection.execute(
+                        "SELECT position, title FROM videos "
+                        "WHERE video_id = ?", (video.video_id,)).fetchone()
+                    if row is None:
+                        self._insert(video)
+                    else:
+                        self._delete(video.video_id)
+                        self._insert(video, row[0])
+            # Flags of videos no longer in the catalog are forgotten, like
+            # the dictionary backend does on reload.
+            connection.execute(
+                "DELETE FROM flags WHERE video_id NOT IN "
+                "(SELECT video_id FROM videos)")
+            connection.execute(
+                "INSERT INTO meta VALUES ('source', ?)",
+                (self._source_stamp(),))
+
+    def _insert(self, video, position=None):
+        cursor = self._connection.execute(
+            "INSERT INTO videos (position, video_id, title, tags) "
+            "VALUES (?, ?, ?, ?)",
+            (position, video.video_id, video.title, json.dumps(video.tags)))
+        position = cursor.lastrowid
+        self._connection.execute(
+            "INSERT INTO video_titles (rowid, title) VALUES (?, ?)",
+            (position, video.title))
+        self._connection.execute(
+            "INSERT INTO video_words (rowid, words) VALUES (?, ?)",
+            (position, padded_words(video.title.lower())))
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO video_tags VALUES (?, ?, ?)",
+            ((tag, video.title, position) for tag in video.tags))
+
+    def _delete(self, video_id):
+        row = self._connection.execute(
+            "SELECT position, title FROM videos WHERE video_id = ?",
+            (video_id,)).fetchone()
+        if row is None:
+            return
+        position, title = row
+        self._connection.execute(
+            "INSERT INTO video_titles (video_titles, rowid, title) "
+            "VALUES ('delete', ?, ?)", (position, title))
+        self._connection.execute(
+            "INSERT INTO video_words (video_words, rowid, words) "
+            "VALUES ('delete', ?, ?)", (position, padded_words(title.lower())))
+        self._connection.execute(
+            "DELETE FROM video_tags WHERE position = ?", (position,))
+        self._connection.execute(
+            "DELETE FROM videos WHERE position = ?", (position,))
+
+    @property
+    def flagged(self) -> Mapping:
+        """Returns a mapping of flagged video_ids to their reasons."""
+        return self._flagged
+
+    def flag_video(self, video_id, reason=""):
+        """Add flagged status to video id with optional reason"""
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO flags VALUES (?, ?)",
+                (video_id, reason))
+
+    def unflag_video(self, video_id):
+        """Remove flagged status to video id"""
+        with self._connection:
+            self._connection.execute(
+                "DELETE FROM flags WHERE video_id = ?", (video_id,))
+
+    def flag_videos(self, reasons):
+        """Flags many videos at once, in a single transaction.
+
+        Args:
+            reasons: The (video_id, reason) pairs of the videos to flag.
+        """
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO flags VALUES (?, ?)", reasons)
+
+    def unflag_videos(self, video_ids):
+        """Unflags many videos at once, in a single transaction."""
+        with self._connection:
+            self._connection.executemany(
+                "DELETE FROM flags WHERE video_id = ?",
+                ((video_id,) for video_id in video_ids))
+
+    def get_random_video(self):
+        """Returns a random unflagged video, or None if there is none.
+
+        Picks the first unflagged video at or after a random position, so
+        videos following gaps left by removals are slightly favoured.
+        """
+        row = self._connection.execute(
+            "SELECT MAX(position) FROM videos").fetchone()
+        if row[0] is None:
+            return None
+        start = random.randint(1, row[0])
+        query = ("SELECT {} FROM videos WHERE position {} ? AND {} "
+                 "ORDER BY position LIMIT 1")
+        for operator in (">=", "<"):
+            row = self._connection.execute(
+                query.format(_VIDEO_COLUMNS, operator, _NOT_FLAGGED),
+                (start,)).fetchone()
+            if row is not None:
+                return _video(row)
+        return None
+
+    def get_all_videos(self):
+        """Returns all available video information from the video library."""
+        return [_video(row) for row in self._connection.execute(
+            "SELECT {} FROM videos ORDER BY position".format(_VIDEO_COLUMNS))]
+
+    def __len__(self):
+        return self._connection.execute(
+            "SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def iter_videos_by_title(self):
+        """Yields every video in the library in title order."""
+        for row in self._connection.execute(
+                "SELECT {} FROM videos ORDER BY title, position".format(
+                    _VIDEO_COLUMNS)):
+            yield _video(row)
+
+    def videos_by_title_page(self, limit, offset=0):
+        """Returns a ResultPage of the videos in title order, flagged ones
+        included.
+
+        Args:
+            limit: The page size, None for every video from 'offset' on.
+            offset: The number of videos skipped before the page.
+        """
+        rows = self._connection.execute(
+            "SELECT {} FROM videos ORDER BY title, position "
+            "LIMIT ? OFFSET ?".format(_VIDEO_COLUMNS),
+            (-1 if limit is None else limit, offset))
+        return ResultPage([_video(row) for row in rows], len(self))
+
+    def add_video(self, video):
+        """Adds a video to the library, replacing any video with the same id."""
+        with self._connection:
+            row = self._connection.execute(
+                "SELECT position FROM videos WHERE video_id = ?",
+                (video.video_id,)).fetchone()
+            self._delete(video.video_id)
+            self._insert(video, None if row is None else row[0])
+
+    def remove_video(self, video_id):
+        """Removes a video from the library, together with any flag on it."""
+        with self._connection:
+            self._delete(video_id)
+            self._connection.execute(
+                "DELETE FROM flags WHERE video_id = ?", (video_id,))
+
+    def search_videos(self, search_term):
+        """Returns the unflagged videos whose titles contain the search term.
+
+        Args:
+            search_term: The query to be used in search, matched case
+                insensitively.
+
+        Returns:
+            The matching Video objects, sorted by title.
+        """
+        return self.search_videos_page(search_term, None).videos
+
+    def search_videos_page(self, search_term, limit, offset=0):
+        """Returns a page of the unflagged videos whose titles contain the
+        search term.
+
+        Terms of three characters or more are looked up in the trigram
+        full-text index; every candidate is checked with the same
+        lowercased substring test as the dictionary backend, so the rows
+        are paged in Python rather than with LIMIT.
+
+        Args:
+            search_term: The query to be used in search, matched case
+                insensitively.
+            limit: The page size, None for every match from 'offset' on.
+            offset: The number of matches skipped before the page.
+
+        Returns:
+            A ResultPage of the matching Video objects, sorted by title.
+        """
+        term = search_term.strip().lower()
+        if len(term) >= 3:
+            rows = self._connection.execute(
+                "SELECT {} FROM video_titles JOIN videos "
+                "ON videos.position = video_titles.rowid "
+                "WHERE video_titles MATCH ? AND {} "
+                "ORDER BY videos.title, videos.position".format(
+                    _VIDEO_COLUMNS, _NOT_FLAGGED),
+                ('"{}"'.format(term.replace('"', '""')),))
+        else:
+            rows = self._connection.execute(
+                "SELECT {} FROM videos WHERE {} "
+                "ORDER BY title, position".format(
+                    _VIDEO_COLUMNS, _NOT_FLAGGED))
+        page = select_page((row for row in rows if term in row[0].lower()),
+                           limit, offset, ordered=True)
+        return ResultPage([_video(row) for row in page.videos], page.total)
+
+    def search_videos_fuzzy(self, search_term, limit=FUZZY_RESULTS):
+        """Returns the unflagged videos whose titles are closest to the
+        search term.
+
+        Each word n-gram of the term is looked up in a trigram full-text
+        index of the padded words of the titles, and the titles are ranked
+        like the dictionary backend does, see rank_similar().
+
+        Args:
+            search_term: The query to be used in search, matched case
+                insensitively.
+            limit: The largest number of videos returned.
+
+        Returns:
+            The matching Video objects, closest first.
+        """
+        term = search_term.strip().lower()
+        grams = word_ngrams(term)
+        if not grams:
+            return self.search_videos(term)[:limit]
+        overlaps = {}
+        for gram in grams:
+            for (position,) in self._connection.execute(
+                    "SELECT rowid FROM video_words WHERE video_words MATCH ?",
+                    ('"{}"'.format(gram.replace('"', '""')),)):
+                overlaps[position] = overlaps.get(position, 0) + 1
+        flagged = {position for (position,) in self._connection.execute(
+            "SELECT position FROM videos JOIN flags USING (video_id)")}
+        rows = {}
+
+        def row_of(position):
+            row = rows.get(position)
+            if row is None:
+                row = rows[position] = self._connection.execute(
+                    "SELECT {} FROM videos WHERE position = ?".format(
+                        _VIDEO_COLUMNS), (position,)).fetchone()
+            return row
+
+        positions = rank_similar(
+            term, overlaps, lambda position: row_of(position)[0],
+            lambda position: (row_of(position)[0], position), limit, flagged)
+        return [_video(row_of(position)) for position in positions]
+
+    def search_videos_tag(self, video_tag):
+        """Returns the unflagged videos that have the given tag.
+
+        Args:
+            video_tag: The video tag to be used in search, lowercased before
+                the lookup.
+
+        Returns:
+            The matching Video objects, sorted by title.
+        """
+        return self.search_videos_tag_page(video_tag, None).videos
+
+    def search_videos_tag_page(self, video_tag, limit, offset=0):
+        """Returns a page of the unflagged videos that have the given tag.
+
+        Args:
+            video_tag: The video tag to be used in search, lowercased before
+                the lookup.
+            limit: The page size, None for every match from 'offset' on.
+            offset: The number of matches skipped before the page.
+
+        Returns:
+            A ResultPage of the matching Video objects, sorted by title.
+        """
+        tag = video_tag.strip().lower()
+        matches = ("FROM video_tags JOIN videos "
+                   "ON videos.position = video_tags.position "
+                   "WHERE video_tags.tag = ? AND {}".format(_NOT_FLAGGED))
+        rows = self._connection.execute(
+            "SELECT {} {} ORDER BY video_tags.title, video_tags.position "
+            "LIMIT ? OFFSET ?".format(_VIDEO_COLUMNS, matches),
+            (tag, -1 if limit is None else limit, offset))
+        videos = [_video(row) for row in rows]
+        if limit is None and offset == 0:
+            total = len(videos)
+        else:
+            total = self._connection.execute(
+                "SELECT COUNT(*) " + matches, (tag,)).fetchone()[0]
+        return ResultPage(videos, total)
+
+    def get_video(self, video_id):
+        """Returns the video object (title, url, tags) from the video library.
+
+        Args:
+            video_id: The video url.
+
+        Returns:
+            The Video object for the requested video_id. None if the video
+            does not exist.
+        """
+        row = self._connection.execute(
+            "SELECT {} FROM videos WHERE video_id = ?".format(_VIDEO_COLUMNS),
+            (video_id,)).fetchone()
+        return None if row is None else _video(row)
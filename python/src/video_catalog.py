@@ -0,0 +1,423 @@
+"""A video catalog class."""
+
+from .catalog_parser import read_videos
+from .catalog_snapshot import SnapshotError, read_snapshot, write_snapshot
+from .lazy_catalog import LazyVideoMap
+from .parallel_loader import MIN_PARALLEL_SIZE, read_videos_parallel
+from .video_index import (FUZZY_RESULTS, ResultPage, TagIndex, TitleIndex,
+                          fuzzy_min_overlap, rank_similar, select_page,
+                          word_ngrams)
+from pathlib import Path
+from typing import List, NamedTuple
+import bisect
+import copy
+import os
+
+# Catalogs loaded by load_catalog(), keyed by their file path and options.
+_catalog_cache = {}
+
+
+class CatalogDiff(NamedTuple):
+    """The changes between a catalog and a new version of its file.
+
+    added and changed hold the new Video objects, removed the ids of the
+    videos no longer in the file.
+    """
+    added: List
+    removed: List[str]
+    changed: List
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+
+class VideoCatalog:
+    """A class used to represent the videos of a library and their indexes.
+
+    A catalog holds no per-user or moderation state, so a single instance can
+    be shared by every library and player session loading the same file.
+    """
+
+    def __init__(self, videos_path=None, lazy=False, snapshot=False,
+                 workers=None):
+        """The VideoCatalog class is initialized.
+
+        Args:
+            videos_path: The catalog file to load, videos.txt next to this
+                module by default.
+            lazy: If True, the catalog is memory-mapped and each video is
+                decoded on first access. The search indexes are then built
+                by the first search or listing instead of at load time.
+            snapshot: If True or a path, the catalog is loaded from a binary
+                snapshot (videos_path + ".snap" when True). A missing or
+                stale snapshot is rebuilt from videos_path.
+            workers: If greater than 1, large catalog files are parsed in a
+                pool of that many processes.
+        """
+        if videos_path is None:
+            videos_path = Path(__file__).parent / "videos.txt"
+        if lazy and snapshot:
+            raise ValueError("A catalog cannot be both lazy and snapshot "
+                             "backed.")
+        self._videos_path = videos_path
+        self._workers = workers
+        # Bumped on every change to the videos, see generation.
+        self._generation = 0
+        self._indexed = False
+        if snapshot:
+            snapshot_path = None if snapshot is True else snapshot
+            try:
+                self._load_snapshot(snapshot_path)
+            except SnapshotError:
+                self._load_text()
+                self._build_indexes()
+                try:
+                    self.write_snapshot(snapshot_path)
+                except (OSError, SnapshotError):
+                    pass
+        elif lazy:
+            self._videos = LazyVideoMap(videos_path)
+        else:
+            self._load_text()
+            self._build_indexes()
+
+    def copy(self):
+        """Returns an independent copy of the catalog.
+
+        Videos are immutable and shared between the copies; the id mapping
+        and the indexes are copied.
+        """
+        catalog = copy.copy(self)
+        catalog._videos = self._videos.copy()
+        if self._indexed:
+            catalog._order = dict(self._order)
+            catalog._title_order = list(self._title_order)
+            catalog._title_index = self._title_index.copy()
+            catalog._tag_index = self._tag_index.copy()
+        return catalog
+
+    @property
+    def generation(self) -> int:
+        """Returns a counter bumped whenever the videos change."""
+        return self._generation
+
+    @property
+    def videos_path(self):
+        """Returns the path of the catalog file."""
+        return self._videos_path
+
+    def _load_text(self):
+        if (self._workers and self._workers > 1
+                and os.path.getsize(self._videos_path) >= MIN_PARALLEL_SIZE):
+            self._videos = read_videos_parallel(self._videos_path,
+                                                self._workers)
+            return
+        self._videos = {}
+        with open(self._videos_path) as video_file:
+            for video in read_videos(video_file):
+                self._videos[video.video_id] = video
+
+    def _load_snapshot(self, snapshot_path):
+        (self._videos, self._title_order, self._tag_index,
+         self._title_index) = read_snapshot(self._videos_path, snapshot_path)
+        self._order = {video_id: position
+                       for position, video_id in enumerate(self._videos)}
+        self._next_position = len(self._videos)
+        self._indexed = True
+
+    def write_snapshot(self, snapshot_path=None):
+        """Writes a binary snapshot of the catalog for fast loading.
+
+        Args:
+            snapshot_path: Where to write the snapshot, next to the catalog
+                file by default.
+        """
+        self._ensure_indexes()
+        write_snapshot(self._videos, self._title_order, self._tag_index,
+                       self._title_index, self._videos_path, snapshot_path)
+
+    def _build_indexes(self):
+        # Position of each video in the file, used to break ties between
+        # equal titles the same way a stable sort over the file order does.
+        self._order = {}
+        self._title_index = TitleIndex()
+        self._tag_index = TagIndex()
+        for position, video in enumerate(self._videos.values()):
+            self._order[video.video_id] = position
+            self._title_index.add(video.video_id, video.title)
+        self._next_position = len(self._videos)
+        # Title keys of every video, kept sorted as videos are added and
+        # removed so listings never have to sort the catalog.
+        self._title_order = sorted(
+            self._title_key(video) for video in self._videos.values())
+        self._tag_index.build(
+            (self._title_key(video), set(video.tags))
+            for video in self._videos.values())
+        self._indexed = True
+
+    def _ensure_indexes(self):
+        if not self._indexed:
+            self._build_indexes()
+
+    def __len__(self):
+        return len(self._videos)
+
+    def __iter__(self):
+        """Iterates over the video ids of the catalog in file order."""
+        return iter(self._videos)
+
+    def __contains__(self, video_id):
+        return video_id in self._videos
+
+    def get_all_videos(self):
+        """Returns all the videos of the catalog."""
+        return list(self._videos.values())
+
+    def _title_key(self, video):
+        return video.title, self._order[video.video_id], video.video_id
+
+    def iter_videos_by_title(self):
+        """Yields every video in the catalog in title order."""
+        self._ensure_indexes()
+        videos = self._videos
+        for key in self._title_order:
+            yield videos[key[2]]
+
+    def add_video(self, video):
+        """Adds a video to the catalog, replacing any video with the same id.
+
+        A replaced video keeps its position among videos with equal titles,
+        as it would when reading a duplicate id from videos.txt.
+        """
+        self._ensure_indexes()
+        self._generation += 1
+        video_id = video.video_id
+        if video_id in self._videos:
+            position = self._order[video_id]
+            self.remove_video(video_id)
+        else:
+            position = self._next_position
+            self._next_position += 1
+        self._videos[video_id] = video
+        self._order[video_id] = position
+        key = self._title_key(video)
+        bisect.insort(self._title_order, key)
+        self._title_index.add(video_id, video.title)
+        self._tag_index.add(key, set(video.tags))
+
+    def remove_video(self, video_id):
+        """Removes a video from the catalog and all of its indexes."""
+        self._ensure_indexes()
+        video = self._videos.get(video_id)
+        if video is None:
+            return
+        self._generation += 1
+        key = self._title_key(video)
+        i = bisect.bisect_left(self._title_order, key)
+        del self._title_order[i]
+        self._title_index.remove(video_id, video.title)
+        self._tag_index.remove(key, set(video.tags))
+        del self._videos[video_id]
+        del self._order[video_id]
+
+    @property
+    def is_lazy(self) -> bool:
+        """Returns whether videos are decoded from the mapped file."""
+        return isinstance(self._videos, LazyVideoMap)
+
+    def diff(self, videos) -> CatalogDiff:
+        """Returns the changes turning this catalog into 'videos'.
+
+        Args:
+            videos: The videos of the new catalog, such as the Video objects
+                read from an updated file. A later video replaces an earlier
+                one with the same id, as when loading a file.
+        """
+        new_videos = {}
+        for video in videos:
+            new_videos[video.video_id] = video
+        added = []
+        changed = []
+        for video_id, video in new_videos.items():
+            old = self._videos.get(video_id)
+            if old is None:
+                added.append(video)
+            elif old.title != video.title or tuple(old.tags) != tuple(
+                    video.tags):
+                changed.append(video)
+        removed = [video_id for video_id in self._videos
+                   if video_id not in new_videos]
+        return CatalogDiff(added, removed, changed)
+
+    def videos_by_title_page(self, limit, offset=0):
+        """Returns a page of the videos of the catalog in title order.
+
+        Args:
+            limit: The page size, None for every video from 'offset' on.
+            offset: The number of videos skipped before the page.
+        """
+        self._ensure_indexes()
+        stop = None if limit is None else offset + limit
+        return ResultPage([self._videos[key[2]]
+                           for key in self._title_order[offset:stop]],
+                          len(self._title_order))
+
+    def search_videos(self, search_term, exclude=()):
+        """Returns the videos whose titles contain the search term.
+
+        Args:
+            search_term: The query to be used in search, matched case
+                insensitively.
+            exclude: Container of video ids to leave out, such as the
+                flagged videos.
+
+        Returns:
+            The matching Video objects, sorted by title.
+        """
+        return self.search_videos_page(search_term, None, 0, exclude).videos
+
+    def search_videos_page(self, search_term, limit, offset=0, exclude=()):
+        """Returns a page of the videos whose titles contain the search term.
+
+        Only the requested page is sorted, see select_page().
+
+        Args:
+            search_term: The query to be used in search, matched case
+                insensitively.
+            limit: The page size, None for every match from 'offset' on.
+            offset: The number of matches skipped before the page.
+            exclude: Container of video ids to leave out, such as the
+                flagged videos.
+
+        Returns:
+            A ResultPage of the matching Video objects, sorted by title.
+        """
+        self._ensure_indexes()
+        term = search_term.strip().lower()
+        candidates = self._title_index.candidates(term)
+        if candidates is None:
+            # Too short for the index: walk the catalog in title order
+            # instead, which needs no sort afterwards.
+            return select_page(
+                (video for video in self.iter_videos_by_title()
+                 if video.video_id not in exclude
+                 and term in video.title.lower()),
+                limit, offset, ordered=True)
+        videos = self._videos
+        return select_page(
+            (videos[video_id] for video_id in candidates
+             if video_id not in exclude
+             and term in videos[video_id].title.lower()),
+            limit, offset, key=self._title_key)
+
+    def search_videos_fuzzy(self, search_term, limit=FUZZY_RESULTS,
+                            exclude=()):
+        """Returns the videos whose titles are closest to the search term.
+
+        Tolerates typos by comparing the n-grams of the term and of the
+        titles, see rank_similar(). An empty term falls back to
+        search_videos().
+
+        Args:
+            search_term: The query to be used in search, matched case
+                insensitively.
+            limit: The largest number of videos returned.
+            exclude: Container of video ids to leave out, such as the
+                flagged videos.
+
+        Returns:
+            The matching Video objects, closest first.
+        """
+        self._ensure_indexes()
+        term = search_term.strip().lower()
+        if not word_ngrams(term):
+            return self.search_videos(term, exclude)[:limit]
+        overlaps = self._title_index.closest_overlaps(
+            term, fuzzy_min_overlap(len(word_ngrams(term))), limit, exclude)
+        video_ids = rank_similar(
+            term, overlaps,
+            lambda video_id: self._videos[video_id].title,
+            lambda video_id: self._title_key(self._videos[video_id]),
+            limit, exclude)
+        return [self._videos[video_id] for video_id in video_ids]
+
+    def search_videos_tag(self, video_tag, exclude=()):
+        """Returns the videos that have the given tag.
+
+        Args:
+            video_tag: The video tag to be used in search, lowercased before
+                the lookup.
+            exclude: Container of video ids to leave out, such as the
+                flagged videos.
+
+        Returns:
+            The matching Video objects, sorted by title.
+        """
+        return self.search_videos_tag_page(video_tag, None, 0, exclude).videos
+
+    def search_videos_tag_page(self, video_tag, limit, offset=0, exclude=()):
+        """Returns a page of the videos that have the given tag.
+
+        Args:
+            video_tag: The video tag to be used in search, lowercased before
+                the lookup.
+            limit: The page size, None for every match from 'offset' on.
+            offset: The number of matches skipped before the page.
+            exclude: Container of video ids to leave out, such as the
+                flagged videos.
+
+        Returns:
+            A ResultPage of the matching Video objects, sorted by title.
+        """
+        self._ensure_indexes()
+        return select_page(
+            (self._videos[video_id]
+             for video_id in self._tag_index.video_ids(
+                 video_tag.strip().lower())
+             if video_id not in exclude),
+            limit, offset, ordered=True)
+
+    def get_video(self, video_id):
+        """Returns the video object (title, url, tags) from the catalog.
+
+        Args:
+            video_id: The video url.
+
+        Returns:
+            The Video object for the requested video_id. None if the video
+            does not exist.
+        """
+        return self._videos.get(video_id, None)
+
+
+def load_catalog(videos_path=None, lazy=False, snapshot=False, workers=None):
+    """Returns the catalog of a file, reusing it if already loaded.
+
+    Catalogs are cached for the whole process, keyed by the file path, its
+    modification time and size, and whether it is lazy. A file that changed
+    since is loaded again. The returned catalog is shared: callers must
+    copy() it before modifying it.
+
+    Args:
+        videos_path: The catalog file, see VideoCatalog.
+        lazy: See VideoCatalog.
+        snapshot: See VideoCatalog, only used when the file is loaded.
+        workers: See VideoCatalog, only used when the file is loaded.
+    """
+    if videos_path is None:
+        videos_path = Path(__file__).parent / "videos.txt"
+    path = os.path.abspath(videos_path)
+    stat = os.stat(path)
+    key = (path, bool(lazy))
+    cached = _catalog_cache.get(key)
+    if cached is not None and cached[0] == (stat.st_mtime_ns, stat.st_size):
+        return cached[1]
+    catalog = VideoCatalog(videos_path, lazy=lazy, snapshot=snapshot,
+                           workers=workers)
+    _catalog_cache[key] = ((stat.st_mtime_ns, stat.st_size), catalog)
+    return catalog
+
+
+def clear_catalog_cache():
+    """Forgets every catalog loaded by load_catalog()."""
+    _catalog_cache.clear()
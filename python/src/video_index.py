@@ -0,0 +1,344 @@
+"""Inverted indexes over the video catalog."""
+
+import bisect
+import heapq
+import itertools
+import math
+from collections import Counter
+from typing import (Callable, Container, Dict, Iterable, Iterator, List,
+                    NamedTuple, Optional, Sequence, Set, Tuple)
+
+# Sort key of a video in title order: (title, position in file, video id).
+TitleKey = Tuple[str, int, str]
+
+# Length of the n-grams stored in the title index.
+NGRAM_SIZE = 3
+
+# The smallest share of the n-grams of a fuzzy search term a title must
+# contain to be returned.
+FUZZY_MIN_COVERAGE = 0.5
+
+# The default number of results of a fuzzy search.
+FUZZY_RESULTS = 10
+
+
+def title_ngrams(text: str) -> Set[str]:
+    """Returns the set of n-grams of an already lowercased string."""
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+def padded_words(text: str) -> str:
+    """Returns the words of a string, each padded with two spaces in front
+    and one after, as pg_trgm does before taking trigrams."""
+    return "".join("  " + word + " " for word in text.split())
+
+
+def word_ngrams(text: str) -> Set[str]:
+    """Returns the n-grams of the padded words of an already lowercased
+    string, see padded_words().
+
+    The padding makes the start and end of every word n-grams of their own,
+    so a typo in a short word still leaves it sharing most of its n-grams:
+    "goggle" shares 4 of its 7 with "google", but only 1 of 4 unpadded.
+    """
+    grams = set()
+    for word in text.split():
+        grams.update(title_ngrams("  " + word + " "))
+    return grams
+
+
+class ResultPage(NamedTuple):
+    """A page of query results.
+
+    videos holds the requested page of the matching videos, and total the
+    number of matching videos across all pages.
+    """
+    videos: list
+    total: int
+
+
+def select_page(items: Iterable, limit: Optional[int], offset: int = 0,
+                key: Optional[Callable] = None,
+                ordered: bool = False) -> ResultPage:
+    """Returns a page of the items in key order and the number of items.
+
+    Only the first offset + limit items are kept while the items are
+    counted: a heap selects them when the items are unordered, and ordered
+    items are simply sliced.
+
+    Args:
+        items: The matching items, consumed once.
+        limit: The page size, None for every item from 'offset' on.
+        offset: The number of items skipped before the page.
+        key: The sort key of the items.
+        ordered: Whether the items already come in key order.
+    """
+    counter = itertools.count()
+    counted = (item for item, _ in zip(items, counter))
+    stop = None if limit is None else offset + limit
+    if ordered:
+        page = list(itertools.islice(counted, offset, stop))
+        for _ in counted:
+            pass
+    elif stop is None:
+        page = sorted(counted, key=key)[offset:]
+    else:
+        page = heapq.nsmallest(stop, counted, key=key)[offset:]
+    return ResultPage(page, next(counter))
+
+
+def word_ngram_count(text: str) -> int:
+    """Returns the number of word n-grams of a string, counting repeated
+    ones, without building them: a padded word has one per character
+    plus one."""
+    words = text.split()
+    return len(words) + sum(map(len, words))
+
+
+def fuzzy_min_overlap(term_size: int) -> int:
+    """Returns how many of the word n-grams of a term with 'term_size' of
+    them a title must contain to be a fuzzy match, see FUZZY_MIN_COVERAGE."""
+    return max(1, math.ceil(FUZZY_MIN_COVERAGE * term_size))
+
+
+def rank_similar(term: str, overlaps: Dict[str, int],
+                 title_of: Callable[[str], str], sort_key: Callable,
+                 limit: int, exclude: Container[str] = ()) -> List[str]:
+    """Returns the ids of the titles most similar to a lowercased term.
+
+    Titles are ranked by the share of the term's word n-grams (see
+    word_ngrams()) they contain, then by their Jaccard similarity, with the
+    title's n-grams counted by word_ngram_count(), then by sort_key. Titles
+    are visited from the highest overlap down, and the visit stops as soon
+    as 'limit' titles are found, so titles sharing few n-grams with the term
+    are never looked at.
+
+    Args:
+        term: The lowercased search term.
+        overlaps: Video id -> number of the term's word n-grams in its
+            title.
+        title_of: Returns the title of a video id.
+        sort_key: Returns the key ordering video ids of equal similarity.
+        limit: The largest number of ids returned.
+        exclude: Container of video ids to leave out.
+    """
+    term_size = len(word_ngrams(term))
+    needed = fuzzy_min_overlap(term_size)
+    by_overlap = [[] for _ in range(term_size + 1)]
+    for video_id, overlap in overlaps.items():
+        if overlap >= needed and video_id not in exclude:
+            by_overlap[overlap].append(video_id)
+    ranked = []
+    for overlap in range(term_size, needed - 1, -1):
+        if len(ranked) >= limit:
+            break
+        for video_id in by_overlap[overlap]:
+            title_size = word_ngram_count(title_of(video_id))
+            similarity = overlap / (term_size + title_size - overlap)
+            ranked.append((-overlap, -similarity, sort_key(video_id),
+                           video_id))
+    return [entry[-1] for entry in heapq.nsmallest(limit, ranked)]
+
+
+class TitleIndex:
+    """A class used to represent a trigram inverted index over video titles.
+
+    Titles are lowercased the same way search terms are, so a substring match
+    against the index gives the same answer as `term in title.lower()`. The
+    word n-grams of every title are indexed as well, for overlaps().
+    """
+
+    def __init__(self, postings: Optional[Dict[str, Set[str]]] = None):
+        """The TitleIndex class is initialized.
+
+        Args:
+            postings: Optional prebuilt n-gram -> video ids postings, as
+                returned by items(), which the index takes ownership of.
+        """
+        self._postings: Dict[str, Set[str]] = (
+            {} if postings is None else postings)
+        # Packed postings not turned into sets yet, see from_packed().
+        self._packed: Dict[str, Tuple[int, int]] = {}
+        self._packed_values: Sequence[int] = ()
+        self._packed_ids: Sequence[str] = ()
+
+    @classmethod
+    def from_packed(cls, spans: Dict[str, Tuple[int, int]],
+                    values: Sequence[int], video_ids: Sequence[str]):
+        """Returns an index over packed postings, such as a snapshot's.
+
+        The posting of an n-gram is values[start:end] for its (start, end)
+        span in 'spans', holding indexes into 'video_ids'. Each posting is
+        only turned into a set the first time it is used.
+        """
+        index = cls()
+        index._packed = spans
+        index._packed_values = values
+        index._packed_ids = video_ids
+        return index
+
+    def copy(self) -> "TitleIndex":
+        """Returns an independent copy of the index."""
+        index = TitleIndex.from_packed(dict(self._packed), self._packed_values,
+                                       self._packed_ids)
+        index._postings = {gram: set(posting)
+                           for gram, posting in self._postings.items()}
+        return index
+
+    def _posting(self, gram: str) -> Optional[Set[str]]:
+        posting = self._postings.get(gram)
+        if posting is None and gram in self._packed:
+            start, end = self._packed.pop(gram)
+            posting = self._postings[gram] = set(map(
+                self._packed_ids.__getitem__,
+                self._packed_values[start:end]))
+        return posting
+
+    def items(self):
+        """Returns the (n-gram, video ids) postings of the index."""
+        for gram in list(self._packed):
+            self._posting(gram)
+        return self._postings.items()
+
+    @staticmethod
+    def _indexed_ngrams(title: str) -> Set[str]:
+        title = title.lower()
+        return title_ngrams(title) | word_ngrams(title)
+
+    def add(self, video_id: str, title: str):
+        """Indexes the title of a video."""
+        for gram in self._indexed_ngrams(title):
+            posting = self._posting(gram)
+            if posting is None:
+                self._postings[gram] = {video_id}
+            else:
+                posting.add(video_id)
+
+    def remove(self, video_id: str, title: str):
+        """Removes the title of a video from the index."""
+        for gram in self._indexed_ngrams(title):
+            posting = self._posting(gram)
+            if posting is None:
+                continue
+            posting.discard(video_id)
+            if not posting:
+                del self._postings[gram]
+
+    def candidates(self, term: str) -> Optional[Iterable[str]]:
+        """Returns the ids of videos that may contain the lowercased term.
+
+        Returns None when the term is too short to be looked up in the
+        index, in which case every video is a candidate.
+        """
+        grams = title_ngrams(term)
+        if not grams:
+            return None
+        postings = []
+        for gram in grams:
+            posting = self._posting(gram)
+            if not posting:
+                return ()
+            postings.append(posting)
+        postings.sort(key=len)
+        return set.intersection(*postings)
+
+    def overlaps(self, term: str, min_overlap: int = 1) -> Dict[str, int]:
+        """Returns video id -> number of the lowercased term's word n-grams
+        its title contains, for every title containing at least
+        'min_overlap' of them.
+
+        A title containing min_overlap of the term's n n-grams contains one
+        of its n - min_overlap + 1 rarest, so only their postings are
+        scanned for candidates. The more common n-grams are then only
+        looked up for those candidates, so their postings, which can hold
+        most of the catalog, are never walked.
+        """
+        postings = sorted((self._posting(gram) or set() for gram in
+                           word_ngrams(term)), key=len)
+        seeds = len(postings) - min_overlap + 1
+        if seeds < 1 or not postings[seeds - 1]:
+            return {}
+        counts = Counter()
+        for posting in postings[:seeds]:
+            counts.update(posting)
+        if seeds == len(postings):
+            return counts
+        candidates = counts.keys()
+        for posting in postings[seeds:]:
+            counts.update(candidates & posting)
+        return {video_id: count for video_id, count in counts.items()
+                if count >= min_overlap}
+
+    def closest_overlaps(self, term: str, min_overlap: int, limit: int,
+                         exclude: Container[str] = ()) -> Dict[str, int]:
+        """Returns overlaps() for the highest minimum overlap, down to
+        'min_overlap', at which at least 'limit' titles not in 'exclude'
+        are found.
+
+        The 'limit' titles of highest overlap are all in the result, which
+        is all rank_similar() needs, and the stricter the minimum overlap,
+        the fewer postings are scanned.
+        """
+        for level in range(len(word_ngrams(term)), min_overlap, -1):
+            counts = self.overlaps(term, level)
+            if len(counts) >= limit and sum(
+                    video_id not in exclude for video_id in counts) >= limit:
+                return counts
+        return self.overlaps(term, min_overlap)
+
+
+class TagIndex:
+    """A class used to represent a tag -> video ids posting index.
+
+    Each posting list is kept in title order, so a tag lookup returns its
+    videos already sorted.
+    """
+
+    def __init__(self, postings: Optional[Dict[str, List[TitleKey]]] = None):
+        """The TagIndex class is initialized.
+
+        Args:
+            postings: Optional prebuilt tag -> title-ordered keys postings,
+                as returned by items(), which the index takes ownership of.
+        """
+        self._postings: Dict[str, List[TitleKey]] = (
+            {} if postings is None else postings)
+
+    def items(self):
+        """Returns the (tag, title-ordered keys) postings of the index."""
+        return self._postings.items()
+
+    def copy(self) -> "TagIndex":
+        """Returns an independent copy of the index."""
+        return TagIndex({tag: list(posting)
+                         for tag, posting in self._postings.items()})
+
+    def build(self, entries: Iterable[Tuple[TitleKey, Sequence[str]]]):
+        """Indexes many videos at once, sorting every posting list once."""
+        for key, tags in entries:
+            for tag in tags:
+                self._postings.setdefault(tag, []).append(key)
+        for posting in self._postings.values():
+            posting.sort()
+
+    def add(self, key: TitleKey, tags: Sequence[str]):
+        """Indexes the tags of a single video."""
+        for tag in tags:
+            bisect.insort(self._postings.setdefault(tag, []), key)
+
+    def remove(self, key: TitleKey, tags: Sequence[str]):
+        """Removes the tags of a single video from the index."""
+        for tag in tags:
+            posting = self._postings.get(tag)
+            if posting is None:
+                continue
+            i = bisect.bisect_left(posting, key)
+            if i < len(posting) and posting[i] == key:
+                del posting[i]
+            if not posting:
+                del self._postings[tag]
+
+    def video_ids(self, tag: str) -> Iterator[str]:
+        """Yields the ids of the videos with the given tag in title order."""
+        for key in self._postings.get(tag, ()):
+            yield key[2]
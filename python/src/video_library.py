@@ -1,50 +1,350 @@
 """A video library class."""
 
-from .video import Video
+from .catalog_parser import read_videos
+from .flag_store import FlagStore
+from .query_cache import DEFAULT_CAPACITY, QueryCache
+from .sqlite_library import SqliteVideoLibrary
+from .video_catalog import VideoCatalog, load_catalog
+from .video_index import FUZZY_RESULTS, ResultPage
 from pathlib import Path
-import csv
+import os
 
+# Library backends accepted by open_video_library().
+BACKENDS = ("dict", "sqlite")
 
-# Helper Wrapper around CSV reader to strip whitespace from around
-# each item.
-def _csv_reader_with_strip(reader):
-    yield from ((item.strip() for item in line) for line in reader)
+# Environment variable choosing the backend when none is given.
+BACKEND_ENV_VAR = "YOUTUBE_LIBRARY_BACKEND"
 
 
 class VideoLibrary:
-    """A class used to represent a Video Library."""
-
-    def __init__(self):
-        """The VideoLibrary class is initialized."""
-        self._videos = {}
-        self._flagged = {}
-        with open(Path(__file__).parent / "videos.txt") as video_file:
-            reader = _csv_reader_with_strip(
-                csv.reader(video_file, delimiter="|"))
-            for video_info in reader:
-                title, url, tags = video_info
-                self._videos[url] = Video(
-                    title,
-                    url,
-                    [tag.strip() for tag in tags.split(",")] if tags else [],
-                )
+    """A class used to represent a Video Library.
+
+    A library combines a VideoCatalog, which may be shared between many
+    libraries, with the FlagStore holding its moderation state.
+    Catalogs loaded from a file come from the process-wide cache of
+    load_catalog(); a library copies its catalog the first time it adds or
+    removes videos, so other libraries never see the change.
+
+    Search results are kept in an LRU QueryCache. Its entries are tied to
+    the generations of the catalog and of the flags, so a result is never
+    served once a video or a flag changed.
+    """
+
+    def __init__(self, videos_path=None, lazy=False, snapshot=False,
+                 workers=None, catalog=None, flags=None, cache=True,
+                 query_cache_size=DEFAULT_CAPACITY):
+        """The VideoLibrary class is initialized.
+
+        Args:
+            videos_path: The catalog file to load, videos.txt next to the
+                package by default.
+            lazy: If True, the catalog is memory-mapped and each video is
+                decoded on first access, see VideoCatalog.
+            snapshot: If True or a path, the catalog is loaded from a binary
+                snapshot, see VideoCatalog.
+            workers: If greater than 1, large catalog files are parsed in a
+                pool of that many processes.
+            catalog: An already loaded VideoCatalog to use instead of loading
+                videos_path. Like a cached catalog, it is never changed:
+                the library copies it before adding or removing videos.
+            flags: The FlagStore to use, a new one if not given. Libraries
+                sharing a FlagStore share their flagged videos.
+            cache: If False, videos_path is loaded again instead of reusing
+                the cached catalog.
+            query_cache_size: The number of search results kept in the
+                query cache, 0 to disable it.
+        """
+        # Whether the catalog may be changed in place, see _own_catalog().
+        self._owns_catalog = False
+        if catalog is None:
+            if cache:
+                catalog = load_catalog(videos_path, lazy=lazy,
+                                       snapshot=snapshot, workers=workers)
+            else:
+                catalog = VideoCatalog(videos_path, lazy=lazy,
+                                       snapshot=snapshot, workers=workers)
+                self._owns_catalog = True
+        self._catalog = catalog
+        self._flags = (FlagStore(catalog, is_video=self._has_video)
+                       if flags is None else flags)
+        self._query_cache = QueryCache(query_cache_size)
+        # Bumped whenever self._catalog is replaced, see _query_generation().
+        self._catalog_version = 0
+        self._source_stamp = self._stat_source()
+        # A changed stamp seen once, see reload_if_changed().
+        self._pending_stamp = None
+        # Called with the CatalogDiff of every reload, see subscribe().
+        self._reload_listeners = []
+
+    def _has_video(self, video_id):
+        # Looked up through self._catalog, which a copy may replace.
+        return video_id in self._catalog
+
+    @property
+    def catalog(self) -> VideoCatalog:
+        """Returns the catalog of the library."""
+        return self._catalog
+
+    def _stat_source(self):
+        try:
+            stat = os.stat(self._catalog.videos_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def subscribe(self, listener):
+        """Calls 'listener' with the CatalogDiff of every reload, such as
+        VideoPlayer.catalog_changed()."""
+        self._reload_listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        """Stops calling a listener passed to subscribe()."""
+        self._reload_listeners.remove(listener)
+
+    def reload_if_changed(self):
+        """Reloads the catalog file if its modification time or size
+        changed since it was last read.
+
+        A file still being written could be read half-way, and a truncated
+        file would remove videos, with their flags and playlist entries. So
+        a change is only applied once two calls in a row see the same
+        modification time and size. A file that cannot be read or parsed
+        is not read again until it changes once more.
+
+        Returns:
+            The CatalogDiff applied, None if nothing was reloaded.
+
+        Raises:
+            OSError: If the file cannot be read.
+            ValueError: If the file cannot be parsed; the catalog is then
+                left as it was.
+        """
+        stamp = self._stat_source()
+        if stamp is None or stamp == self._source_stamp:
+            self._pending_stamp = None
+            return None
+        if stamp != self._pending_stamp:
+            self._pending_stamp = stamp
+            return None
+        self._pending_stamp = None
+        try:
+            return self.reload()
+        finally:
+            self._source_stamp = stamp
+
+    def reload(self):
+        """Reads the catalog file again and applies what changed.
+
+        Only the added, removed and changed videos are updated in the
+        indexes, so apart from reading the file a reload takes time
+        proportional to the size of the change. Flags on removed videos
+        are dropped, and the listeners passed to subscribe() are notified
+        so that players can update their playlists.
+
+        Returns:
+            The CatalogDiff applied.
+        """
+        if self._catalog.is_lazy:
+            raise ValueError("A lazy catalog cannot be reloaded.")
+        stamp = self._stat_source()
+        with open(self._catalog.videos_path) as video_file:
+            diff = self._catalog.diff(read_videos(video_file))
+        self._source_stamp = stamp
+        if not diff:
+            return diff
+        flagged = self._flags.flagged
+        self._flags.unflag_videos(
+            [video_id for video_id in diff.removed if video_id in flagged])
+        for video_id in diff.removed:
+            self.remove_video(video_id)
+        for video in diff.changed + diff.added:
+            self.add_video(video)
+        for listener in list(self._reload_listeners):
+            listener(diff)
+        return diff
+
+    @property
+    def query_cache(self) -> QueryCache:
+        """Returns the cache of search results, see QueryCache.stats."""
+        return self._query_cache
+
+    def _query_generation(self):
+        # The number of catalog replacements is part of the generation, as
+        # the counter of a new catalog starts over.
+        return (self._catalog_version, self._catalog.generation,
+                self._flags.generation)
+
+    def _cached_search(self, key, search):
+        """Returns the cached result of a search, running it on a miss."""
+        generation = self._query_generation()
+        videos = self._query_cache.get(key, generation)
+        if videos is None:
+            videos = tuple(search())
+            self._query_cache.put(key, generation, videos)
+        return list(videos)
+
+    def _cached_page(self, key, limit, offset, search, search_page):
+        """Returns a page of a cached search result.
+
+        On a miss, an unpaged request runs the whole search and caches it.
+        A paged request selects its page first, without sorting every
+        match; the whole result is then cached only if it is small enough,
+        and taken from the page itself when the page holds every match.
+        """
+        generation = self._query_generation()
+        videos = self._query_cache.get(key, generation)
+        if videos is None:
+            if limit is not None:
+                page = search_page()
+                if (page.total > self._query_cache.max_result_size
+                        or self._query_cache.capacity <= 0):
+                    return page
+                if offset == 0 and len(page.videos) == page.total:
+                    self._query_cache.put(key, generation, tuple(page.videos))
+                    return page
+            videos = tuple(search())
+            self._query_cache.put(key, generation, videos)
+        stop = None if limit is None else offset + limit
+        return ResultPage(list(videos[offset:stop]), len(videos))
+
+    @property
+    def flag_store(self) -> FlagStore:
+        """Returns the moderation state of the library."""
+        return self._flags
 
     @property
     def flagged(self) -> dict:
         """Returns dictionary of flagged video_ids."""
-        return self._flagged
+        return self._flags.flagged
 
     def flag_video(self, video_id, reason=""):
         """Add flagged status to video id with optional reason"""
-        self._flagged[video_id] = reason
+        self._flags.flag_video(video_id, reason)
 
     def unflag_video(self, video_id):
         """Remove flagged status to video id"""
-        self._flagged.pop(video_id)
+        self._flags.unflag_video(video_id)
+
+    def flag_videos(self, reasons):
+        """Flags many videos at once, see FlagStore.flag_videos()."""
+        self._flags.flag_videos(reasons)
+
+    def unflag_videos(self, video_ids):
+        """Unflags many videos at once, see FlagStore.unflag_videos()."""
+        self._flags.unflag_videos(video_ids)
+
+    def get_random_video(self):
+        """Returns a random unflagged video, or None if there is none."""
+        video_id = self._flags.random_video_id()
+        return None if video_id is None else self._catalog.get_video(video_id)
 
     def get_all_videos(self):
         """Returns all available video information from the video library."""
-        return list(self._videos.values())
+        return self._catalog.get_all_videos()
+
+    def __len__(self):
+        return len(self._catalog)
+
+    def iter_videos_by_title(self):
+        """Yields every video in the library in title order."""
+        return self._catalog.iter_videos_by_title()
+
+    def videos_by_title_page(self, limit, offset=0):
+        """Returns a ResultPage of the videos in title order, flagged ones
+        included, see VideoCatalog.videos_by_title_page()."""
+        return self._catalog.videos_by_title_page(limit, offset)
+
+    def add_video(self, video):
+        """Adds a video to the library, replacing any video with the same id."""
+        self._own_catalog()
+        self._catalog.add_video(video)
+        self._flags.add_video(video.video_id)
+
+    def remove_video(self, video_id):
+        """Removes a video from the library, together with any flag on it."""
+        self._own_catalog()
+        self._catalog.remove_video(video_id)
+        self._flags.remove_video(video_id)
+
+    def _own_catalog(self):
+        # Copy a cached or given catalog before its first change, so the
+        # libraries sharing it are not affected.
+        if not self._owns_catalog:
+            self._catalog = self._catalog.copy()
+            self._catalog_version += 1
+            self._owns_catalog = True
+
+    def write_snapshot(self, snapshot_path=None):
+        """Writes a binary snapshot of the catalog, see VideoCatalog."""
+        self._catalog.write_snapshot(snapshot_path)
+
+    def search_videos(self, search_term):
+        """Returns the unflagged videos whose titles contain the search term.
+
+        Args:
+            search_term: The query to be used in search, matched case
+                insensitively.
+
+        Returns:
+            The matching Video objects, sorted by title.
+        """
+        return self._cached_search(
+            ("title", search_term.strip().lower()),
+            lambda: self._catalog.search_videos(search_term,
+                                                self._flags.flagged))
+
+    def search_videos_page(self, search_term, limit, offset=0):
+        """Returns a ResultPage of the unflagged videos whose titles contain
+        the search term, see VideoCatalog.search_videos_page()."""
+        return self._cached_page(
+            ("title", search_term.strip().lower()), limit, offset,
+            lambda: self._catalog.search_videos(search_term,
+                                                self._flags.flagged),
+            lambda: self._catalog.search_videos_page(
+                search_term, limit, offset, self._flags.flagged))
+
+    def search_videos_fuzzy(self, search_term, limit=FUZZY_RESULTS):
+        """Returns the unflagged videos whose titles are closest to the
+        search term, see VideoCatalog.search_videos_fuzzy().
+
+        Args:
+            search_term: The query to be used in search, matched case
+                insensitively.
+            limit: The largest number of videos returned.
+
+        Returns:
+            The matching Video objects, closest first.
+        """
+        return self._cached_search(
+            ("fuzzy", search_term.strip().lower(), limit),
+            lambda: self._catalog.search_videos_fuzzy(
+                search_term, limit, self._flags.flagged))
+
+    def search_videos_tag(self, video_tag):
+        """Returns the unflagged videos that have the given tag.
+
+        Args:
+            video_tag: The video tag to be used in search, lowercased before
+                the lookup.
+
+        Returns:
+            The matching Video objects, sorted by title.
+        """
+        return self._cached_search(
+            ("tag", video_tag.strip().lower()),
+            lambda: self._catalog.search_videos_tag(video_tag,
+                                                    self._flags.flagged))
+
+    def search_videos_tag_page(self, video_tag, limit, offset=0):
+        """Returns a ResultPage of the unflagged videos that have the given
+        tag, see VideoCatalog.search_videos_tag_page()."""
+        return self._cached_page(
+            ("tag", video_tag.strip().lower()), limit, offset,
+            lambda: self._catalog.search_videos_tag(video_tag,
+                                                    self._flags.flagged),
+            lambda: self._catalog.search_videos_tag_page(
+                video_tag, limit, offset, self._flags.flagged))
+
     def get_video(self, video_id):
         """Returns the video object (title, url, tags) from the video library.
 
@@ -55,4 +355,28 @@ class VideoLibrary:
             The Video object for the requested video_id. None if the video
             does not exist.
         """
-        return self._videos.get(video_id, None)
+        return self._catalog.get_video(video_id)
+
+
+def open_video_library(backend=None, videos_path=None, db_path=None):
+    """Returns a library using the requested backend.
+
+    Args:
+        backend: "dict" for the in-memory VideoLibrary or "sqlite" for a
+            SqliteVideoLibrary. Defaults to the YOUTUBE_LIBRARY_BACKEND
+            environment variable, or "dict".
+        videos_path: The catalog file, videos.txt next to the package by
+            default.
+        db_path: The SQLite database file, videos_path + ".db" by default.
+    """
+    if backend is None:
+        backend = os.environ.get(BACKEND_ENV_VAR, "dict")
+    if backend == "dict":
+        return VideoLibrary(videos_path)
+    if backend == "sqlite":
+        if db_path is None:
+            if videos_path is None:
+                videos_path = Path(__file__).parent / "videos.txt"
+            db_path = str(videos_path) + ".db"
+        return SqliteVideoLibrary(db_path, videos_path)
+    raise ValueError("Unknown library backend: {}".format(backend))
@@ -1,18 +1,168 @@
 """A video player class."""
 
-from .video_library import VideoLibrary
+from .output_sink import PrintSink
+from .video_library import open_video_library
 from .video_playlist import Playlist
-import random
+
+# The number of search results a player keeps for PLAY_RESULT.
+MAX_RESULT_HANDLES = 16
 
 class VideoPlayer:
     """A class used to represent a Video Player."""
 
-    def __init__(self):
-        self._video_library = VideoLibrary()
+    def __init__(self, video_library=None, read_answer=None, output=None,
+                 defer_answers=False, backend=None, result_handles=False):
+        """The VideoPlayer class is initialized.
+
+        Args:
+            video_library: The VideoLibrary to play from, the default
+                catalog of the configured backend if not given.
+            read_answer: Callable returning the user's answer to a search
+                prompt, input() if not given.
+            output: The OutputSink messages are written to, printed
+                straight to stdout if not given.
+            defer_answers: If True, search prompts never wait for an answer;
+                the caller passes the next line it receives to
+                answer_selection() instead while awaiting_answer is set.
+            backend: The library backend used when video_library is not
+                given, see open_video_library().
+            result_handles: If True, searches never prompt: they print the
+                handle their results are kept under instead, to be played
+                with play_result().
+        """
+        self._video_library = (open_video_library(backend)
+                               if video_library is None else video_library)
+        self._read_answer = read_answer
+        self._defer_answers = defer_answers
+        self._pending_selection = None
+        self._result_handles = result_handles
+        # Result handle -> matched videos, oldest first.
+        self._results = {}
+        self._next_handle = 1
+        self._output = PrintSink() if output is None else output
         self._playing_video = ""
         self._video_paused = False
         self._video_playlist = Playlist()
 
+    @property
+    def output(self):
+        """Returns the OutputSink the player writes to."""
+        return self._output
+
+    def _ask(self):
+        """Returns the user's answer to a prompt."""
+        # The prompt has to be visible before waiting for the answer.
+        self._output.flush()
+        if self._read_answer is None:
+            return input()
+        return self._read_answer()
+
+    @property
+    def video_library(self):
+        """Returns the VideoLibrary the player plays from."""
+        return self._video_library
+
+    @property
+    def playlist(self):
+        """Returns the Playlist holding the player's playlists."""
+        return self._video_playlist
+
+    @property
+    def awaiting_answer(self) -> bool:
+        """Returns whether a deferred search prompt waits for an answer."""
+        return self._pending_selection is not None
+
+    def _offer_selection(self, matched):
+        """Asks the user which of the matched videos to play.
+
+        The matched videos are kept under a new result handle either way.
+        """
+        handle = "r{}".format(self._next_handle)
+        self._next_handle += 1
+        self._results[handle] = matched
+        if len(self._results) > MAX_RESULT_HANDLES:
+            del self._results[next(iter(self._results))]
+        if self._result_handles:
+            self._output.write("Results saved as {handle}. To play one of them, enter PLAY_RESULT {handle} <number> (or PLAY_RESULT <number> for the latest results).".format(handle=handle))
+            return
+        self._output.write("Would you like to play any of the above? If yes, specify the number of the video.")
+        self._output.write("If your answer is not a valid number, we will assume it's a no.")
+        if self._defer_answers:
+            self._pending_selection = matched
+        else:
+            self._play_selection(matched, self._ask())
+
+    def answer_selection(self, answer):
+        """Answers the pending deferred search prompt.
+
+        Args:
+            answer: The line the user entered after the prompt.
+        """
+        matched = self._pending_selection
+        self._pending_selection = None
+        if matched is not None:
+            self._play_selection(matched, answer.strip())
+
+    def _play_selection(self, matched, x):
+        if x.isnumeric() and int(x) > 0 and int(x) < len(matched) + 1:
+            self.play_video(matched[int(x) - 1].video_id)
+
+    def play_result(self, handle_or_number, number=None):
+        """Plays a video from the results of an earlier search.
+
+        Args:
+            handle_or_number: The result handle printed by the search, or
+                the number of the video in the latest results.
+            number: The number of the video in the results of the handle.
+        """
+        if number is None:
+            handle, number = next(reversed(self._results), None), handle_or_number
+        else:
+            handle = handle_or_number.lower()
+
+        if handle is None:
+            self._output.write("Cannot play result: No search results to play from")
+        elif handle not in self._results:
+            self._output.write("Cannot play result: Result handle does not exist")
+        else:
+            matched = self._results[handle]
+            if number.isnumeric() and 0 < int(number) <= len(matched):
+                self.play_video(matched[int(number) - 1].video_id)
+            else:
+                self._output.write("Cannot play result: Result number does not exist")
+
+    def catalog_changed(self, diff):
+        """Updates the player after its library reloaded the catalog.
+
+        A removed video stops playing, quietly as the user did not ask for
+        it, and is removed from every playlist. Results kept for
+        PLAY_RESULT are left as they are: play_video() reports the videos
+        that no longer exist.
+
+        Args:
+            diff: The CatalogDiff applied by the library.
+        """
+        if not diff.removed:
+            return
+        if self._playing_video in set(diff.removed):
+            self.stopping_video()
+        self._video_playlist.remove_videos(diff.removed)
+
+    def remove_missing_videos(self):
+        """Removes from every playlist, and unflags, the videos that are not
+        in the library, such as playlists and flags restored from a journal
+        written before videos were taken out of the catalog."""
+        missing = {video_id
+                   for playlist in self._video_playlist.playlists.values()
+                   for video_id in playlist['videos']
+                   if self._video_library.get_video(video_id) is None}
+        if missing:
+            self._video_playlist.remove_videos(missing)
+        missing_flags = [video_id for video_id in self._video_library.flagged
+                         if self._video_library.get_video(video_id) is None]
+        if missing_flags:
+            self._video_library.unflag_videos(missing_flags)
+
     @property
     def playing(self) -> str:
         """Returns the id of the playing video."""
@@ -38,23 +188,39 @@ class VideoPlayer:
         self._video_paused = False
 
     def number_of_videos(self):
-        num_videos = len(self._video_library.get_all_videos())
-        print(f"{num_videos} videos in the library")
+        num_videos = len(self._video_library)
+        self._output.write(f"{num_videos} videos in the library")
 
-    def show_all_videos(self):
-        """Returns all videos."""
-        
-        print("Here's a list of all available videos:" )
-        videos = self._video_library.get_all_videos()
+    def show_all_videos(self, limit=None, offset=None):
+        """Returns all videos.
+
+        Args:
+            limit: Optional number of videos to display, followed by the
+                total number of videos.
+            offset: Optional number of videos to skip.
+        """
+        paged = self._page_arguments("show videos", limit, offset)
+        if paged is None:
+            return
+        if limit is None and offset is None:
+            videos = self._video_library.iter_videos_by_title()
+        else:
+            page = self._video_library.videos_by_title_page(*paged)
+            videos = page.videos
+            if not videos:
+                self._output.write("No more videos in the library ({} in total)".format(page.total))
+                return
+
+        self._output.write("Here's a list of all available videos:" )
         flagged = self._video_library.flagged
-        # Sort by lexicographical order by title
-        videos.sort(key=lambda x: x.title)
         for video in videos:
             out = '{title} ({id}) [{tags}]'.format(title=video.title, id=video.video_id, tags=' '.join(video.tags))
             if video.video_id in flagged:
                 id = video.video_id
                 out = out + ' - FLAGGED (reason: {})'.format(flagged[id] if flagged[id] else 'Not supplied') 
-            print(out)
+            self._output.write(out)
+        if limit is not None or offset is not None:
+            self._output.write("Showing videos {}-{} of {}".format(paged[1] + 1, paged[1] + len(page.videos), page.total))
 
     def play_video(self, video_id):
         """Plays the respective video.
@@ -65,16 +231,16 @@ class VideoPlayer:
         video = self._video_library.get_video(video_id)
         flagged = self._video_library.flagged
         if video is None:
-            print("Cannot play video: Video does not exist" )
+            self._output.write("Cannot play video: Video does not exist" )
         elif video_id in flagged:
-            print('Cannot play video: Video is currently flagged (reason: {reason})'.format(reason=flagged[video_id] if flagged[video_id] else "Not supplied"))
+            self._output.write('Cannot play video: Video is currently flagged (reason: {reason})'.format(reason=flagged[video_id] if flagged[video_id] else "Not supplied"))
         else:
             if len(self.playing) > 0:
                 prev_video_id = self.playing;
                 prev_video = self._video_library.get_video(prev_video_id);
-                print("Stopping video: " + prev_video.title)
+                self._output.write("Stopping video: " + prev_video.title)
 
-            print('Playing video: {}'.format(video.title))
+            self._output.write('Playing video: {}'.format(video.title))
             self.now_playing(video.video_id)
 
     def stop_video(self):
@@ -83,20 +249,18 @@ class VideoPlayer:
         prev_video = self._video_library.get_video(prev_video_id);
 
         if len(self.playing) == 0:
-            print("Cannot stop video: No video is currently playing" )
+            self._output.write("Cannot stop video: No video is currently playing" )
         else:
-            print("Stopping video: " + prev_video.title)
+            self._output.write("Stopping video: " + prev_video.title)
             self.stopping_video()
 
     def play_random_video(self):
         """Plays a random video from the video library."""
 
-        videos = list(filter(lambda x: (x.video_id not in self._video_library.flagged),self._video_library.get_all_videos()))
-        num_videos = len(videos)
-        if num_videos < 1:
-            print("No videos available")
+        random_video = self._video_library.get_random_video()
+        if random_video is None:
+            self._output.write("No videos available")
         else:
-            random_video = videos[random.randint(0, num_videos - 1)]
             self.play_video(random_video.video_id)
 
     def pause_video(self):
@@ -106,24 +270,24 @@ class VideoPlayer:
         prev_video = self._video_library.get_video(prev_video_id);
 
         if self.is_paused:
-            print('Video already paused: {}'.format(prev_video.title))
+            self._output.write('Video already paused: {}'.format(prev_video.title))
         elif not self.playing:
-            print("Cannot pause video: No video is currently playing")
+            self._output.write("Cannot pause video: No video is currently playing")
         else:
-            print('Pausing video: {}'.format(prev_video.title))
+            self._output.write('Pausing video: {}'.format(prev_video.title))
             self.pause()
 
     def continue_video(self):
         """Resumes playing the current video."""
 
         if not self.playing:
-            print("Cannot continue video: No video is currently playing")
+            self._output.write("Cannot continue video: No video is currently playing")
         elif not self.is_paused:
-            print("Cannot continue video: Video is not paused")
+            self._output.write("Cannot continue video: Video is not paused")
         else:
             prev_video_id = self.playing;
             prev_video = self._video_library.get_video(prev_video_id);
-            print('Continuing video: {}'.format(prev_video.title))
+            self._output.write('Continuing video: {}'.format(prev_video.title))
             self.now_playing(prev_video_id)
 
 
@@ -137,9 +301,9 @@ class VideoPlayer:
             out = 'Currently playing: {title} ({id}) [{tags}]'.format(title=video.title, id=video.video_id, tags=' '.join(video.tags))
             if self.is_paused:
                 out = out + " - PAUSED"
-            print(out)
+            self._output.write(out)
         else:
-            print("No video is currently playing")
+            self._output.write("No video is currently playing")
 
     def create_playlist(self, playlist_name):
         """Creates a playlist with a given name.
@@ -151,10 +315,10 @@ class VideoPlayer:
         playlists = self._video_playlist.playlists
 
         if playlist_name.lower() in playlists:
-            print("Cannot create playlist: A playlist with the same name already exists")
+            self._output.write("Cannot create playlist: A playlist with the same name already exists")
         else:
             self._video_playlist.create_playlist(playlist_name)
-            print("Successfully created new playlist: " + playlist_name)
+            self._output.write("Successfully created new playlist: " + playlist_name)
 
     def add_to_playlist(self, playlist_name, video_id):
         """Adds a video to a playlist with a given name.
@@ -168,16 +332,16 @@ class VideoPlayer:
         flagged = self._video_library.flagged
 
         if playlist_name.lower() not in playlists:
-            print('Cannot add video to {}: Playlist does not exist'.format(playlist_name))
+            self._output.write('Cannot add video to {}: Playlist does not exist'.format(playlist_name))
         elif video is None:
-            print('Cannot add video to {}: Video does not exist'.format(playlist_name))
+            self._output.write('Cannot add video to {}: Video does not exist'.format(playlist_name))
         elif video_id in flagged:
-            print('Cannot add video to {playlist}: Video is currently flagged (reason: {reason})'.format(playlist=playlist_name, reason=flagged[video_id] if flagged[video_id] else "Not supplied"))
+            self._output.write('Cannot add video to {playlist}: Video is currently flagged (reason: {reason})'.format(playlist=playlist_name, reason=flagged[video_id] if flagged[video_id] else "Not supplied"))
         elif video_id in playlists[playlist_name.lower()]['videos']:
-            print('Cannot add video to {}: Video already added'.format(playlist_name))
+            self._output.write('Cannot add video to {}: Video already added'.format(playlist_name))
         else:
             self._video_playlist.add_to_playlist(playlist_name.lower(), video_id)
-            print('Added video to {playlist_name}: {video}'.format(playlist_name=playlist_name, video=video.title))
+            self._output.write('Added video to {playlist_name}: {video}'.format(playlist_name=playlist_name, video=video.title))
 
     def show_all_playlists(self):
         """Display all playlists."""
@@ -186,11 +350,11 @@ class VideoPlayer:
         playlists.sort(key=lambda x: x['name'])
 
         if len(playlists) < 1:
-            print('No playlists exist yet')
+            self._output.write('No playlists exist yet')
         else:
-            print("Showing all playlists:")
+            self._output.write("Showing all playlists:")
             for playlist in playlists:
-                print(playlist['name'])
+                self._output.write(playlist['name'])
 
     def show_playlist(self, playlist_name):
         """Display all videos in a playlist with a given name.
@@ -201,11 +365,11 @@ class VideoPlayer:
         playlists = self._video_playlist.playlists
 
         if playlist_name.lower() not in playlists:
-            print('Cannot show playlist {}: Playlist does not exist'.format(playlist_name))
+            self._output.write('Cannot show playlist {}: Playlist does not exist'.format(playlist_name))
         else:
-            print("Showing playlist: " + playlist_name)
+            self._output.write("Showing playlist: " + playlist_name)
             if len(playlists[playlist_name.lower()]['videos']) < 1:
-                print('No videos here yet')
+                self._output.write('No videos here yet')
             else:
                 flagged = self._video_library.flagged
                 for video_id in playlists[playlist_name.lower()]['videos']:
@@ -213,7 +377,7 @@ class VideoPlayer:
                     out = '{title} ({id}) [{tags}]'.format(title=video.title, id=video.video_id, tags=' '.join(video.tags))
                     if video_id in flagged:
                         out = out + ' - FLAGGED (reason: {})'.format(flagged[video_id] if flagged[video_id] else 'Not supplied') 
-                    print(out)
+                    self._output.write(out)
 
     def remove_from_playlist(self, playlist_name, video_id):
         """Removes a video to a playlist with a given name.
@@ -226,14 +390,14 @@ class VideoPlayer:
         video = self._video_library.get_video(video_id)
 
         if playlist_name.lower() not in playlists:
-            print('Cannot remove video from {}: Playlist does not exist'.format(playlist_name))
+            self._output.write('Cannot remove video from {}: Playlist does not exist'.format(playlist_name))
         elif video is None:
-            print('Cannot remove video from {}: Video does not exist'.format(playlist_name))
+            self._output.write('Cannot remove video from {}: Video does not exist'.format(playlist_name))
         elif video_id not in playlists[playlist_name.lower()]['videos']:
-            print('Cannot remove video from {}: Video is not in playlist'.format(playlist_name))
+            self._output.write('Cannot remove video from {}: Video is not in playlist'.format(playlist_name))
         else:
             self._video_playlist.remove_from_playlist(playlist_name.lower(), video_id)
-            print('Removed video from {}: {}'.format(playlist_name, video.title))
+            self._output.write('Removed video from {}: {}'.format(playlist_name, video.title))
 
     def clear_playlist(self, playlist_name):
         """Removes all videos from a playlist with a given name.
@@ -244,10 +408,10 @@ class VideoPlayer:
         playlists = self._video_playlist.playlists
 
         if playlist_name.lower() not in playlists:
-            print('Cannot clear playlist {}: Playlist does not exist'.format(playlist_name))
+            self._output.write('Cannot clear playlist {}: Playlist does not exist'.format(playlist_name))
         else:
             self._video_playlist.clear_playlist(playlist_name.lower())
-            print('Successfully removed all videos from {}'.format(playlist_name))
+            self._output.write('Successfully removed all videos from {}'.format(playlist_name))
 
 
     def delete_playlist(self, playlist_name):
@@ -259,67 +423,106 @@ class VideoPlayer:
         playlists = self._video_playlist.playlists
         
         if playlist_name.lower() not in playlists:
-            print('Cannot delete playlist {}: Playlist does not exist'.format(playlist_name))
+            self._output.write('Cannot delete playlist {}: Playlist does not exist'.format(playlist_name))
         else:
             self._video_playlist.delete_playlist(playlist_name.lower())
-            print('Deleted playlist: {}'.format(playlist_name))
+            self._output.write('Deleted playlist: {}'.format(playlist_name))
 
-    def search_videos(self, search_term):
-        """Display all the videos whose titles contain the search_term.
+    def _page_arguments(self, action, limit, offset):
+        """Returns the (limit, offset) of a paged command as numbers, None
+        if they are not valid.
 
         Args:
-            search_term: The query to be used in search.
+            action: What the command does, for the error message.
+            limit: The requested page size, None for no limit.
+            offset: The requested number of results to skip, None for 0.
         """
-        videos = list(filter(lambda x: (x.video_id not in self._video_library.flagged),self._video_library.get_all_videos()))
-        videos.sort(key=lambda x: x.title)
-        matched = []
+        try:
+            limit = None if limit is None else int(limit)
+            offset = 0 if offset is None else int(offset)
+        except ValueError:
+            limit = offset = -1
+        if (limit is not None and limit < 1) or offset < 0:
+            self._output.write("Cannot {}: Please enter a limit of at least 1 and an offset of at least 0".format(action))
+            return None
+        return limit, offset
+
+    def _show_results(self, search_term, page, offset=None):
+        """Displays a page of search results and offers to play one.
 
-        for video in videos:
-            if search_term.strip().lower() in video.title.lower():
-                matched.append(video)
-        
-        if len(matched) < 1:
-            print("No search results for " + search_term)
+        Args:
+            search_term: The query the results are for.
+            page: The ResultPage to display.
+            offset: The offset of a paged search, None if not paged.
+        """
+        matched = page.videos
+
+        if page.total < 1:
+            self._output.write("No search results for " + search_term)
+        elif len(matched) < 1:
+            self._output.write("No more search results for {} ({} in total)".format(search_term, page.total))
         else:
-            print("Here are the results for " + search_term + ":")
+            self._output.write("Here are the results for " + search_term + ":")
 
             for i, video in enumerate(matched):
-                print('{index}) {title} ({id}) [{tags}]'.format(index=i + 1,title=video.title, id=video.video_id, tags=' '.join(video.tags)))
+                self._output.write('{index}) {title} ({id}) [{tags}]'.format(index=i + 1,title=video.title, id=video.video_id, tags=' '.join(video.tags)))
 
-            print("Would you like to play any of the above? If yes, specify the number of the video.")
-            print("If your answer is not a valid number, we will assume it's a no.")
-            x = input()
-            if x.isnumeric() and int(x) > 0 and int(x) < len(matched) + 1:
-                self.play_video(matched[int(x) - 1].video_id)
+            if offset is not None:
+                self._output.write("Showing results {}-{} of {}".format(offset + 1, offset + len(matched), page.total))
+            self._offer_selection(matched)
 
-    def search_videos_tag(self, video_tag):
-        """Display all videos whose tags contains the provided tag.
+    def search_videos(self, search_term, limit=None, offset=None):
+        """Display all the videos whose titles contain the search_term.
 
         Args:
-            video_tag: The video tag to be used in search.
+            search_term: The query to be used in search.
+            limit: Optional number of results to display, followed by the
+                total number of results.
+            offset: Optional number of results to skip.
         """
+        paged = self._page_arguments("search videos", limit, offset)
+        if paged is None:
+            return
+        page = self._video_library.search_videos_page(search_term, *paged)
+        self._show_results(search_term, page,
+                           None if limit is None and offset is None
+                           else paged[1])
+
+    def search_videos_fuzzy(self, search_term):
+        """Display the videos whose titles are closest to the search_term,
+        tolerating typos.
 
-        videos = list(filter(lambda x: (x.video_id not in self._video_library.flagged),self._video_library.get_all_videos()))
-        matched = []
-
-        for video in videos:
-            if video_tag.strip().lower() in video.tags:
-                matched.append(video)
+        Args:
+            search_term: The query to be used in search.
+        """
+        matched = self._video_library.search_videos_fuzzy(search_term)
 
         if len(matched) < 1:
-            print("No search results for " + video_tag)
+            self._output.write("No search results for " + search_term)
         else:
-            matched.sort(key=lambda x: x.title)
-            print("Here are the results for " + video_tag + ":")
+            self._output.write("Here are the closest results for " + search_term + ":")
 
             for i, video in enumerate(matched):
-                print('{index}) {title} ({id}) [{tags}]'.format(index=i + 1,title=video.title, id=video.video_id, tags=' '.join(video.tags)))
+                self._output.write('{index}) {title} ({id}) [{tags}]'.format(index=i + 1,title=video.title, id=video.video_id, tags=' '.join(video.tags)))
 
-            print("Would you like to play any of the above? If yes, specify the number of the video.")
-            print("If your answer is not a valid number, we will assume it's a no.")
-            x = input()
-            if x.isnumeric() and int(x) > 0 and int(x) < len(matched) + 1:
-                self.play_video(matched[int(x) - 1].video_id)
+            self._offer_selection(matched)
+
+    def search_videos_tag(self, video_tag, limit=None, offset=None):
+        """Display all videos whose tags contains the provided tag.
+
+        Args:
+            video_tag: The video tag to be used in search.
+            limit: Optional number of results to display, followed by the
+                total number of results.
+            offset: Optional number of results to skip.
+        """
+        paged = self._page_arguments("search videos", limit, offset)
+        if paged is None:
+            return
+        page = self._video_library.search_videos_tag_page(video_tag, *paged)
+        self._show_results(video_tag, page,
+                           None if limit is None and offset is None
+                           else paged[1])
 
     def flag_video(self, video_id, flag_reason=""):
         """Mark a video as flagged.
@@ -333,14 +536,14 @@ class VideoPlayer:
         flagged = self._video_library.flagged
 
         if video is None:
-            print("Cannot flag video: Video does not exist")
+            self._output.write("Cannot flag video: Video does not exist")
         elif video_id in flagged:
-            print("Cannot flag video: Video is already flagged")
+            self._output.write("Cannot flag video: Video is already flagged")
         else:
             if video_id == self.playing:
                 self.stop_video()
             self._video_library.flag_video(video_id, flag_reason.strip())
-            print('Successfully flagged video: {video_title} (reason: {reason})'.format(video_title=video.title, reason=flag_reason if flag_reason else "Not supplied"))
+            self._output.write('Successfully flagged video: {video_title} (reason: {reason})'.format(video_title=video.title, reason=flag_reason if flag_reason else "Not supplied"))
         
 
     def allow_video(self, video_id):
@@ -353,9 +556,86 @@ class VideoPlayer:
         flagged = self._video_library.flagged
 
         if video is None:
-            print("Cannot remove flag from video: Video does not exist")
+            self._output.write("Cannot remove flag from video: Video does not exist")
         elif video_id not in flagged:
-            print("Cannot remove flag from video: Video is not flagged")
+            self._output.write("Cannot remove flag from video: Video is not flagged")
         else:
             self._video_library.unflag_video(video_id)
-            print("Successfully removed flag from video: " + video.title)
+            self._output.write("Successfully removed flag from video: " + video.title)
+
+    def flag_videos_from_file(self, file_path, flag_reason=""):
+        """Flags every video listed in a file, printing a single summary.
+
+        Args:
+            file_path: The file to read, holding one video_id per line,
+                optionally followed by a flag reason for that video.
+                Blank lines are skipped.
+            flag_reason: Reason for the videos listed without one.
+        """
+        flagged = self._video_library.flagged
+        reasons = {}
+        already_flagged = 0
+        missing = 0
+        try:
+            with open(file_path) as id_file:
+                for line in id_file:
+                    fields = line.split(None, 1)
+                    if not fields:
+                        continue
+                    video_id = fields[0]
+                    if video_id in reasons or video_id in flagged:
+                        already_flagged += 1
+                    elif self._video_library.get_video(video_id) is None:
+                        missing += 1
+                    else:
+                        reasons[video_id] = (fields[1].strip() if len(fields) > 1
+                                             else flag_reason.strip())
+        except OSError:
+            self._output.write("Cannot flag videos: File could not be read")
+            return
+
+        if self.playing in reasons:
+            self.stop_video()
+        self._video_library.flag_videos(reasons.items())
+        self._output.write(
+            "Successfully flagged {count} videos ({already} already flagged, "
+            "{missing} do not exist)".format(
+                count=len(reasons), already=already_flagged, missing=missing))
+
+    def allow_videos_from_file(self, file_path):
+        """Removes the flags of every video listed in a file, printing a
+        single summary.
+
+        Args:
+            file_path: The file to read, holding one video_id per line. Any
+                text after the video_id is ignored, so the files read by
+                flag_videos_from_file() can be reused.
+        """
+        flagged = self._video_library.flagged
+        video_ids = {}
+        not_flagged = 0
+        missing = 0
+        try:
+            with open(file_path) as id_file:
+                for line in id_file:
+                    fields = line.split(None, 1)
+                    if not fields:
+                        continue
+                    video_id = fields[0]
+                    if video_id in video_ids:
+                        not_flagged += 1
+                    elif video_id in flagged:
+                        video_ids[video_id] = None
+                    elif self._video_library.get_video(video_id) is None:
+                        missing += 1
+                    else:
+                        not_flagged += 1
+        except OSError:
+            self._output.write("Cannot remove flags from videos: File could not be read")
+            return
+
+        self._video_library.unflag_videos(video_ids)
+        self._output.write(
+            "Successfully removed flag from {count} videos ({not_flagged} not "
+            "flagged, {missing} do not exist)".format(
+                count=len(video_ids), not_flagged=not_flagged, missing=missing))
@@ -6,28 +6,60 @@ class Playlist:
     def __init__(self):
         """The Playlist class is initialized."""
         self._playlists = {}
+        self._journal = None
 
     @property
     def playlists(self) -> dict:
         """Returns dictionary of playlists."""
         return self._playlists
 
+    def set_journal(self, journal):
+        """Sets the StateJournal changes are recorded to, None for none."""
+        self._journal = journal
+
     def create_playlist(self, playlist_name):
-        """Creates a new playlist."""
-        self._playlists[playlist_name.lower()] = {"name": playlist_name, "videos": []}
+        """Creates a new playlist.
+
+        The videos of a playlist are kept as the keys of a dictionary, an
+        insertion-ordered set with O(1) add, membership and removal.
+        """
+        self._playlists[playlist_name.lower()] = {"name": playlist_name, "videos": {}}
+        if self._journal is not None:
+            self._journal.record("playlist", "create_playlist", playlist_name)
 
     def add_to_playlist(self, playlist_name, video_id):
         """Add video id to an existing playlist."""
-        self._playlists[playlist_name.lower()]['videos'].append(video_id)
+        self._playlists[playlist_name.lower()]['videos'][video_id] = None
+        if self._journal is not None:
+            self._journal.record("playlist", "add_to_playlist", playlist_name, video_id)
 
     def remove_from_playlist(self, playlist_name, video_id):
         """Remove video id to an existing playlist."""
-        self._playlists[playlist_name.lower()]['videos'].remove(video_id)
+        del self._playlists[playlist_name.lower()]['videos'][video_id]
+        if self._journal is not None:
+            self._journal.record("playlist", "remove_from_playlist", playlist_name, video_id)
+
+    def remove_videos(self, video_ids):
+        """Remove video ids from every playlist, such as videos that are no
+        longer in the catalog."""
+        video_ids = set(video_ids)
+        removed = []
+        for playlist in self._playlists.values():
+            videos = playlist['videos']
+            for video_id in video_ids.intersection(videos):
+                del videos[video_id]
+                removed.append(video_id)
+        if removed and self._journal is not None:
+            self._journal.record("playlist", "remove_videos", sorted(set(removed)))
 
     def clear_playlist(self, playlist_name):
         """Clear list of video ids to an existing playlist."""
         self._playlists[playlist_name.lower()]['videos'].clear()
+        if self._journal is not None:
+            self._journal.record("playlist", "clear_playlist", playlist_name)
 
     def delete_playlist(self, playlist_name):
         """Delete an existing playlist."""
         self._playlists.pop(playlist_name, None)
+        if self._journal is not None:
+            self._journal.record("playlist", "delete_playlist", playlist_name)
@@ -0,0 +1,81 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from src.catalog_snapshot import SnapshotError, read_snapshot
+from src.video_library import VideoLibrary
+
+VIDEOS_PATH = Path(__file__).parent.parent / "src" / "videos.txt"
+
+
+@pytest.fixture
+def videos_path(tmp_path):
+    path = tmp_path / "videos.txt"
+    shutil.copy(VIDEOS_PATH, path)
+    return path
+
+
+def _ids(videos):
+    return [video.video_id for video in videos]
+
+
+def test_snapshot_is_written_and_matches_text_library(videos_path):
+    library = VideoLibrary(videos_path, snapshot=True)
+    assert Path(str(videos_path) + ".snap").exists()
+
+    loaded = VideoLibrary(videos_path, snapshot=True)
+    eager = VideoLibrary(videos_path)
+    assert _ids(loaded.iter_videos_by_title()) == _ids(
+        eager.iter_videos_by_title())
+    assert _ids(loaded.search_videos("cat")) == _ids(eager.search_videos("cat"))
+    assert _ids(loaded.search_videos_tag("#animal")) == _ids(
+        eager.search_videos_tag("#animal"))
+    assert loaded.get_video("nothing_video_id").tags == ()
+    assert library.get_video("amazing_cats_video_id").tags == ("#cat", "#animal")
+
+
+def test_stale_snapshot_is_rebuilt(videos_path):
+    VideoLibrary(videos_path, snapshot=True)
+    with open(videos_path, "a") as video_file:
+        video_file.write("\nNew Cat | new_cat_video_id | #cat")
+
+    with pytest.raises(SnapshotError):
+        read_snapshot(videos_path)
+    library = VideoLibrary(videos_path, snapshot=True)
+    assert _ids(library.search_videos_tag("#cat"))[-1] == "new_cat_video_id"
+    read_snapshot(videos_path)
+
+
+def test_touched_source_keeps_snapshot(videos_path):
+    VideoLibrary(videos_path, snapshot=True)
+    stat = os.stat(videos_path)
+    os.utime(videos_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    videos, _, _, _ = read_snapshot(videos_path)
+    assert len(videos) == 5
+
+
+def test_unsupported_snapshot_is_rejected(videos_path):
+    snapshot_path = Path(str(videos_path) + ".snap")
+    snapshot_path.write_bytes(b"not a snapshot")
+
+    with pytest.raises(SnapshotError):
+        read_snapshot(videos_path)
+    assert len(VideoLibrary(videos_path, snapshot=True).get_all_videos()) == 5
+
+
+def test_truncated_snapshot_is_rejected(videos_path):
+    VideoLibrary(videos_path, snapshot=True)
+    snapshot_path = Path(str(videos_path) + ".snap")
+    data = snapshot_path.read_bytes()
+
+    for corrupt in (data[:-12], data + bytes(4)):
+        snapshot_path.write_bytes(corrupt)
+        with pytest.raises(SnapshotError):
+            read_snapshot(videos_path)
+    library = VideoLibrary(videos_path, snapshot=True, cache=False)
+    assert _ids(library.search_videos("video")) == _ids(
+        VideoLibrary(videos_path).search_videos("video"))
+    read_snapshot(videos_path)
@@ -0,0 +1,162 @@
+import pytest
+
+from src.command_parser import CommandException, CommandParser
+from src.command_stats import CommandStats
+from src.output_sink import MemorySink
+from src.video_player import VideoPlayer
+
+
+def _parser():
+    sink = MemorySink()
+    return CommandParser(VideoPlayer(output=sink)), sink
+
+
+def test_commands_are_case_insensitive():
+    parser, sink = _parser()
+    parser.execute_command(["play", "amazing_cats_video_id"])
+
+    assert sink.lines == ["Playing video: Amazing Cats"]
+
+
+def test_wrong_arity_raises_usage_error():
+    parser, sink = _parser()
+    with pytest.raises(CommandException) as e:
+        parser.execute_command(["FLAG_VIDEO"])
+    assert str(e.value) == ("Please enter FLAG_VIDEO command followed by a "
+                            "video_id and an optional flag reason.")
+
+
+def test_commands_without_arguments_ignore_extra_words():
+    parser, sink = _parser()
+    parser.execute_command(["NUMBER_OF_VIDEOS", "please"])
+
+    assert sink.lines == ["5 videos in the library"]
+
+
+def test_unknown_and_empty_commands():
+    parser, sink = _parser()
+    parser.execute_command(["DANCE"])
+    assert sink.lines == ["Please enter a valid command, type HELP for a "
+                          "list of available commands."]
+    with pytest.raises(CommandException):
+        parser.execute_command([])
+
+
+def test_registered_command_is_dispatched_and_listed_in_help():
+    parser, sink = _parser()
+    calls = []
+    parser.register_command("ECHO", calls.append, (1,),
+                            "Please enter ECHO command followed by a word.",
+                            "ECHO <word> - Echoes a word.")
+    parser.execute_command(["echo", "hi"])
+    parser.execute_command(["HELP"])
+
+    assert calls == ["hi"]
+    assert "    ECHO <word> - Echoes a word." in sink.getvalue().splitlines()
+    with pytest.raises(CommandException):
+        parser.execute_command(["ECHO"])
+
+
+def test_flag_and_allow_videos_from_file(tmp_path):
+    parser, sink = _parser()
+    id_file = tmp_path / "ids.txt"
+    id_file.write_text("amazing_cats_video_id\n\n"
+                       "funny_dogs_video_id too noisy\n"
+                       "amazing_cats_video_id\n"
+                       "does_not_exist\n")
+    parser.execute_command(["PLAY", "funny_dogs_video_id"])
+    parser.execute_command(["FLAG_VIDEOS_FROM_FILE", str(id_file), "spam"])
+
+    assert sink.lines[1:] == [
+        "Stopping video: Funny Dogs",
+        "Successfully flagged 2 videos (1 already flagged, 1 do not exist)"]
+    flagged = parser._player.video_library.flagged
+    assert flagged == {"amazing_cats_video_id": "spam",
+                       "funny_dogs_video_id": "too noisy"}
+
+    sink.clear()
+    id_file.write_text("amazing_cats_video_id\nnothing_video_id\n")
+    parser.execute_command(["ALLOW_VIDEOS_FROM_FILE", str(id_file)])
+    parser.execute_command(["ALLOW_VIDEOS_FROM_FILE", str(tmp_path / "no")])
+    assert sink.lines == [
+        "Successfully removed flag from 1 videos (1 not flagged, "
+        "0 do not exist)",
+        "Cannot remove flags from videos: File could not be read"]
+    assert list(flagged) == ["funny_dogs_video_id"]
+
+
+def test_paged_search_reports_total():
+    sink = MemorySink()
+    parser = CommandParser(VideoPlayer(output=sink, read_answer=lambda: "no"))
+    parser.execute_command(["SEARCH_VIDEOS", "a", "2", "1"])
+
+    assert sink.lines[:4] == [
+        "Here are the results for a:",
+        "1) Another Cat Video (another_cat_video_id) [#cat #animal]",
+        "2) Life at Google (life_at_google_video_id) [#google #career]",
+        "Showing results 2-3 of 4"]
+
+    sink.clear()
+    parser.execute_command(["SHOW_ALL_VIDEOS", "1", "4"])
+    parser.execute_command(["SHOW_ALL_VIDEOS", "10", "10"])
+    parser.execute_command(["SEARCH_VIDEOS_WITH_TAG", "#cat", "1", "5"])
+    parser.execute_command(["SEARCH_VIDEOS", "a", "-1"])
+    assert sink.lines == [
+        "Here's a list of all available videos:",
+        "Video about nothing (nothing_video_id) []",
+        "Showing videos 5-5 of 5",
+        "No more videos in the library (5 in total)",
+        "No more search results for #cat (2 in total)",
+        "Cannot search videos: Please enter a limit of at least 1 and an "
+        "offset of at least 0"]
+
+
+def test_play_result_plays_from_stored_results():
+    sink = MemorySink()
+    parser = CommandParser(VideoPlayer(output=sink, result_handles=True))
+    parser.execute_command(["PLAY_RESULT", "1"])
+    parser.execute_command(["SEARCH_VIDEOS", "cat"])
+    parser.execute_command(["SEARCH_VIDEOS_FUZZY", "dogz"])
+    parser.execute_command(["PLAY_RESULT", "1"])
+    parser.execute_command(["PLAY_RESULT", "R1", "2"])
+    parser.execute_command(["PLAY_RESULT", "r1", "3"])
+    parser.execute_command(["PLAY_RESULT", "r3", "1"])
+
+    assert sink.lines[0] == ("Cannot play result: No search results to "
+                             "play from")
+    assert sink.lines[4] == (
+        "Results saved as r1. To play one of them, enter PLAY_RESULT r1 "
+        "<number> (or PLAY_RESULT <number> for the latest results).")
+    assert sink.lines[-5:] == [
+        "Playing video: Funny Dogs",
+        "Stopping video: Funny Dogs",
+        "Playing video: Another Cat Video",
+        "Cannot play result: Result number does not exist",
+        "Cannot play result: Result handle does not exist"]
+
+
+def test_stats_record_every_command(tmp_path):
+    sink = MemorySink()
+    parser = CommandParser(VideoPlayer(output=sink), stats=CommandStats())
+    parser.execute_command(["PLAY", "amazing_cats_video_id"])
+    with pytest.raises(CommandException):
+        parser.execute_command(["PLAY"])
+    parser.execute_command(["TYPO"])
+    sink.clear()
+    parser.execute_command(["STATS"])
+    parser.execute_command(["STATS", str(tmp_path / "stats.prom")])
+
+    assert sink.lines[0] == "Command statistics:"
+    assert sink.lines[1].startswith("    PLAY: 2 calls, 1 errors, p50 ")
+    assert sink.lines[2].startswith("    UNKNOWN: 1 calls, 1 errors, p50 ")
+    assert sink.lines[3] == ("Exported command statistics to "
+                             + str(tmp_path / "stats.prom"))
+    assert 'command="STATS"' in (tmp_path / "stats.prom").read_text()
+
+
+def test_stats_are_off_by_default():
+    parser, sink = _parser()
+    parser.execute_command(["STATS"])
+
+    assert parser.stats is None
+    assert sink.lines == ["Command statistics are disabled."]
@@ -0,0 +1,43 @@
+from src.command_stats import CommandStats, LatencyHistogram
+
+
+def test_histogram_percentiles_are_within_bucket_precision():
+    histogram = LatencyHistogram()
+    for nanoseconds in range(1, 1001):
+        histogram.record(nanoseconds * 1000)
+
+    assert histogram.count == 1000
+    assert histogram.max_seconds == 1e-3
+    for fraction in (0.5, 0.9, 0.99):
+        exact = fraction * 1e-3
+        assert exact <= histogram.percentile(fraction) <= exact * 1.125
+    assert histogram.percentile(1.0) == 1e-3
+    bounds = [bound for bound, _ in histogram.buckets()]
+    assert bounds == sorted(bounds)
+    assert list(histogram.buckets())[-1][1] == 1000
+
+
+def test_small_latencies_have_exact_buckets():
+    histogram = LatencyHistogram()
+    for nanoseconds in (0, 3, 15, 16, 17):
+        histogram.record(nanoseconds)
+
+    assert [round(bound * 1e9) for bound, _ in histogram.buckets()] == [
+        0, 3, 15, 17]
+
+
+def test_command_stats_counts_and_exports():
+    stats = CommandStats()
+    stats.record("PLAY", 2000)
+    stats.record("PLAY", 4000, error=True)
+    stats.record("STOP", 1000)
+
+    assert [(name, count, errors)
+            for name, count, errors, _ in stats.commands()] == [
+        ("PLAY", 2, 1), ("STOP", 1, 0)]
+    assert stats.format_lines()[0].startswith("    PLAY: 2 calls, 1 errors")
+    text = stats.prometheus_text()
+    assert ('youtube_command_duration_seconds_bucket{command="PLAY",'
+            'le="+Inf"} 2') in text
+    assert 'youtube_command_duration_seconds_count{command="STOP"} 1' in text
+    assert 'youtube_command_errors_total{command="PLAY"} 1' in text
@@ -0,0 +1,54 @@
+from src.flag_store import FlagStore
+
+
+def test_flag_and_unflag_update_playable_videos():
+    store = FlagStore(["a", "b", "c"])
+    store.flag_video("a", "spam")
+    store.flag_video("c")
+
+    assert store.flagged == {"a": "spam", "c": ""}
+    assert store.random_video_id() == "b"
+
+    store.flag_video("b")
+    assert store.random_video_id() is None
+
+    store.unflag_video("c")
+    assert store.random_video_id() == "c"
+
+
+def test_removed_video_loses_its_flag():
+    store = FlagStore(["a", "b"])
+    store.flag_video("a")
+    store.remove_video("a")
+    store.remove_video("b")
+    store.add_video("d")
+
+    assert store.flagged == {}
+    assert store.random_video_id() == "d"
+
+
+def test_bulk_flag_and_unflag():
+    store = FlagStore(["a", "b", "c", "d"])
+    store.flag_video("d")
+    store.flag_videos([("a", "spam"), ("b", "")])
+
+    assert store.flagged == {"d": "", "a": "spam", "b": ""}
+    assert store.random_video_id() == "c"
+
+    store.unflag_videos(["a", "b", "c"])
+    assert store.flagged == {"d": ""}
+    store.flag_video("c")
+    store.flag_video("b")
+    assert store.random_video_id() == "a"
+
+
+def test_unflagged_videos_outside_the_catalog_are_not_playable():
+    catalog = {"a", "b"}
+    store = FlagStore(["a", "b"], is_video=catalog.__contains__)
+    store.flag_videos([("a", ""), ("b", ""), ("x", ""), ("y", "")])
+
+    store.unflag_video("x")
+    store.unflag_videos(["a", "y"])
+
+    assert store.flagged == {"b": ""}
+    assert store.random_video_id() == "a"
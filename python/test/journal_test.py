@@ -0,0 +1,163 @@
+import pytest
+
+from src.flag_store import FlagStore
+from src.journal import FSYNC_ALWAYS, FSYNC_NEVER, StateJournal
+from src.output_sink import MemorySink
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+from src.video_playlist import Playlist
+
+
+def _open(directory, **kwargs):
+    playlist, flags = Playlist(), FlagStore(["a", "b", "c"])
+    journal = StateJournal(directory, group_interval=None, **kwargs)
+    journal.attach(playlist, flags)
+    return journal, playlist, flags
+
+
+def _change(playlist, flags):
+    playlist.create_playlist("My_List")
+    playlist.add_to_playlist("my_list", "a")
+    playlist.add_to_playlist("my_list", "b")
+    playlist.remove_from_playlist("my_list", "a")
+    playlist.create_playlist("other")
+    playlist.delete_playlist("other")
+    flags.flag_video("c", "spam")
+    flags.flag_video("a")
+    flags.unflag_video("a")
+
+
+def _assert_restored(playlist, flags):
+    assert list(playlist.playlists) == ["my_list"]
+    assert playlist.playlists["my_list"]["name"] == "My_List"
+    assert list(playlist.playlists["my_list"]["videos"]) == ["b"]
+    assert flags.flagged == {"c": "spam"}
+
+
+def test_state_is_replayed_from_journal(tmp_path):
+    journal, playlist, flags = _open(tmp_path)
+    _change(playlist, flags)
+    journal.close()
+
+    journal, playlist, flags = _open(tmp_path)
+    _assert_restored(playlist, flags)
+    journal.close()
+
+
+def test_state_is_replayed_from_snapshot_and_tail(tmp_path):
+    journal, playlist, flags = _open(tmp_path, compact_every=4,
+                                     fsync=FSYNC_ALWAYS)
+    _change(playlist, flags)
+    journal.close()
+
+    assert (tmp_path / "snapshot.json").exists()
+    assert len(list(tmp_path.glob("journal-*.log"))) == 1
+    journal, playlist, flags = _open(tmp_path, compact_every=4)
+    _assert_restored(playlist, flags)
+    journal.close()
+
+
+def test_compaction_writes_buffered_records_first(tmp_path):
+    journal, playlist, flags = _open(tmp_path, group_size=4, compact_every=6,
+                                     fsync=FSYNC_NEVER)
+    playlist.create_playlist("my_list")
+    for video_id in ("a", "b", "c"):
+        playlist.add_to_playlist("my_list", video_id)
+    playlist.remove_from_playlist("my_list", "a")
+    playlist.remove_from_playlist("my_list", "b")
+    journal.close()
+
+    journal, playlist, flags = _open(tmp_path, group_size=4, compact_every=6)
+    assert list(playlist.playlists["my_list"]["videos"]) == ["c"]
+    journal.close()
+
+
+def test_unflushed_records_are_buffered(tmp_path):
+    journal, playlist, flags = _open(tmp_path, group_size=100,
+                                     fsync=FSYNC_NEVER)
+    flags.flag_video("a")
+    segment = next(tmp_path.glob("journal-*.log"))
+    assert segment.read_text() == ""
+
+    journal.flush()
+    assert segment.read_text() == '["flags","flag_video",["a",""]]\n'
+    journal.close()
+
+
+def test_torn_record_is_dropped(tmp_path):
+    journal, playlist, flags = _open(tmp_path)
+    flags.flag_video("a")
+    journal.close()
+    segment = next(tmp_path.glob("journal-*.log"))
+    with open(segment, "a") as journal_file:
+        journal_file.write('["flags","flag_vi')
+
+    journal, playlist, flags = _open(tmp_path)
+    flags.flag_video("b")
+    journal.close()
+
+    journal, playlist, flags = _open(tmp_path)
+    assert flags.flagged == {"a": "", "b": ""}
+    journal.close()
+
+
+def test_invalid_fsync_mode(tmp_path):
+    with pytest.raises(ValueError):
+        StateJournal(tmp_path, fsync="sometimes")
+
+
+def test_bulk_flags_are_replayed(tmp_path):
+    journal, playlist, flags = _open(tmp_path)
+    flags.flag_videos([("a", "spam"), ("b", "")])
+    flags.unflag_videos(["b", "c"])
+    journal.close()
+
+    journal, playlist, flags = _open(tmp_path)
+    assert flags.flagged == {"a": "spam"}
+    journal.close()
+
+
+def test_restored_playlists_drop_videos_no_longer_in_catalog(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text("Funny Dogs | funny_dogs_video_id | #dog\n"
+                    "Nothing | nothing_video_id |\n")
+    player = VideoPlayer(VideoLibrary(path), output=MemorySink())
+    with StateJournal(tmp_path / "state") as journal:
+        journal.attach(player.playlist, None)
+        player.create_playlist("mine")
+        player.add_to_playlist("mine", "funny_dogs_video_id")
+        player.add_to_playlist("mine", "nothing_video_id")
+
+    path.write_text("Funny Dogs | funny_dogs_video_id | #dog\n")
+    sink = MemorySink()
+    player = VideoPlayer(VideoLibrary(path), output=sink)
+    with StateJournal(tmp_path / "state") as journal:
+        journal.attach(player.playlist, None)
+        player.remove_missing_videos()
+        player.show_playlist("mine")
+
+    assert sink.lines == ["Showing playlist: mine",
+                          "Funny Dogs (funny_dogs_video_id) [#dog]"]
+
+
+def test_restored_flags_drop_videos_no_longer_in_catalog(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text("Funny Dogs | funny_dogs_video_id | #dog\n"
+                    "Nothing | nothing_video_id |\n")
+    library = VideoLibrary(path)
+    player = VideoPlayer(library, output=MemorySink())
+    with StateJournal(tmp_path / "state") as journal:
+        journal.attach(player.playlist, library.flag_store)
+        player.flag_video("funny_dogs_video_id")
+        player.flag_video("nothing_video_id")
+
+    path.write_text("Nothing | nothing_video_id |\n")
+    for _ in range(2):
+        library = VideoLibrary(path)
+        player = VideoPlayer(library, output=MemorySink())
+        with StateJournal(tmp_path / "state") as journal:
+            journal.attach(player.playlist, library.flag_store)
+            player.remove_missing_videos()
+
+        assert library.flagged == {"nothing_video_id": ""}
+        assert library.flag_store.random_video_id() is None
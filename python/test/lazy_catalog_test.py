@@ -0,0 +1,57 @@
+from pathlib import Path
+
+from src.lazy_catalog import LazyVideoMap
+from src.output_sink import MemorySink
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+VIDEOS_PATH = Path(__file__).parent.parent / "src" / "videos.txt"
+
+
+def test_lazy_map_decodes_on_access():
+    videos = LazyVideoMap(VIDEOS_PATH)
+
+    assert len(videos) == 5
+    assert videos._cache == {}
+    video = videos["amazing_cats_video_id"]
+    assert video.title == "Amazing Cats"
+    assert video.tags == ("#cat", "#animal")
+    assert list(videos._cache) == ["amazing_cats_video_id"]
+    videos.close()
+
+
+def test_lazy_map_duplicates_quotes_and_empty_tags(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text('First | dup_id | #a\n'
+                    '"Quoted | title" | quoted_id | #b , #c\n'
+                    'Second | dup_id |\n')
+    videos = LazyVideoMap(path)
+
+    assert list(videos) == ["dup_id", "quoted_id"]
+    assert videos["dup_id"].title == "Second"
+    assert videos["dup_id"].tags == ()
+    assert videos["quoted_id"].title == "Quoted | title"
+    assert videos["quoted_id"].tags == ("#b", "#c")
+    videos.close()
+
+
+def test_lazy_library_matches_eager_library():
+    eager = VideoLibrary()
+    lazy = VideoLibrary(lazy=True)
+
+    assert lazy.get_video("funny_dogs_video_id").title == "Funny Dogs"
+    assert [v.video_id for v in lazy.iter_videos_by_title()] == [
+        v.video_id for v in eager.iter_videos_by_title()]
+    assert [v.video_id for v in lazy.search_videos("cat")] == [
+        v.video_id for v in eager.search_videos("cat")]
+    assert [v.video_id for v in lazy.search_videos_tag("#animal")] == [
+        v.video_id for v in eager.search_videos_tag("#animal")]
+
+
+def test_counting_videos_decodes_none():
+    library = VideoLibrary(lazy=True, cache=False)
+    sink = MemorySink()
+    VideoPlayer(library, output=sink).number_of_videos()
+
+    assert sink.lines == ["5 videos in the library"]
+    assert library.catalog._videos._cache == {}
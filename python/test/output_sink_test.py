@@ -0,0 +1,64 @@
+import io
+
+import pytest
+
+from src.command_parser import CommandParser
+from src.output_sink import MemorySink, OutputSink, SocketSink, StreamSink
+from src.video_player import VideoPlayer
+
+
+class _FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    def sendall(self, data):
+        self.sent.append(data)
+
+
+def test_player_writes_to_memory_sink(capfd):
+    sink = MemorySink()
+    player = VideoPlayer(output=sink)
+    player.play_video("amazing_cats_video_id")
+    player.stop_video()
+    out, err = capfd.readouterr()
+
+    assert out == ""
+    assert sink.lines == ["Playing video: Amazing Cats",
+                          "Stopping video: Amazing Cats"]
+    assert sink.getvalue() == ("Playing video: Amazing Cats\n"
+                               "Stopping video: Amazing Cats\n")
+
+
+def test_stream_sink_writes_once_per_command():
+    stream = io.StringIO()
+    writes = []
+    stream_write = stream.write
+    stream.write = lambda text: writes.append(text) or stream_write(text)
+    parser = CommandParser(VideoPlayer(output=StreamSink(stream)))
+
+    parser.execute_command(["SHOW_ALL_VIDEOS"])
+
+    assert len(writes) == 1
+    assert stream.getvalue().splitlines()[0] == (
+        "Here's a list of all available videos:")
+    assert len(stream.getvalue().splitlines()) == 6
+
+
+def test_socket_sink_sends_buffered_lines():
+    sock = _FakeSocket()
+    sink = SocketSink(sock)
+    sink.write("first")
+    sink.write("second")
+    assert sock.sent == []
+
+    sink.flush()
+    sink.flush()
+    assert sock.sent == [b"first\nsecond\n"]
+
+
+def test_sink_without_write_cannot_be_created():
+    class _SilentSink(OutputSink):
+        pass
+
+    with pytest.raises(TypeError):
+        _SilentSink()
@@ -0,0 +1,39 @@
+from src.catalog_parser import read_videos
+from src.parallel_loader import _chunk_bounds, read_videos_parallel
+
+CATALOG = ("Funny Dogs | funny_dogs_video_id |  #dog , #animal\n"
+           "  Amazing Cats|amazing_cats_video_id|#cat,#animal  \n"
+           "Video about nothing | nothing_video_id |\n"
+           "Funnier Dogs | funny_dogs_video_id | #dog\n"
+           "Form\x0cfeed\u2028title | form_feed_video_id | #odd\r\n"
+           "Last line without newline | last_video_id | #animal")
+
+
+def test_chunks_split_at_line_boundaries(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text(CATALOG)
+    bounds = _chunk_bounds(path, 10)
+    data = path.read_bytes()
+
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(data)
+    for start, end in bounds:
+        assert start == 0 or data[start - 1:start] == b"\n"
+
+
+def test_parallel_parse_matches_sequential_parse(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text(CATALOG)
+    with open(path) as video_file:
+        expected = {}
+        for video in read_videos(video_file):
+            expected[video.video_id] = video
+
+    videos = read_videos_parallel(path, workers=2, chunk_size=10)
+
+    assert list(videos) == list(expected)
+    for video_id, video in expected.items():
+        assert videos[video_id].title == video.title
+        assert videos[video_id].tags == video.tags
+    assert videos["funny_dogs_video_id"].title == "Funnier Dogs"
+    assert videos["nothing_video_id"].tags == ()
+    assert videos["form_feed_video_id"].title == "Form\x0cfeed\u2028title"
@@ -0,0 +1,34 @@
+from src.query_cache import QueryCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryCache(capacity=2)
+    cache.put("a", 0, (1,))
+    cache.put("b", 0, (2,))
+    assert cache.get("a", 0) == (1,)
+    cache.put("c", 0, (3,))
+
+    assert cache.get("b", 0) is None
+    assert cache.get("a", 0) == (1,)
+    assert cache.get("c", 0) == (3,)
+    assert cache.stats == {"hits": 3, "misses": 1, "evictions": 1,
+                           "size": 2, "capacity": 2}
+
+
+def test_other_generation_is_a_miss():
+    cache = QueryCache()
+    cache.put("a", 0, (1,))
+
+    assert cache.get("a", 1) is None
+    assert len(cache) == 0
+    assert cache.get("a", 0) is None
+
+
+def test_disabled_and_oversized_results_are_not_cached():
+    disabled = QueryCache(capacity=0)
+    disabled.put("a", 0, (1,))
+    small = QueryCache(max_result_size=2)
+    small.put("a", 0, (1, 2, 3))
+
+    assert len(disabled) == 0
+    assert len(small) == 0
@@ -0,0 +1,45 @@
+import io
+
+from src.command_parser import CommandParser
+from src.run import _reload_catalog, run_batch
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def _run(script):
+    lines = iter(io.StringIO(script))
+    player = VideoPlayer(read_answer=lambda: next(lines, "").rstrip("\n"))
+    return run_batch(CommandParser(player), lines)
+
+
+def test_run_batch_executes_until_exit(capfd):
+    count = _run("NUMBER_OF_VIDEOS\nPLAY\nEXIT\nNUMBER_OF_VIDEOS\n")
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert count == 2
+    assert len(lines) == 2
+    assert "5 videos in the library" in lines[0]
+    assert "Please enter PLAY command followed by video_id." in lines[1]
+    assert "YT>" not in out
+
+
+def test_run_batch_reads_search_answers_from_stream(capfd):
+    count = _run("SEARCH_VIDEOS_WITH_TAG #cat\n1\nSHOW_PLAYING\n")
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert count == 2
+    assert "Playing video: Amazing Cats" in lines[5]
+    assert "Currently playing: Amazing Cats" in lines[6]
+
+
+def test_watch_reports_unparsable_catalog(tmp_path, capfd):
+    path = tmp_path / "videos.txt"
+    path.write_text("Funny Dogs | funny_dogs_video_id | #dog\n")
+    library = VideoLibrary(path)
+    path.write_text("Funny Dogs | funny_dogs_video_id\n")
+
+    _reload_catalog(library)
+    _reload_catalog(library)
+    out, err = capfd.readouterr()
+    assert err.startswith("Cannot reload videos: ")
+    assert library.get_video("funny_dogs_video_id").tags == ("#dog",)
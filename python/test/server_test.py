@@ -0,0 +1,112 @@
+import asyncio
+
+from src.command_stats import CommandStats
+from src.output_sink import MemorySink
+from src.server import INVALID_COMMAND, PROMPT, CommandServer, Session
+from src.video_library import VideoLibrary
+
+
+def test_session_takes_search_answer_from_next_line():
+    sink = MemorySink()
+    session = Session(VideoLibrary(), sink)
+
+    assert session.handle_line("SEARCH_VIDEOS cat")
+    assert session.handle_line("2")
+    assert sink.lines[-1] == "Playing video: Another Cat Video"
+    assert session.handle_line("PLAY")
+    assert sink.lines[-1] == "Please enter PLAY command followed by video_id."
+    assert not session.handle_line("exit")
+
+
+def test_session_with_result_handles_never_waits_for_an_answer():
+    sink = MemorySink()
+    session = Session(VideoLibrary(), sink, result_handles=True)
+
+    assert session.handle_line("SEARCH_VIDEOS cat")
+    assert session.handle_line("SEARCH_VIDEOS_WITH_TAG #dog")
+    assert sink.lines[-1].startswith("Results saved as r2.")
+    assert session.handle_line("PLAY_RESULT r1 2")
+    assert sink.lines[-1] == "Playing video: Another Cat Video"
+
+
+def test_session_cannot_export_stats_to_a_file(tmp_path):
+    sink = MemorySink()
+    session = Session(VideoLibrary(), sink, stats=CommandStats())
+
+    assert session.handle_line("STATS " + str(tmp_path / "stats.prom"))
+    assert sink.lines == ["Please enter STATS command without arguments."]
+    assert not (tmp_path / "stats.prom").exists()
+    assert session.handle_line("STATS")
+    assert sink.lines[1] == "Command statistics:"
+
+
+def test_session_cannot_flag_videos_from_a_file():
+    sink = MemorySink()
+    library = VideoLibrary(cache=False)
+    session = Session(library, sink)
+
+    assert session.handle_line("FLAG_VIDEOS_FROM_FILE /etc/passwd")
+    assert session.handle_line("ALLOW_VIDEOS_FROM_FILE /etc/passwd")
+    assert sink.lines == [
+        "Please enter a valid command, type HELP for a list of available "
+        "commands."] * 2
+    assert library.flagged == {}
+
+
+def test_sessions_share_library_but_not_playback():
+    async def scenario():
+        server = CommandServer()
+        listener = await server.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        prompt = PROMPT.encode()
+
+        async def command(reader, writer, line):
+            writer.write(line.encode() + b"\n")
+            return (await reader.readuntil(prompt))[:-len(prompt)].decode()
+
+        first = await asyncio.open_connection("127.0.0.1", port)
+        second = await asyncio.open_connection("127.0.0.1", port)
+        await first[0].readuntil(prompt)
+        await second[0].readuntil(prompt)
+        assert server.sessions == 2
+
+        played = await command(*first, "PLAY amazing_cats_video_id")
+        flagged = await command(*second, "FLAG_VIDEO funny_dogs_video_id")
+        playing = await command(*second, "SHOW_PLAYING")
+        blocked = await command(*first, "PLAY funny_dogs_video_id")
+        first[1].write(b"EXIT\n")
+        goodbye = await first[0].read()
+
+        second[1].close()
+        listener.close()
+        await listener.wait_closed()
+        return played, flagged, playing, blocked, goodbye
+
+    played, flagged, playing, blocked, goodbye = asyncio.run(scenario())
+    assert played == "Playing video: Amazing Cats\n"
+    assert flagged.startswith("Successfully flagged video: Funny Dogs")
+    assert playing == "No video is currently playing\n"
+    assert blocked.startswith("Cannot play video: Video is currently flagged")
+    assert b"Thank you and goodbye!" in goodbye
+
+
+def test_overlong_line_is_rejected_and_skipped():
+    async def scenario():
+        server = CommandServer()
+        listener = await server.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        prompt = PROMPT.encode()
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        await reader.readuntil(prompt)
+
+        writer.write(b"PLAY " + b"x" * 200000 + b"\nNUMBER_OF_VIDEOS\n")
+        rejected = await reader.readuntil(prompt)
+        counted = await reader.readuntil(prompt)
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return rejected, counted
+
+    rejected, counted = asyncio.run(scenario())
+    assert rejected.decode() == INVALID_COMMAND + "\n" + PROMPT
+    assert counted.decode() == "5 videos in the library\n" + PROMPT
@@ -0,0 +1,137 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from src.sqlite_library import SqliteVideoLibrary
+from src.video import Video
+from src.video_library import VideoLibrary, open_video_library
+from src.video_player import VideoPlayer
+
+VIDEOS_PATH = Path(__file__).parent.parent / "src" / "videos.txt"
+
+
+@pytest.fixture
+def videos_path(tmp_path):
+    path = tmp_path / "videos.txt"
+    shutil.copy(VIDEOS_PATH, path)
+    return path
+
+
+@pytest.fixture
+def library(tmp_path, videos_path):
+    library = SqliteVideoLibrary(tmp_path / "videos.db", videos_path)
+    yield library
+    library.close()
+
+
+def _ids(videos):
+    return [video.video_id for video in videos]
+
+
+def test_queries_match_dict_backend(library):
+    expected = VideoLibrary()
+
+    assert len(library) == 5
+    assert library.get_video("amazing_cats_video_id").tags == ("#cat", "#animal")
+    assert library.get_video("nothing_video_id").tags == ()
+    assert library.get_video("does_not_exist") is None
+    assert _ids(library.iter_videos_by_title()) == _ids(
+        expected.iter_videos_by_title())
+    for term in ["cat", "CAT", " o ", "google", "zzz", ""]:
+        assert _ids(library.search_videos(term)) == _ids(
+            expected.search_videos(term))
+    for term in ["amazng cat", "dgos", "go", "goggle", "dgs", "zzzz"]:
+        assert _ids(library.search_videos_fuzzy(term)) == _ids(
+            expected.search_videos_fuzzy(term))
+    for tag in ["#animal", "#CAT", "#nothing"]:
+        assert _ids(library.search_videos_tag(tag)) == _ids(
+            expected.search_videos_tag(tag))
+    for limit, offset in [(None, 0), (2, 0), (2, 1), (None, 3), (3, 9)]:
+        for page, expected_page in [
+                (library.search_videos_page("a", limit, offset),
+                 expected.search_videos_page("a", limit, offset)),
+                (library.search_videos_tag_page("#animal", limit, offset),
+                 expected.search_videos_tag_page("#animal", limit, offset)),
+                (library.videos_by_title_page(limit, offset),
+                 expected.videos_by_title_page(limit, offset))]:
+            assert _ids(page.videos) == _ids(expected_page.videos)
+            assert page.total == expected_page.total
+
+
+def test_flags_are_excluded_and_persisted(tmp_path, videos_path, library):
+    library.flag_video("amazing_cats_video_id", "dont_like_cats")
+
+    assert "amazing_cats_video_id" in library.flagged
+    assert library.flagged["amazing_cats_video_id"] == "dont_like_cats"
+    assert _ids(library.search_videos("cat")) == ["another_cat_video_id"]
+    assert _ids(library.search_videos_tag("#cat")) == ["another_cat_video_id"]
+    assert _ids(library.search_videos_fuzzy("amazng")) == []
+
+    reopened = SqliteVideoLibrary(tmp_path / "videos.db", videos_path)
+    assert dict(reopened.flagged) == {"amazing_cats_video_id": "dont_like_cats"}
+    reopened.unflag_video("amazing_cats_video_id")
+    assert len(reopened.flagged) == 0
+    reopened.flag_videos([("nothing_video_id", ""), ("funny_dogs_video_id", "x")])
+    reopened.unflag_videos(["nothing_video_id"])
+    assert dict(reopened.flagged) == {"funny_dogs_video_id": "x"}
+    reopened.close()
+
+
+def test_flags_survive_rebuild(tmp_path, videos_path, library):
+    library.flag_video("amazing_cats_video_id", "dont_like_cats")
+    library.flag_video("nothing_video_id")
+
+    lines = videos_path.read_text().splitlines()
+    videos_path.write_text("\n".join(
+        line for line in lines if "nothing_video_id" not in line))
+    rebuilt = SqliteVideoLibrary(tmp_path / "videos.db", videos_path)
+    assert dict(rebuilt.flagged) == {"amazing_cats_video_id": "dont_like_cats"}
+    rebuilt.close()
+
+
+def test_add_remove_and_rebuild(tmp_path, videos_path, library):
+    library.add_video(Video("Baby Cats", "baby_cats_video_id", ["#cat"]))
+    library.remove_video("another_cat_video_id")
+    assert _ids(library.search_videos("cats")) == [
+        "amazing_cats_video_id", "baby_cats_video_id"]
+    assert _ids(library.search_videos_tag("#cat")) == [
+        "amazing_cats_video_id", "baby_cats_video_id"]
+
+    with open(videos_path, "a") as video_file:
+        video_file.write("\nCat Show | cat_show_video_id | #cat")
+    rebuilt = SqliteVideoLibrary(tmp_path / "videos.db", videos_path)
+    assert _ids(rebuilt.search_videos_tag("#cat")) == [
+        "amazing_cats_video_id", "another_cat_video_id", "cat_show_video_id"]
+    rebuilt.close()
+
+
+def test_random_video_skips_flagged(library):
+    for video_id in ["amazing_cats_video_id", "another_cat_video_id",
+                     "funny_dogs_video_id", "life_at_google_video_id"]:
+        library.flag_video(video_id)
+    assert library.get_random_video().video_id == "nothing_video_id"
+
+    library.flag_video("nothing_video_id")
+    assert library.get_random_video() is None
+
+
+def test_player_uses_configured_backend(tmp_path, videos_path, monkeypatch,
+                                        capfd):
+    monkeypatch.setenv("YOUTUBE_LIBRARY_BACKEND", "sqlite")
+    library = open_video_library(videos_path=videos_path)
+    assert isinstance(library, SqliteVideoLibrary)
+
+    player = VideoPlayer(library)
+    player.flag_video("funny_dogs_video_id")
+    player.play_video("funny_dogs_video_id")
+    out, err = capfd.readouterr()
+    assert "Cannot play video: Video is currently flagged" in out
+    # Counting the videos must not load them all.
+    monkeypatch.setattr(library, "get_all_videos", None)
+    player.number_of_videos()
+    out, err = capfd.readouterr()
+    assert out == "5 videos in the library\n"
+    library.close()
+    with pytest.raises(ValueError):
+        open_video_library("redis")
@@ -0,0 +1,82 @@
+from src.video import Video
+from src.video_catalog import VideoCatalog, load_catalog
+from src.video_library import VideoLibrary
+
+
+def test_catalog_search_excludes_given_ids():
+    catalog = VideoCatalog()
+
+    assert len(catalog) == 5
+    assert "nothing_video_id" in catalog
+    assert [video.video_id for video in catalog.search_videos(
+        "cat", exclude={"amazing_cats_video_id"})] == ["another_cat_video_id"]
+    assert [video.video_id for video in catalog.search_videos_tag(
+        "#cat", exclude={"another_cat_video_id"})] == ["amazing_cats_video_id"]
+
+
+def test_load_catalog_reuses_catalog_until_file_changes(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text("Funny Dogs | funny_dogs_video_id | #dog\n")
+    first = load_catalog(path)
+
+    assert load_catalog(path) is first
+    assert load_catalog(path, lazy=True) is not first
+
+    path.write_text("Funny Dogs | funny_dogs_video_id | #dog\n"
+                    "Amazing Cats | amazing_cats_video_id | #cat\n")
+    reloaded = load_catalog(path)
+    assert reloaded is not first
+    assert len(reloaded) == 2
+
+
+def test_libraries_copy_cached_catalog_before_changing_it():
+    library = VideoLibrary()
+    other = VideoLibrary()
+    assert library.catalog is other.catalog
+
+    library.remove_video("funny_dogs_video_id")
+    library.add_video(Video("Baby Cats", "baby_cats_video_id", ["#cat"]))
+
+    assert library.catalog is not other.catalog
+    assert library.get_video("funny_dogs_video_id") is None
+    assert other.get_video("funny_dogs_video_id") is not None
+    assert other.get_video("baby_cats_video_id") is None
+    assert [video.video_id for video in other.search_videos_tag("#cat")] == [
+        "amazing_cats_video_id", "another_cat_video_id"]
+    assert VideoLibrary().catalog is other.catalog
+
+
+def test_fuzzy_search_tolerates_typos():
+    catalog = VideoCatalog()
+
+    def search(term, **kwargs):
+        return [video.video_id
+                for video in catalog.search_videos_fuzzy(term, **kwargs)]
+
+    assert search("amazng cat") == ["amazing_cats_video_id"]
+    assert search("CATZ") == ["amazing_cats_video_id", "another_cat_video_id"]
+    assert search("catz", limit=1) == ["amazing_cats_video_id"]
+    assert search("catz", exclude={"amazing_cats_video_id"}) == [
+        "another_cat_video_id"]
+    assert search("go") == ["life_at_google_video_id"]
+    # Word boundaries count, so one typo in a short word is tolerated.
+    assert search("goggle") == ["life_at_google_video_id"]
+    assert search("dgs") == ["funny_dogs_video_id"]
+    assert search("xyzzy") == []
+
+
+def test_diff_finds_added_removed_and_changed_videos():
+    catalog = VideoCatalog()
+    videos = [video for video in catalog.get_all_videos()
+              if video.video_id not in ("nothing_video_id",
+                                        "amazing_cats_video_id")]
+    videos.append(Video("Amazing Cats 2", "amazing_cats_video_id",
+                        ["#cat", "#animal"]))
+    videos.append(Video("Cat Show", "cat_show_video_id", ["#cat"]))
+
+    diff = catalog.diff(videos)
+    assert [video.video_id for video in diff.added] == ["cat_show_video_id"]
+    assert diff.removed == ["nothing_video_id"]
+    assert [video.video_id for video in diff.changed] == [
+        "amazing_cats_video_id"]
+    assert not catalog.diff(catalog.get_all_videos())
@@ -0,0 +1,81 @@
+from src.video_index import TagIndex, TitleIndex, rank_similar, select_page
+
+
+def test_title_index_candidates():
+    index = TitleIndex()
+    index.add("a", "Funny Dogs")
+    index.add("b", "Amazing Cats")
+
+    assert index.candidates("dog") == {"a"}
+    assert index.candidates("do") is None
+    assert list(index.candidates("xyz")) == []
+
+
+def test_title_index_remove():
+    index = TitleIndex()
+    index.add("a", "Funny Dogs")
+    index.add("b", "Hot Dogs")
+    index.remove("a", "Funny Dogs")
+
+    assert index.candidates("dogs") == {"b"}
+    assert list(index.candidates("funny")) == []
+
+
+def test_tag_index_keeps_title_order():
+    index = TagIndex()
+    index.build([(("Zebra", 0, "z"), ["#animal"]), (("Cat", 1, "c"), ["#animal", "#cat"])])
+    index.add(("Dog", 2, "d"), ["#animal"])
+    index.remove(("Cat", 1, "c"), ["#animal", "#cat"])
+
+    assert list(index.video_ids("#animal")) == ["d", "z"]
+    assert list(index.video_ids("#cat")) == []
+
+
+def test_rank_similar_orders_by_overlap_then_similarity():
+    titles = {"a": "Funny Dogs", "b": "Funny Dog Show", "c": "Hot Dogs",
+              "d": "Cats"}
+    index = TitleIndex()
+    for video_id, title in titles.items():
+        index.add(video_id, title)
+
+    overlaps = index.overlaps("funy dogs")
+    assert overlaps["a"] == 9 and "d" not in overlaps
+
+    def rank(limit, exclude=()):
+        return rank_similar("funy dogs", overlaps, titles.__getitem__,
+                            titles.__getitem__, limit, exclude)
+
+    assert rank(10) == ["a", "b", "c"]
+    assert rank(1) == ["a"]
+    assert rank(10, exclude={"a"}) == ["b", "c"]
+    # Fewer than half of the term's n-grams are in "Hot Dogs".
+    assert rank_similar("funy dogz", index.overlaps("funy dogz"),
+                        titles.__getitem__, titles.__getitem__, 10) == [
+        "a", "b"]
+
+
+def test_overlaps_skip_titles_below_the_minimum():
+    titles = {"a": "Funny Dogs", "b": "Funny Dog Show", "c": "Hot Dogs",
+              "d": "Cats"}
+    index = TitleIndex()
+    for video_id, title in titles.items():
+        index.add(video_id, title)
+
+    assert index.overlaps("funy dogs", 6) == {"a": 9, "b": 7}
+    assert index.overlaps("funy dogs", 11) == {}
+    assert index.closest_overlaps("funy dogs", 5, 1) == {"a": 9}
+    assert index.closest_overlaps("funy dogs", 5, 1, exclude={"a"}) == {
+        "a": 9, "b": 7}
+    assert index.closest_overlaps("funy dogs", 5, 10) == {
+        "a": 9, "b": 7, "c": 5}
+
+
+def test_select_page_counts_every_item():
+    items = [5, 3, 9, 1, 7]
+
+    assert select_page(iter(items), 2) == ([1, 3], 5)
+    assert select_page(iter(items), 2, 2) == ([5, 7], 5)
+    assert select_page(iter(items), None, 3) == ([7, 9], 5)
+    assert select_page(iter(items), 2, 4, ordered=True) == ([7], 5)
+    assert select_page(iter(items), 2, 9, key=lambda item: -item) == ([], 5)
+    assert select_page(iter([]), 3) == ([], 0)
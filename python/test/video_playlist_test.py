@@ -0,0 +1,39 @@
+from src.video_playlist import Playlist
+
+
+def test_playlist_keeps_insertion_order():
+    playlist = Playlist()
+    playlist.create_playlist("My_Playlist")
+    for video_id in ["c", "a", "b"]:
+        playlist.add_to_playlist("my_playlist", video_id)
+    playlist.remove_from_playlist("MY_PLAYLIST", "a")
+    playlist.add_to_playlist("my_playlist", "a")
+
+    videos = playlist.playlists["my_playlist"]["videos"]
+    assert list(videos) == ["c", "b", "a"]
+    assert "b" in videos
+    assert "d" not in videos
+
+
+def test_clear_and_delete_playlist():
+    playlist = Playlist()
+    playlist.create_playlist("my_playlist")
+    playlist.add_to_playlist("my_playlist", "a")
+    playlist.clear_playlist("my_playlist")
+    assert len(playlist.playlists["my_playlist"]["videos"]) == 0
+
+    playlist.delete_playlist("my_playlist")
+    assert playlist.playlists == {}
+
+
+def test_remove_videos_from_every_playlist():
+    playlist = Playlist()
+    playlist.create_playlist("A")
+    playlist.create_playlist("B")
+    playlist.add_to_playlist("a", "x")
+    playlist.add_to_playlist("a", "y")
+    playlist.add_to_playlist("b", "x")
+    playlist.remove_videos(["x", "z"])
+
+    assert list(playlist.playlists["a"]["videos"]) == ["y"]
+    assert list(playlist.playlists["b"]["videos"]) == []
@@ -1,4 +1,10 @@
+import pytest
+
+from src.output_sink import MemorySink
+from src.query_cache import QueryCache
+from src.video import Video
 from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
 
 
 def test_library_has_all_videos():
@@ -24,3 +30,251 @@ def test_parses_video_correctly_without_tags():
     assert video.title == "Video about nothing"
     assert video.video_id == "nothing_video_id"
     assert video.tags == ()
+
+
+def test_search_videos_sorted_by_title():
+    library = VideoLibrary()
+    matched = library.search_videos("cat")
+
+    assert [video.video_id for video in matched] == [
+        "amazing_cats_video_id", "another_cat_video_id"]
+
+
+def test_search_videos_short_and_mixed_case_terms():
+    library = VideoLibrary()
+
+    assert len(library.search_videos("o")) == 4
+    assert [video.video_id for video in library.search_videos(" GOOGLE ")] == [
+        "life_at_google_video_id"]
+    assert library.search_videos("zzzz") == []
+
+
+def test_search_videos_excludes_flagged():
+    library = VideoLibrary()
+    library.flag_video("amazing_cats_video_id")
+
+    assert [video.video_id for video in library.search_videos("cat")] == [
+        "another_cat_video_id"]
+
+
+def test_search_videos_tag_sorted_by_title():
+    library = VideoLibrary()
+    library.flag_video("amazing_cats_video_id")
+
+    assert [video.video_id for video in library.search_videos_tag("#ANIMAL")] == [
+        "another_cat_video_id", "funny_dogs_video_id"]
+    assert library.search_videos_tag("#unknown") == []
+
+
+def test_iter_videos_by_title():
+    library = VideoLibrary()
+
+    assert [video.title for video in library.iter_videos_by_title()] == [
+        "Amazing Cats", "Another Cat Video", "Funny Dogs", "Life at Google",
+        "Video about nothing"]
+
+
+def test_add_and_remove_video_update_indexes():
+    library = VideoLibrary()
+    library.add_video(Video("Baby Cats", "baby_cats_video_id", ["#cat"]))
+    library.remove_video("another_cat_video_id")
+
+    assert [video.title for video in library.iter_videos_by_title()][:3] == [
+        "Amazing Cats", "Baby Cats", "Funny Dogs"]
+    assert [video.video_id for video in library.search_videos("cats")] == [
+        "amazing_cats_video_id", "baby_cats_video_id"]
+    assert [video.video_id for video in library.search_videos_tag("#cat")] == [
+        "amazing_cats_video_id", "baby_cats_video_id"]
+    assert library.get_video("another_cat_video_id") is None
+
+
+def test_add_video_replaces_existing_id():
+    library = VideoLibrary()
+    library.add_video(Video("Zany Dogs", "funny_dogs_video_id", ["#dog"]))
+
+    assert [video.title for video in library.iter_videos_by_title()][-1] == (
+        "Zany Dogs")
+    assert library.search_videos_tag("#animal")[-1].title == "Another Cat Video"
+    assert len(library.get_all_videos()) == 5
+
+
+def test_get_random_video_skips_flagged():
+    library = VideoLibrary()
+    for video_id in ["amazing_cats_video_id", "another_cat_video_id",
+                     "funny_dogs_video_id", "life_at_google_video_id"]:
+        library.flag_video(video_id)
+
+    assert library.get_random_video().video_id == "nothing_video_id"
+
+    library.flag_video("nothing_video_id")
+    assert library.get_random_video() is None
+
+    library.unflag_video("funny_dogs_video_id")
+    assert library.get_random_video().video_id == "funny_dogs_video_id"
+
+
+def test_videos_share_interned_tags():
+    library = VideoLibrary()
+    cats = library.get_video("amazing_cats_video_id")
+    other_cats = library.get_video("another_cat_video_id")
+
+    assert cats.tags is other_cats.tags
+    assert not hasattr(cats, "__dict__")
+
+
+def test_libraries_share_catalog_but_not_flags():
+    library = VideoLibrary()
+    other = VideoLibrary(catalog=library.catalog)
+    library.flag_video("amazing_cats_video_id", "dont_like_cats")
+
+    assert other.catalog is library.catalog
+    assert other.flagged == {}
+    assert [video.video_id for video in other.search_videos("cat")] == [
+        "amazing_cats_video_id", "another_cat_video_id"]
+
+
+def test_changes_never_reach_a_shared_catalog():
+    shared = VideoLibrary(cache=False).catalog
+    library = VideoLibrary(catalog=shared)
+    other = VideoLibrary(catalog=shared)
+    for video in shared.get_all_videos():
+        if video.video_id != "nothing_video_id":
+            library.remove_video(video.video_id)
+
+    assert library.catalog is not shared
+    assert len(library) == 1 and len(shared) == 5
+    assert all(other.get_random_video() is not None for _ in range(20))
+
+
+def test_search_results_are_cached_until_flags_or_videos_change():
+    library = VideoLibrary()
+
+    def search(term):
+        return [video.video_id for video in library.search_videos(term)]
+
+    assert search("cat") == ["amazing_cats_video_id", "another_cat_video_id"]
+    assert search(" CAT ") == ["amazing_cats_video_id", "another_cat_video_id"]
+    assert library.search_videos_page("cat", 1).total == 2
+    assert library.query_cache.stats["hits"] == 2
+
+    library.flag_video("amazing_cats_video_id")
+    assert search("cat") == ["another_cat_video_id"]
+    library.flag_store.unflag_video("amazing_cats_video_id")
+    assert search("cat") == ["amazing_cats_video_id", "another_cat_video_id"]
+
+    library.add_video(Video("Cat Show", "cat_show_video_id", ["#cat"]))
+    assert search("cat")[-1] == "cat_show_video_id"
+    assert [video.video_id
+            for video in library.search_videos_tag("#cat")][-1] == (
+        "cat_show_video_id")
+    assert library.query_cache.stats["hits"] == 2
+
+
+def _count_page_searches(monkeypatch, library):
+    # Returns the limits of the catalog searches run by the library; the
+    # catalog's search_videos() runs an unlimited search_videos_page().
+    limits = []
+    search_page = library.catalog.search_videos_page
+
+    def counted(search_term, limit, *args):
+        limits.append(limit)
+        return search_page(search_term, limit, *args)
+
+    monkeypatch.setattr(library.catalog, "search_videos_page", counted)
+    return limits
+
+
+def test_paged_search_caches_small_results(monkeypatch):
+    library = VideoLibrary(cache=False)
+    limits = _count_page_searches(monkeypatch, library)
+
+    page = library.search_videos_page("a", 2, 1)
+    assert [video.video_id for video in page.videos] == [
+        "another_cat_video_id", "life_at_google_video_id"]
+    assert library.search_videos_page("a", 2, 3).total == 4
+    assert library.search_videos_page("cat", 5).total == 2
+    assert library.search_videos("cat")[0].video_id == "amazing_cats_video_id"
+    assert limits == [2, None, 5]
+
+
+def test_large_paged_search_never_runs_the_full_search(monkeypatch):
+    library = VideoLibrary(cache=False)
+    monkeypatch.setattr(library, "_query_cache",
+                        QueryCache(max_result_size=2))
+    limits = _count_page_searches(monkeypatch, library)
+
+    for offset in (0, 2, 0):
+        assert library.search_videos_page("a", 2, offset).total == 4
+    assert limits == [2, 2, 2]
+
+
+def test_reload_applies_changes_to_the_file(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text("Funny Dogs | funny_dogs_video_id | #dog\n"
+                    "Amazing Cats | amazing_cats_video_id | #cat\n"
+                    "Nothing | nothing_video_id |\n")
+    library = VideoLibrary(path)
+    other = VideoLibrary(path)
+    library.flag_video("nothing_video_id")
+    diffs = []
+    library.subscribe(diffs.append)
+    assert library.reload_if_changed() is None
+
+    path.write_text("Funny Dogs | funny_dogs_video_id | #dog , #animal\n"
+                    "Amazing Cats | amazing_cats_video_id | #cat\n"
+                    "Cat Show | cat_show_video_id | #cat\n")
+    # The change is applied once the file stays the same for two checks.
+    assert library.reload_if_changed() is None
+    diff = library.reload_if_changed()
+
+    assert diffs == [diff]
+    assert diff.removed == ["nothing_video_id"]
+    assert library.get_video("nothing_video_id") is None
+    assert "nothing_video_id" not in library.flagged
+    assert [video.video_id for video in library.search_videos_tag("#cat")] == [
+        "amazing_cats_video_id", "cat_show_video_id"]
+    assert [video.video_id
+            for video in library.search_videos_tag("#animal")] == [
+        "funny_dogs_video_id"]
+    assert library.reload_if_changed() is None
+    # A library sharing the cached catalog only changes once it reloads.
+    assert other.get_video("cat_show_video_id") is None
+
+
+def test_unparsable_file_keeps_the_catalog(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text("Funny Dogs | funny_dogs_video_id | #dog\n")
+    library = VideoLibrary(path)
+    with open(path, "a") as video_file:
+        video_file.write("Half a line | half_")
+
+    assert library.reload_if_changed() is None
+    with pytest.raises(ValueError):
+        library.reload_if_changed()
+    assert library.get_video("funny_dogs_video_id") is not None
+    # Not read again until the file changes once more.
+    assert library.reload_if_changed() is None
+
+
+def test_reload_updates_subscribed_players(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text("Funny Dogs | funny_dogs_video_id | #dog\n"
+                    "Nothing | nothing_video_id |\n")
+    library = VideoLibrary(path)
+    sink = MemorySink()
+    player = VideoPlayer(library, output=sink)
+    library.subscribe(player.catalog_changed)
+    player.create_playlist("mine")
+    player.add_to_playlist("mine", "funny_dogs_video_id")
+    player.add_to_playlist("mine", "nothing_video_id")
+    player.play_video("nothing_video_id")
+
+    path.write_text("Funny Dogs | funny_dogs_video_id | #dog\n")
+    library.reload()
+    sink.clear()
+    player.show_playing()
+    player.show_playlist("mine")
+
+    assert sink.lines == ["No video is currently playing",
+                          "Showing playlist: mine",
+                          "Funny Dogs (funny_dogs_video_id) [#dog]"]